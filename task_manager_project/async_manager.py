@@ -0,0 +1,198 @@
+import asyncio
+import contextlib
+import functools
+from business_logic import TaskManager
+
+
+class ReadWriteLock:
+    """asyncio lock that admits many readers or a single writer.
+
+    A waiting writer keeps new readers out, so writes are not starved by
+    a steady stream of reads.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writing and not self._readers)
+            finally:
+                self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class AsyncTaskManager:
+    """asyncio front end to TaskManager for use inside services.
+
+    Storage is only touched from executor threads, so the event loop never
+    blocks on file I/O. Reads run concurrently with each other. Writes are
+    queued to a single writer task, which applies whatever has queued up
+    in one TaskManager.batch() (one save for the JSON backend) while
+    readers are held off.
+
+    Call close() before the event loop shuts down.
+    """
+
+    def __init__(self, manager=None, executor=None):
+        self.manager = manager or TaskManager()
+        self.executor = executor
+        self._lock = ReadWriteLock()
+        self._queue = None
+        self._writer = None
+
+    async def _read(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(method, *args, **kwargs)
+        async with self._lock.read():
+            return await loop.run_in_executor(self.executor, call)
+
+    async def _write(self, method, *args, **kwargs):
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((functools.partial(method, *args, **kwargs),
+                               future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            items = [item]
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    self._queue.put_nowait(None)
+                    break
+                items.append(item)
+            async with self._lock.write():
+                try:
+                    outcomes = await loop.run_in_executor(
+                        self.executor, self._apply, items)
+                except Exception as e:
+                    outcomes = [(None, e)] * len(items)
+            for (_, future), (result, error) in zip(items, outcomes):
+                if future.cancelled():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, items):
+        """Run queued writes in one batch; return (result, error) pairs.
+
+        A write that raises fails on its own; with handlers that save each
+        write as it is made, the ones before it are already stored. Only
+        when saving the whole batch fails does every write fail, and
+        TaskManager.batch() then drops the cached tasks.
+        """
+        outcomes = []
+        with self.manager.batch():
+            for call, _ in items:
+                try:
+                    outcomes.append((call(), None))
+                except ValueError as e:
+                    outcomes.append((None, e))
+                except Exception as e:
+                    # It may have stopped between saving and caching.
+                    self.manager.store.invalidate()
+                    outcomes.append((None, e))
+        return outcomes
+
+    async def close(self):
+        """Finish the queued writes and stop the writer task."""
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+
+    def subscribe(self, callback):
+        """Call callback(event) on the event loop after every write."""
+        loop = asyncio.get_running_loop()
+        self.manager.subscribe(
+            lambda event: loop.call_soon_threadsafe(callback, event))
+
+    # Reads
+
+    async def get_all_tasks(self):
+        return await self._read(self.manager.get_all_tasks)
+
+    async def get_task_by_id(self, task_id):
+        return await self._read(self.manager.get_task_by_id, task_id)
+
+    async def filter_tasks(self, status=None, priority=None, due_before=None):
+        return await self._read(self.manager.filter_tasks, status=status,
+                                priority=priority, due_before=due_before)
+
+    async def sort_tasks(self, by='created_date', reverse=False):
+        return await self._read(self.manager.sort_tasks, by=by,
+                                reverse=reverse)
+
+    async def search(self, query, limit=10):
+        return await self._read(self.manager.search, query, limit)
+
+    async def stats(self):
+        return await self._read(self.manager.stats)
+
+    # Writes
+
+    async def add_task(self, title, description, priority="Medium",
+                       due_date=None):
+        return await self._write(self.manager.add_task, title, description,
+                                 priority, due_date)
+
+    async def update_task(self, task_id, **kwargs):
+        return await self._write(self.manager.update_task, task_id, **kwargs)
+
+    async def patch_task(self, task_id, **changes):
+        return await self._write(self.manager.patch_task, task_id, **changes)
+
+    async def delete_task(self, task_id):
+        return await self._write(self.manager.delete_task, task_id)
+
+    async def mark_complete(self, task_id):
+        return await self._write(self.manager.mark_complete, task_id)
+
+    async def add_tasks(self, task_specs):
+        return await self._write(self.manager.add_tasks, task_specs)
+
+    async def update_tasks(self, updates):
+        return await self._write(self.manager.update_tasks, updates)
+
+    async def delete_tasks(self, task_ids):
+        return await self._write(self.manager.delete_tasks, task_ids)
+
+    async def mark_complete_many(self, task_ids):
+        return await self._write(self.manager.mark_complete_many, task_ids)
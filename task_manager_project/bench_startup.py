@@ -0,0 +1,120 @@
+"""Measure how long the task CLI takes to start and run a short command.
+
+Each command is run several times in a scratch directory holding a
+generated tasks.json, once plainly for wall time and once under
+``python -X importtime`` for the cumulative import cost. The medians are
+printed and, with --history, appended with the current git commit to a
+JSON-lines file so that start-up cost can be tracked over time:
+
+    python bench_startup.py --tasks 10000 --runs 15 --history startup.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(HERE, 'main.py')
+
+COMMANDS = {
+    'help': ['--help'],
+    'list': ['list'],
+    'filter': ['filter', '--status', 'Pending', '--priority', 'High'],
+    'add': ['add', '--title', 'Benchmark task'],
+}
+
+
+def make_tasks(path, count):
+    priorities = ['Low', 'Medium', 'High']
+    tasks = [{
+        'id': i,
+        'title': f"Task {i}",
+        'description': "Generated for the start-up benchmark",
+        'priority': priorities[i % 3],
+        'due_date': f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        'status': 'Completed' if i % 4 == 0 else 'Pending',
+        'created_date': '2024-01-01',
+    } for i in range(1, count + 1)]
+    with open(path, 'w') as f:
+        json.dump(tasks, f, indent=4)
+
+
+def import_time_us(stderr):
+    """Sum the cumulative import time of the top-level imports."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Nested imports are indented; their time is already included.
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total
+
+
+def run(args, cwd, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += [MAIN] + args
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    return time.perf_counter() - start, proc.stderr
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--history',
+                        help="append the results to this JSON-lines file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        tasks_file = os.path.join(cwd, 'tasks.json')
+        for name, command in COMMANDS.items():
+            make_tasks(tasks_file, args.tasks)
+            run(command, cwd)  # warm the OS cache and the parse cache
+            walls, imports = [], []
+            for _ in range(args.runs):
+                walls.append(run(command, cwd)[0])
+                imports.append(import_time_us(
+                    run(command, cwd, importtime=True)[1]))
+            results[name] = {
+                'wall_ms': round(statistics.median(walls) * 1000, 2),
+                'import_ms': round(statistics.median(imports) / 1000, 2),
+            }
+
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'tasks': args.tasks,
+        'runs': args.runs,
+        'results': results,
+    }
+    for name, result in results.items():
+        print(f"{name:8} wall {result['wall_ms']:8.2f} ms   "
+              f"imports {result['import_ms']:7.2f} ms")
+    if args.history:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Benchmark the storage backends and TaskManager operations.
+
+A synthetic task set of the requested size is generated with a fixed
+seed, loaded into each backend in a scratch directory, and then every
+operation is timed for a number of iterations. Results are printed as a
+table and, with --output, written as JSON so that runs from different
+commits can be compared:
+
+    python bench_storage.py --sizes 1000 100000 1000000 \\
+        --backends json sqlite --output bench.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from business_logic import TaskManager
+from constants import PRIORITIES, STATUSES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OPERATIONS = ('add', 'update', 'delete', 'get_next_id', 'filter_tasks',
+              'sort_tasks')
+
+
+def make_tasks(count, seed=0):
+    """Return count reproducible task dicts."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(1, count + 1):
+        tasks.append({
+            'id': i,
+            'title': f"Task {i}",
+            'description': f"Synthetic task number {i}",
+            'priority': rng.choice(PRIORITIES),
+            'due_date': None if rng.random() < 0.1 else
+            f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'status': rng.choice(STATUSES),
+            'created_date': f"2024-{rng.randint(1, 12):02d}-"
+                            f"{rng.randint(1, 28):02d}",
+        })
+    return tasks
+
+
+def make_handler(backend, directory, tasks):
+    """Create a handler of the given backend pre-loaded with tasks."""
+    if backend == 'json':
+        from data_access import FileHandler
+        handler = FileHandler(os.path.join(directory, 'tasks.json'))
+        handler.write_tasks(tasks)
+    elif backend == 'log':
+        from log_storage import LogFileHandler
+        handler = LogFileHandler(os.path.join(directory, 'tasks.log'))
+        handler.save_tasks(tasks)
+    elif backend == 'sqlite':
+        from sqlite_storage import SQLiteHandler
+        handler = SQLiteHandler(os.path.join(directory, 'tasks.db'))
+        handler.save_tasks(tasks)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    return handler
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def summarize(samples):
+    if not samples:
+        return {'iterations': 0, 'ops_per_sec': None, 'p50_ms': None,
+                'p99_ms': None, 'max_ms': None}
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        'iterations': len(samples),
+        'ops_per_sec': round(len(samples) / total, 2) if total else None,
+        'p50_ms': round(statistics.median(samples) * 1000, 4),
+        'p99_ms': round(samples[min(len(samples) - 1,
+                                    int(len(samples) * 0.99))] * 1000, 4),
+        'max_ms': round(samples[-1] * 1000, 4),
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_backend(backend, size, iterations, seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        handler = make_handler(backend, directory, make_tasks(size, seed))
+        tm = TaskManager(handler)
+
+        start = time.perf_counter()
+        tm.get_all_tasks()
+        results = {'cold_load': summarize([time.perf_counter() - start])}
+
+        ids = [t.id for t in tm.get_all_tasks()]
+        rng.shuffle(ids)
+        # Each deleted task must exist, so deletes never reuse an id; with
+        # fewer than 2 * iterations tasks the delete phase runs fewer times.
+        to_update = ids[:iterations]
+        to_delete = ids[len(to_update):len(to_update) + iterations]
+        counts = dict.fromkeys(OPERATIONS, iterations)
+        counts['update'] = len(to_update) and iterations
+        counts['delete'] = len(to_delete)
+
+        ops = {
+            'add': lambda i: tm.add_task(f"Bench {i}", "Added by benchmark",
+                                         rng.choice(PRIORITIES)),
+            'update': lambda i: tm.update_task(
+                to_update[i % len(to_update)],
+                priority=rng.choice(PRIORITIES)),
+            'delete': lambda i: tm.delete_task(to_delete[i]),
+            'get_next_id': lambda i: handler.get_next_id(),
+            'filter_tasks': lambda i: tm.filter_tasks(
+                status=rng.choice(STATUSES), priority=rng.choice(PRIORITIES)),
+            'sort_tasks': lambda i: tm.sort_tasks(
+                by=rng.choice(('created_date', 'priority', 'due_date'))),
+        }
+        for name in OPERATIONS:
+            results[name] = summarize(timed(ops[name], counts[name]))
+        close = getattr(handler, 'close', None)
+        if close:
+            close()
+    return results
+
+
+def run_isolated(backend, size, iterations, seed):
+    """Run one backend/size in a fresh interpreter so peak RSS is its own."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--single', backend,
+           str(size), '--iterations', str(iterations), '--seed', str(seed)]
+    proc = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True,
+                          check=True)
+    return json.loads(proc.stdout)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 100000])
+    parser.add_argument('--backends', nargs='+', default=['json'],
+                        choices=('json', 'log', 'sqlite'))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--single', nargs=2, metavar=('BACKEND', 'SIZE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        backend, size = args.single[0], int(args.single[1])
+        results = bench_backend(backend, size, args.iterations, args.seed)
+        results['peak_rss_kb'] = peak_rss_kb()
+        print(json.dumps(results))
+        return
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'iterations': args.iterations,
+        'seed': args.seed,
+        'runs': [],
+    }
+    for size in args.sizes:
+        for backend in args.backends:
+            results = run_isolated(backend, size, args.iterations, args.seed)
+            report['runs'].append({'backend': backend, 'size': size,
+                                   'results': results})
+            print(f"\n{backend} backend, {size} tasks "
+                  f"(peak RSS {results['peak_rss_kb']} KiB)")
+            print(f"  {'operation':14} {'ops/s':>10} {'p50 ms':>10} "
+                  f"{'p99 ms':>10}")
+            for name in ('cold_load',) + OPERATIONS:
+                r = results[name]
+                print(f"  {name:14} {r['ops_per_sec']!s:>10} "
+                      f"{r['p50_ms']!s:>10} {r['p99_ms']!s:>10}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,69 @@
-import datetime
+import contextlib
+from config import CHANGE_FEED_FILENAME, METRICS_ENABLED
 from constants import TASK_MAX_LENGTH, PRIORITIES, STATUSES, DATE_FORMAT
-from data_access import FileHandler
+from data_access import create_file_handler
+from task_store import TaskStore
+from utilities import lazy_datetime as _dt
+
+# Priority and status are stored as small ints and dates as ordinals.
+# Only strings are encoded: unknown strings are kept as given, and values
+# of any other type are wrapped in _Raw so that an int is never taken for
+# a code. Either way validate() rejects them, but a stored record holding
+# one still loads.
+PRIORITY_CODES = {p: i for i, p in enumerate(PRIORITIES)}
+STATUS_CODES = {s: i for i, s in enumerate(STATUSES)}
+
+class _Raw:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+def _encode(value, codes):
+    if type(value) is not str:
+        return _Raw(value)
+    return codes.get(value, value)
+
+def _decode(value, names):
+    if type(value) is int:
+        return names[value]
+    return value.value if type(value) is _Raw else value
+
+# Dates repeat a lot, so conversions in both directions are memoised.
+# Only strings that round-trip exactly through isoformat() (DATE_FORMAT)
+# become ordinals.
+_ordinals = {}
+_date_strings = {}
+
+def _encode_date(value):
+    if type(value) is not str:
+        return value if value is None else _Raw(value)
+    ordinal = _ordinals.get(value)
+    if ordinal is None:
+        try:
+            date = _dt().date.fromisoformat(value)
+        except ValueError:
+            return value
+        if date.isoformat() != value:
+            return value
+        ordinal = date.toordinal()
+        _ordinals[value] = ordinal
+        _date_strings[ordinal] = value
+    return ordinal
+
+def _decode_date(value):
+    if type(value) is not int:
+        return value.value if type(value) is _Raw else value
+    string = _date_strings.get(value)
+    if string is None:
+        string = _dt().date.fromordinal(value).isoformat()
+        _date_strings[value] = string
+    return string
 
 class Task:
+    __slots__ = ('id', 'title', 'description', '_priority', '_due_date',
+                 '_status', '_created_date')
+
     def __init__(self, id=None, title="", description="", priority="Medium", due_date=None, status="Pending", created_date=None):
         self.id = id
         self.title = title
@@ -10,7 +71,72 @@ class Task:
         self.priority = priority
         self.due_date = due_date
         self.status = status
-        self.created_date = created_date or datetime.date.today().strftime(DATE_FORMAT)
+        if created_date:
+            self.created_date = created_date
+        else:
+            self._created_date = _dt().date.today().toordinal()
+
+    @property
+    def priority(self):
+        return _decode(self._priority, PRIORITIES)
+
+    @priority.setter
+    def priority(self, value):
+        self._priority = _encode(value, PRIORITY_CODES)
+
+    @property
+    def status(self):
+        return _decode(self._status, STATUSES)
+
+    @status.setter
+    def status(self, value):
+        self._status = _encode(value, STATUS_CODES)
+
+    @property
+    def due_date(self):
+        return _decode_date(self._due_date)
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date = _encode_date(value)
+
+    @property
+    def created_date(self):
+        return _decode_date(self._created_date)
+
+    @created_date.setter
+    def created_date(self, value):
+        self._created_date = _encode_date(value)
+
+    @property
+    def priority_rank(self):
+        """Position of the priority in PRIORITIES (0 if unknown)."""
+        p = self._priority
+        return p if type(p) is int else 0
+
+    @property
+    def due_ordinal(self):
+        """The due date as a date ordinal, or None if unset or invalid."""
+        d = self._due_date
+        return d if type(d) is int else None
+
+    @property
+    def created_ordinal(self):
+        """The created date as a date ordinal, or None if invalid."""
+        c = self._created_date
+        return c if type(c) is int else None
+
+    def copy(self):
+        """Return an independent copy; the fields are not encoded again."""
+        task = Task.__new__(Task)
+        task.id = self.id
+        task.title = self.title
+        task.description = self.description
+        task._priority = self._priority
+        task._due_date = self._due_date
+        task._status = self._status
+        task._created_date = self._created_date
+        return task
 
     def to_dict(self):
         return {
@@ -36,17 +162,26 @@ class Task:
         )
 
     def validate(self):
-        if not self.title or len(self.title) > TASK_MAX_LENGTH:
+        if not isinstance(self.title, str) or not self.title or \
+                len(self.title) > TASK_MAX_LENGTH:
             raise ValueError("Title is required and must be <= 100 characters")
-        if len(self.description) > TASK_MAX_LENGTH:
+        if not isinstance(self.description, str) or \
+                len(self.description) > TASK_MAX_LENGTH:
             raise ValueError("Description must be <= 100 characters")
-        if self.priority not in PRIORITIES:
+        if type(self._priority) is not int or \
+                not 0 <= self._priority < len(PRIORITIES):
             raise ValueError(f"Priority must be one of {PRIORITIES}")
-        if self.status not in STATUSES:
+        if type(self._status) is not int or \
+                not 0 <= self._status < len(STATUSES):
             raise ValueError(f"Status must be one of {STATUSES}")
-        if self.due_date:
+        if type(self._due_date) is int:
+            if not 1 <= self._due_date <= _dt().date.max.toordinal():
+                raise ValueError("Due date must be in YYYY-MM-DD format")
+        elif type(self._due_date) is _Raw:
+            raise ValueError("Due date must be in YYYY-MM-DD format")
+        elif self._due_date:
             try:
-                datetime.datetime.strptime(self.due_date, DATE_FORMAT)
+                _dt().datetime.strptime(self._due_date, DATE_FORMAT)
             except ValueError:
                 raise ValueError("Due date must be in YYYY-MM-DD format")
 
@@ -54,60 +189,333 @@ class Task:
         return f"{self.id}: {self.title} - {self.description} (Priority: {self.priority}, Status: {self.status}, Due: {self.due_date})"
 
 class TaskManager:
-    def __init__(self, file_handler=None):
-        self.file_handler = file_handler or FileHandler()
+    def __init__(self, file_handler=None, change_feed=None):
+        self.file_handler = file_handler or create_file_handler()
+        self.store = TaskStore(self.file_handler, Task.from_dict)
+        if change_feed is None and CHANGE_FEED_FILENAME:
+            from change_feed import ChangeFeed
+            change_feed = ChangeFeed()
+        self.change_feed = change_feed
+        self._subscribers = []
+        self._seq = 0
+        self._pending_events = None
+        if METRICS_ENABLED:
+            from metrics import instrument
+            instrument(self)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group the writes made inside the block into a single save.
+
+        Change events are held back until the block ends. The writes are
+        only coalesced with file handlers that support batching; with
+        other handlers each write is saved as it is made, so the events
+        are published even if the block fails.
+        """
+        if self._pending_events is not None:
+            yield
+            return
+        self._pending_events = []
+        rolled_back = False
+        try:
+            handler_batch = getattr(self.file_handler, 'batch', None)
+            if handler_batch is None:
+                yield
+            else:
+                try:
+                    with handler_batch():
+                        # Loaded under the handler's lock and then kept in
+                        # step with every write, the store is the source of
+                        # truth until the batch is saved.
+                        self.store.refresh()
+                        yield
+                except BaseException:
+                    # Nothing was saved, so the cache is ahead of the file
+                    # and the events describe writes that never happened.
+                    rolled_back = True
+                    self.store.invalidate()
+                    raise
+                self.store.mark_written()
+        finally:
+            events, self._pending_events = self._pending_events, None
+            if not rolled_back:
+                self._publish(events)
+
+    def subscribe(self, callback):
+        """Call callback(event) after every add, update and delete.
+
+        Events are dicts with 'seq', 'op' ('add', 'update' or 'delete'),
+        'id', 'task' (the task dict after the change, None for deletes)
+        and, for updates, 'fields' (only the changed fields). With a
+        change feed configured, 'seq' is the feed cursor just past the
+        event; otherwise it counts the events of this TaskManager.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _emit(self, events):
+        if self._pending_events is not None:
+            self._pending_events.extend(events)
+        else:
+            self._publish(events)
+
+    def _publish(self, events):
+        if not events:
+            return
+        if self.change_feed is not None:
+            self.change_feed.append(events)
+        else:
+            for event in events:
+                self._seq += 1
+                event['seq'] = self._seq
+        for callback in list(self._subscribers):
+            for event in events:
+                callback(event)
 
     def get_all_tasks(self):
-        task_dicts = self.file_handler.load_tasks()
-        return [Task.from_dict(td) for td in task_dicts]
+        return self.store.tasks()
 
     def get_task_by_id(self, task_id):
-        tasks = self.get_all_tasks()
-        for task in tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self.store.get(task_id)
+
+    def _reserve_ids(self, count):
+        reserve_ids = getattr(self.file_handler, 'reserve_ids', None)
+        if reserve_ids is None:
+            return self.file_handler.get_next_id()
+        return reserve_ids(count)
 
     def add_task(self, title, description, priority="Medium", due_date=None):
-        task_id = self.file_handler.get_next_id()
-        task = Task(id=task_id, title=title, description=description, priority=priority, due_date=due_date)
+        self.store.refresh_if_loaded()
+        task = Task(title=title, description=description, priority=priority,
+                    due_date=due_date)
+        # Validate first so that rejected tasks do not use up an id.
         task.validate()
-        self.file_handler.save_task(task.to_dict())
+        task.id = self._reserve_ids(1)
+        task_dict = task.to_dict()
+        self.file_handler.save_task(task_dict)
+        self.store.put(task)
+        # Events get copies: handlers may keep and later change the dicts
+        # they are given.
+        self._emit([{'op': 'add', 'id': task.id, 'task': dict(task_dict)}])
+        return task
+
+    @staticmethod
+    def _apply_changes(current, changes):
+        """Return (changed copy, {field: new value}) for a task.
+
+        The copy is validated, so a bad change leaves the cached task
+        intact. Unknown fields and 'id' are ignored.
+        """
+        before = current.to_dict()
+        task = Task.from_dict(before)
+        for key, value in changes.items():
+            if key in before and key != 'id':
+                setattr(task, key, value)
+        task.validate()
+        after = task.to_dict()
+        return task, {k: v for k, v in after.items() if before[k] != v}
+
+    def patch_task(self, task_id, **changes):
+        """Change some fields of a task, writing only what changed.
+
+        The task is found through the cache's id index, and backends that
+        support it record just the changed fields rather than the task.
+        """
+        current = self.store.get(task_id)
+        if current is None:
+            raise ValueError("Task not found")
+        task, fields = self._apply_changes(current, changes)
+        if not fields:
+            return current
+        patch = getattr(self.file_handler, 'patch_task', None)
+        if patch is not None:
+            patch(task_id, fields, expected=current.to_dict())
+        else:
+            self.file_handler.update_task(task_id, task.to_dict(),
+                                          expected=current.to_dict())
+        self.store.put(task)
+        self._emit([{'op': 'update', 'id': task_id, 'task': task.to_dict(),
+                     'fields': fields}])
         return task
 
     def update_task(self, task_id, **kwargs):
-        tasks = self.get_all_tasks()
-        for task in tasks:
-            if task.id == task_id:
-                for key, value in kwargs.items():
-                    if hasattr(task, key):
-                        setattr(task, key, value)
-                task.validate()
-                self.file_handler.update_task(task_id, task.to_dict())
-                return task
-        raise ValueError("Task not found")
+        return self.patch_task(task_id, **kwargs)
 
     def delete_task(self, task_id):
+        self.store.refresh_if_loaded()
         self.file_handler.delete_task(task_id)
+        self.store.remove(task_id)
+        self._emit([{'op': 'delete', 'id': task_id, 'task': None}])
 
     def mark_complete(self, task_id):
         return self.update_task(task_id, status="Completed")
 
-    def filter_tasks(self, status=None, priority=None):
-        tasks = self.get_all_tasks()
-        if status:
-            tasks = [t for t in tasks if t.status == status]
-        if priority:
-            tasks = [t for t in tasks if t.priority == priority]
-        return tasks
+    def add_tasks(self, task_specs):
+        """Add many tasks with one block of ids and a single write.
+
+        task_specs are dicts with title, description and optionally
+        priority and due_date. Every spec is validated first; invalid ones
+        are skipped. Returns one {'id', 'task', 'error'} dict per spec.
+        """
+        self.store.refresh_if_loaded()
+        results, valid = [], []
+        for spec in task_specs:
+            try:
+                task = Task(title=spec.get('title') or '',
+                            description=spec.get('description') or '',
+                            priority=spec.get('priority') or 'Medium',
+                            due_date=spec.get('due_date'))
+                task.validate()
+            except ValueError as e:
+                results.append({'id': None, 'task': None, 'error': str(e)})
+                continue
+            valid.append(task)
+            results.append({'id': None, 'task': task, 'error': None})
+        if valid:
+            first_id = self._reserve_ids(len(valid))
+            for offset, task in enumerate(valid):
+                task.id = first_id + offset
+            for result in results:
+                if result['task'] is not None:
+                    result['id'] = result['task'].id
+            task_dicts = [t.to_dict() for t in valid]
+            self.file_handler.save_tasks(task_dicts)
+            self.store.put_many(valid)
+            self._emit([{'op': 'add', 'id': d['id'], 'task': dict(d)}
+                        for d in task_dicts])
+        return results
+
+    def update_tasks(self, updates):
+        """Apply many updates with a single write.
+
+        updates are dicts holding the task 'id' plus the fields to change.
+        Returns one {'id', 'task', 'error'} dict per update.
+        """
+        self.store.refresh()
+        results, valid, patches = [], {}, {}
+        for update in updates:
+            changes = dict(update)
+            task_id = changes.pop('id', None)
+            # Later updates to the same task build on earlier ones.
+            current = valid.get(task_id) or self.store.get(task_id)
+            if current is None:
+                results.append({'id': task_id, 'task': None,
+                                'error': "Task not found"})
+                continue
+            try:
+                task, fields = self._apply_changes(current, changes)
+            except ValueError as e:
+                results.append({'id': task_id, 'task': None, 'error': str(e)})
+                continue
+            valid[task_id] = task
+            patches.setdefault(task_id, {}).update(fields)
+            results.append({'id': task_id, 'task': task, 'error': None})
+        patches = {i: fields for i, fields in patches.items() if fields}
+        if patches:
+            if hasattr(self.file_handler, 'patch_tasks'):
+                self.file_handler.patch_tasks(patches)
+            else:
+                self.file_handler.update_tasks(
+                    [valid[i].to_dict() for i in patches])
+            self.store.put_many(valid[i] for i in patches)
+            self._emit([{'op': 'update', 'id': i, 'task': valid[i].to_dict(),
+                         'fields': fields}
+                        for i, fields in patches.items()])
+        return results
+
+    def delete_tasks(self, task_ids):
+        """Delete many tasks with a single write.
+
+        Returns one {'id', 'task', 'error'} dict per id.
+        """
+        self.store.refresh()
+        # found keeps the ids in order; seen makes the duplicate check O(1).
+        results, found, seen = [], [], set()
+        for task_id in task_ids:
+            task = self.store.get(task_id)
+            if task is None or task_id in seen:
+                results.append({'id': task_id, 'task': None,
+                                'error': "Task not found"})
+                continue
+            found.append(task_id)
+            seen.add(task_id)
+            results.append({'id': task_id, 'task': task, 'error': None})
+        if found:
+            self.file_handler.delete_tasks(found)
+            self.store.remove_many(found)
+            self._emit([{'op': 'delete', 'id': i, 'task': None}
+                        for i in found])
+        return results
+
+    def mark_complete_many(self, task_ids):
+        """Mark many tasks complete; only their status is written."""
+        return self.update_tasks([{'id': task_id, 'status': "Completed"}
+                                  for task_id in task_ids])
+
+    def filter_tasks(self, status=None, priority=None, due_before=None):
+        return self.store.filter(status=status, priority=priority,
+                                 due_before=due_before)
+
+    def stats(self):
+        """Return {'total', 'by_status', 'by_priority', 'overdue'} counts.
+
+        Overdue tasks are those not completed whose due date has passed.
+        """
+        return self.store.stats()
+
+    def search(self, query, limit=10):
+        """Full-text search over titles and descriptions, best match first.
+
+        Every word of the query must match the start of a word in the
+        task; title matches rank above description matches.
+        """
+        return self.store.search(query, limit)
+
+    def iter_tasks(self, status=None, priority=None):
+        """Stream tasks straight from storage, bypassing the cache.
+
+        Only one task is held in memory at a time, so this suits exports
+        and scans of files too large to load whole.
+        """
+        # Sharded storage can skip the shards of other statuses.
+        select = getattr(self.file_handler, 'select_tasks', None)
+        if select is not None:
+            task_dicts = select(status=status)
+        else:
+            task_dicts = self.file_handler.iter_tasks()
+        for task_dict in task_dicts:
+            task = Task.from_dict(task_dict)
+            if status and task.status != status:
+                continue
+            if priority and task.priority != priority:
+                continue
+            yield task
+
+    def archive_completed(self, before=None):
+        """Move completed tasks out of the hot storage; return how many.
+
+        With before ('YYYY-MM'), only tasks created before that month are
+        moved. Only storage backends with an archive (the sharded one)
+        support it.
+        """
+        archive = getattr(self.file_handler, 'archive_completed', None)
+        if archive is None:
+            raise ValueError("The storage backend does not support archiving")
+        return archive(before)
+
+    def export_tasks(self, filename, status=None, priority=None):
+        """Stream the (optionally filtered) tasks to a JSON file."""
+        from json_stream import write_json_array
+        with open(filename, 'w') as f:
+            tasks = self.iter_tasks(status, priority)
+            write_json_array(f, (t.to_dict() for t in tasks))
 
     def sort_tasks(self, by='created_date', reverse=False):
+        tasks = self.store.sorted_by(by, reverse=reverse)
+        if tasks is not None:
+            return tasks
         tasks = self.get_all_tasks()
-        if by == 'priority':
-            priority_order = {p: i for i, p in enumerate(PRIORITIES)}
-            tasks.sort(key=lambda t: priority_order.get(t.priority, 0), reverse=reverse)
-        elif by == 'due_date':
-            tasks.sort(key=lambda t: t.due_date or '9999-99-99', reverse=reverse)
-        else:
-            tasks.sort(key=lambda t: getattr(t, by, ''), reverse=reverse)
-        return tasks
\ No newline at end of file
+        tasks.sort(key=lambda t: getattr(t, by, ''), reverse=reverse)
+        return tasks
@@ -0,0 +1,87 @@
+import json
+import os
+import time
+from config import CHANGE_FEED_FILENAME
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
+
+
+class ChangeFeed:
+    """Persisted feed of task changes, one JSON line per event.
+
+    Events look like {'op': 'add' | 'update' | 'delete', 'id': ...,
+    'task': ..., 'fields': ...}: 'task' is the task after the change
+    (None for deletes) and 'fields' holds only what an update changed.
+
+    An event's sequence number is the byte offset just past its line, so
+    sequence numbers only grow and a reader can resume from the last one
+    it saw: read(cursor) returns exactly the events written after it.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or CHANGE_FEED_FILENAME
+        if not self.filename:
+            raise ValueError("No change feed file "
+                             "(set CHANGE_FEED_FILENAME in config.py)")
+
+    def append(self, events):
+        """Write events to the feed and set their 'seq'."""
+        if not events:
+            return
+        lines = [(json.dumps(e) + '\n').encode('utf-8') for e in events]
+        with open(self.filename, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            # Another process may have appended since the file was opened.
+            seq = f.seek(0, os.SEEK_END)
+            f.write(b''.join(lines))
+            f.flush()
+        for event, line in zip(events, lines):
+            seq += len(line)
+            event['seq'] = seq
+
+    def latest(self):
+        """Return the cursor for the end of the feed."""
+        try:
+            return os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, cursor=0, limit=None):
+        """Return the events written after cursor, oldest first."""
+        events = []
+        try:
+            f = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return events
+        with f:
+            f.seek(cursor)
+            for line in f:
+                # A line still being written is picked up next time.
+                if not line.endswith(b'\n'):
+                    break
+                cursor += len(line)
+                event = json.loads(line)
+                event['seq'] = cursor
+                events.append(event)
+                if limit is not None and len(events) >= limit:
+                    break
+        return events
+
+    def watch(self, cursor=None, interval=1.0):
+        """Yield events as they are written, polling every interval seconds.
+
+        With no cursor only events written from now on are yielded.
+        """
+        if cursor is None:
+            cursor = self.latest()
+        while True:
+            events = self.read(cursor)
+            for event in events:
+                cursor = event['seq']
+                yield event
+            if not events:
+                time.sleep(interval)
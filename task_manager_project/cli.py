@@ -0,0 +1,314 @@
+"""Non-interactive command line interface for scripts and automation.
+
+Every subcommand writes NDJSON (one JSON object per line) to stdout.
+Commands that take several records read them from stdin as a JSON array,
+a single JSON object, NDJSON or CSV with a header row, e.g.
+
+    python main.py import < tasks.csv
+    python main.py list --status Pending --priority High
+    python main.py batch < operations.ndjson
+    python main.py changes --since 1024 --follow
+"""
+import argparse
+import json
+import sys
+from business_logic import TaskManager
+
+INT_FIELDS = ('id',)
+TEXT_FIELDS = ('title', 'description', 'priority', 'due_date', 'status', 'op')
+
+
+def read_records(stream, fmt='auto'):
+    """Parse JSON, NDJSON or CSV records from a text stream.
+
+    Raises ValueError unless every record is an object whose known fields
+    have the right type.
+    """
+    text = stream.read()
+    if fmt == 'auto':
+        stripped = text.lstrip()
+        fmt = 'json' if stripped[:1] in ('[', '{') or not stripped else 'csv'
+    if fmt == 'csv':
+        import csv
+        import io
+        records = list(csv.DictReader(io.StringIO(text)))
+    else:
+        try:
+            data = json.loads(text) if text.strip() else []
+        except json.JSONDecodeError:
+            data = [json.loads(line) for line in text.splitlines()
+                    if line.strip()]
+        records = data if isinstance(data, list) else [data]
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError("Each record must be a JSON object")
+        for key, value in list(record.items()):
+            if value == '' and fmt == 'csv':
+                record[key] = None
+            elif key in INT_FIELDS and isinstance(value, str):
+                try:
+                    record[key] = int(value)
+                except ValueError:
+                    raise ValueError(
+                        f"'{key}' must be an integer, not {value!r}")
+        for key in INT_FIELDS:
+            value = record.get(key)
+            if value is not None and type(value) is not int:
+                raise ValueError(f"'{key}' must be an integer, not {value!r}")
+        for key in TEXT_FIELDS:
+            value = record.get(key)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"'{key}' must be a string, not {value!r}")
+    return records
+
+
+def emit(obj, out):
+    out.write(json.dumps(obj) + '\n')
+
+
+def emit_tasks(tasks, out):
+    for task in tasks:
+        emit(task.to_dict(), out)
+
+
+def emit_results(results, out):
+    """Emit per-item results; return True if every item succeeded."""
+    ok = True
+    for result in results:
+        if result['error']:
+            ok = False
+            emit({'ok': False, 'id': result['id'],
+                  'error': result['error']}, out)
+        else:
+            emit({'ok': True, 'id': result['id'],
+                  'task': result['task'].to_dict()
+                  if result['task'] else None}, out)
+    return ok
+
+
+def cmd_add(tm, args, out):
+    spec = {'title': args.title, 'description': args.description,
+            'priority': args.priority, 'due_date': args.due_date}
+    return emit_results(tm.add_tasks([spec]), out)
+
+
+def cmd_import(tm, args, out):
+    return emit_results(tm.add_tasks(read_records(args.input, args.format)),
+                        out)
+
+
+def cmd_update(tm, args, out):
+    if args.id is not None:
+        update = {'id': args.id}
+        for field in ('title', 'description', 'priority', 'due_date',
+                      'status'):
+            if getattr(args, field) is not None:
+                update[field] = getattr(args, field)
+        updates = [update]
+    else:
+        updates = read_records(args.input, args.format)
+    return emit_results(tm.update_tasks(updates), out)
+
+
+def cmd_delete(tm, args, out):
+    ids = args.ids or [r.get('id')
+                       for r in read_records(args.input, args.format)]
+    return emit_results(tm.delete_tasks(ids), out)
+
+
+def cmd_complete(tm, args, out):
+    return emit_results(tm.mark_complete_many(args.ids), out)
+
+
+def cmd_list(tm, args, out):
+    emit_tasks(tm.get_all_tasks(), out)
+    return True
+
+
+def cmd_filter(tm, args, out):
+    emit_tasks(tm.filter_tasks(status=args.status, priority=args.priority,
+                               due_before=args.due_before), out)
+    return True
+
+
+def cmd_sort(tm, args, out):
+    emit_tasks(tm.sort_tasks(by=args.by, reverse=args.reverse), out)
+    return True
+
+
+def cmd_stats(tm, args, out):
+    emit(tm.stats(), out)
+    return True
+
+
+def cmd_search(tm, args, out):
+    emit_tasks(tm.search(' '.join(args.query), limit=args.limit), out)
+    return True
+
+
+def cmd_export(tm, args, out):
+    if args.output:
+        tm.export_tasks(args.output, status=args.status,
+                        priority=args.priority)
+        emit({'ok': True, 'output': args.output}, out)
+    else:
+        emit_tasks(tm.iter_tasks(status=args.status, priority=args.priority),
+                   out)
+    return True
+
+
+def cmd_changes(tm, args, out):
+    """Emit change events after --since; with --follow, keep waiting."""
+    if tm.change_feed is None:
+        raise ValueError("The change feed is disabled "
+                         "(set CHANGE_FEED_FILENAME in config.py)")
+    if args.follow:
+        for event in tm.change_feed.watch(args.since, args.interval):
+            emit(event, out)
+            out.flush()
+    else:
+        for event in tm.change_feed.read(args.since):
+            emit(event, out)
+    return True
+
+
+def cmd_archive(tm, args, out):
+    emit({'ok': True, 'archived': tm.archive_completed(args.before)}, out)
+    return True
+
+
+def cmd_batch(tm, args, out):
+    """Run NDJSON operations such as {"op": "add", "title": "..."}."""
+    ok = True
+    with tm.batch():
+        for record in read_records(args.input, 'json'):
+            op = record.pop('op', None)
+            if op == 'add':
+                ok &= emit_results(tm.add_tasks([record]), out)
+            elif op == 'update':
+                ok &= emit_results(tm.update_tasks([record]), out)
+            elif op == 'delete':
+                ok &= emit_results(tm.delete_tasks([record.get('id')]), out)
+            elif op == 'complete':
+                ok &= emit_results(tm.mark_complete_many([record.get('id')]),
+                                   out)
+            else:
+                ok = False
+                emit({'ok': False, 'error': f"Unknown op: {op}"}, out)
+    return ok
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py', description="Task manager command line interface.")
+    parser.add_argument('--metrics', choices=('prometheus', 'json'),
+                        help="print operation metrics to stderr when done")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def with_input(p):
+        p.add_argument('--format', choices=('auto', 'json', 'csv'),
+                       default='auto', help="format of the records on stdin")
+        p.set_defaults(input=sys.stdin)
+        return p
+
+    p = sub.add_parser('add', help="add a single task")
+    p.add_argument('--title', required=True)
+    p.add_argument('--description', default='')
+    p.add_argument('--priority', default='Medium')
+    p.add_argument('--due-date', dest='due_date')
+    p.set_defaults(func=cmd_add)
+
+    p = with_input(sub.add_parser('import', help="add tasks read from stdin"))
+    p.set_defaults(func=cmd_import)
+
+    p = with_input(sub.add_parser(
+        'update', help="update one task, or the records read from stdin"))
+    p.add_argument('--id', type=int)
+    p.add_argument('--title')
+    p.add_argument('--description')
+    p.add_argument('--priority')
+    p.add_argument('--due-date', dest='due_date')
+    p.add_argument('--status')
+    p.set_defaults(func=cmd_update)
+
+    p = with_input(sub.add_parser(
+        'delete', help="delete tasks by id (or ids read from stdin)"))
+    p.add_argument('ids', nargs='*', type=int)
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser('complete', help="mark tasks complete")
+    p.add_argument('ids', nargs='+', type=int)
+    p.set_defaults(func=cmd_complete)
+
+    p = sub.add_parser('list', help="list all tasks")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('filter', help="list tasks matching a filter")
+    p.add_argument('--status')
+    p.add_argument('--priority')
+    p.add_argument('--due-before', dest='due_before')
+    p.set_defaults(func=cmd_filter)
+
+    p = sub.add_parser('sort', help="list tasks in order")
+    p.add_argument('--by', default='created_date',
+                   choices=('created_date', 'priority', 'due_date', 'title'))
+    p.add_argument('--reverse', action='store_true')
+    p.set_defaults(func=cmd_sort)
+
+    p = sub.add_parser('stats', help="task counts and the overdue count")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser('search', help="full-text search, best match first")
+    p.add_argument('query', nargs='+')
+    p.add_argument('--limit', type=int, default=10)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser('export', help="stream tasks as NDJSON or to a file")
+    p.add_argument('--output', help="write a JSON array to this file")
+    p.add_argument('--status')
+    p.add_argument('--priority')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('changes', help="print change events as NDJSON")
+    p.add_argument('--since', type=int, default=0,
+                   help="cursor ('seq' of the last event already seen)")
+    p.add_argument('--follow', action='store_true',
+                   help="keep printing new events as they are written")
+    p.add_argument('--interval', type=float, default=1.0,
+                   help="seconds between polls with --follow")
+    p.set_defaults(func=cmd_changes)
+
+    p = sub.add_parser('archive',
+                       help="move completed tasks to archive shards")
+    p.add_argument('--before', help="only tasks created before this YYYY-MM")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser('batch', help="run NDJSON operations from stdin")
+    p.set_defaults(func=cmd_batch, input=sys.stdin)
+    return parser
+
+
+def main(argv=None, out=None):
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    tm = TaskManager()
+    registry = None
+    if args.metrics:
+        from metrics import instrument
+        registry = instrument(tm)
+    try:
+        ok = args.func(tm, args, out)
+    except ValueError as e:
+        emit({'ok': False, 'error': str(e)}, out)
+        ok = False
+    finally:
+        if registry is not None:
+            if args.metrics == 'json':
+                sys.stderr.write(registry.to_json() + '\n')
+            else:
+                sys.stderr.write(registry.to_prometheus())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,32 @@
-FILENAME = "tasks.json"
\ No newline at end of file
+FILENAME = "tasks.json"
+
+# Storage backend used by TaskManager: "json", "log", "sqlite" or "sharded"
+STORAGE_BACKEND = "json"
+SQLITE_FILENAME = "tasks.db"
+
+# Append-only log backend (log_storage.LogFileHandler)
+LOG_FILENAME = "tasks.log"
+# Compact once superseded records outnumber live ones by this ratio...
+LOG_COMPACT_RATIO = 1.0
+# ...and there are at least this many of them.
+LOG_COMPACT_MIN_RECORDS = 1000
+
+# Sharded backend (sharded_storage.ShardedFileHandler): one JSON file per
+# partition in SHARD_DIRECTORY. SHARD_BY picks the partition keys out of
+# "status" and "month" (the month the task was created).
+SHARD_DIRECTORY = "tasks_shards"
+SHARD_BY = ("status", "month")
+
+# Keep a binary snapshot of the JSON file (FILENAME + ".snap", see
+# snapshot.py) so that loads can skip JSON parsing. It is rebuilt
+# automatically whenever the JSON file changes.
+SNAPSHOT = True
+
+# Append every change made through TaskManager to this NDJSON file so that
+# other processes can follow it (change_feed.ChangeFeed). None disables it.
+CHANGE_FEED_FILENAME = None
+
+# Record per-operation counts, timings and I/O for TaskManager and its
+# storage (see metrics.py). When off nothing is wrapped, so it costs
+# nothing.
+METRICS_ENABLED = False
@@ -1,48 +1,382 @@
+import contextlib
 import json
 import os
-from config import FILENAME
+import stat
+import snapshot
+from config import FILENAME, STORAGE_BACKEND, SNAPSHOT
+from json_stream import iter_json_array, write_json_array
 
-class FileHandler:
-    def __init__(self, filename=None):
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
+
+class ConflictError(ValueError):
+    """Raised instead of writing when another writer changed the task."""
+
+class CorruptFileError(ValueError):
+    """Raised for a tasks file that cannot be parsed.
+
+    Reading it as empty would hide every task it holds, and saving on top
+    of it would throw them away.
+    """
+
+def same_task(stored, expected):
+    """Whether a stored task dict still matches what a writer last read.
+
+    Keys the stored dict leaves out, and a null created_date, are filled
+    with defaults when tasks are read, so they are not compared.
+    """
+    for key, value in stored.items():
+        if value is None and key == 'created_date':
+            continue
+        if expected.get(key) != value:
+            return False
+    return True
+
+class LockedSequenceMixin:
+    """Re-entrant advisory lock and persisted id sequence of a handler.
+
+    Used by the handlers that keep tasks in plain files. Classes using it
+    set filename (the lock file is filename + '.lock'), seq_filename (None for
+    no sequence file), _lock_depth = 0 and _lock_file = None, and
+    implements _max_id(), which seeds the sequence for data written before
+    it existed.
+    """
+
+    # get_signature() as of the last time the lock was taken, so from just
+    # before the last write; TaskStore compares it with what it cached.
+    signature_before_write = None
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold an exclusive advisory lock on the file (re-entrant)."""
+        if self._lock_depth == 0:
+            self._lock_file = open(self.filename + '.lock', 'a')
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self.signature_before_write = self.get_signature()
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                # Closing the file releases the lock.
+                self._lock_file.close()
+                self._lock_file = None
+
+    def get_next_id(self):
+        """Return the next id the sequence will hand out, without taking it."""
+        next_id = self._read_seq()
+        if next_id is None:
+            next_id = self._max_id() + 1
+        return next_id
+
+    def reserve_ids(self, count=1):
+        """Allocate count consecutive ids and return the first one.
+
+        The sequence lives in a small file next to the data and only moves
+        forward, so ids of deleted tasks are never handed out again. It is
+        updated under the lock, so concurrent writers always get distinct
+        ids.
+        """
+        with self.lock():
+            first = self.get_next_id()
+            self._write_seq(first + count)
+        return first
+
+    def _advance_seq(self, next_id):
+        # Tasks saved with ids of their own (imports, say) push the
+        # sequence past them.
+        if self.seq_filename and next_id > self.get_next_id():
+            self._write_seq(next_id)
+
+    def _read_seq(self):
+        if not self.seq_filename:
+            return None
+        try:
+            with open(self.seq_filename, 'r') as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_seq(self, next_id):
+        tmp = self.seq_filename + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(next_id))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.seq_filename)
+
+class FileHandler(LockedSequenceMixin):
+    def __init__(self, filename=None, use_snapshot=SNAPSHOT,
+                 use_sequence=True):
         self.filename = filename or FILENAME
+        self.snapshot_filename = (snapshot.snapshot_path(self.filename)
+                                  if use_snapshot else None)
+        # Without a sequence file ids are allocated as max(id) + 1; used for
+        # files whose ids are allocated elsewhere.
+        self.seq_filename = self.filename + '.seq' if use_sequence else None
+        self._lock_depth = 0
+        self._lock_file = None
+        self._pending = None
 
     def load_tasks(self):
-        """Load tasks from JSON file."""
-        if not os.path.exists(self.filename):
+        """Load tasks from JSON file.
+
+        Raises CorruptFileError if the file cannot be parsed.
+        """
+        if self._pending is not None:
+            # Inside batch(), include the writes not saved yet.
+            return list(self._pending)
+        return self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filename) or \
+                os.path.getsize(self.filename) == 0:
             return []
         try:
+            return self._parse()
+        except json.JSONDecodeError as e:
+            raise CorruptFileError(f"{self.filename} is corrupt ({e})")
+
+    def _parse(self):
+        # Prefer the binary snapshot written next to the JSON file; it
+        # records the JSON file's signature, so any change makes it stale
+        # and it is rebuilt from the JSON.
+        signature = self.get_signature()
+        tasks = self._read_snapshot(signature)
+        if tasks is None:
             with open(self.filename, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
+                tasks = json.load(f)
+            self._write_snapshot(signature, tasks)
+        return tasks
+
+    def _read_snapshot(self, signature):
+        if not self.snapshot_filename or signature is None:
+            return None
+        try:
+            return snapshot.read(self.snapshot_filename, signature)
+        except (OSError, snapshot.SnapshotError):
+            return None
+
+    def _write_snapshot(self, signature, tasks):
+        if not self.snapshot_filename or signature is None:
+            return
+        try:
+            snapshot.write(self.snapshot_filename, tasks, signature)
+        except (OSError, ValueError):
+            # The snapshot is only an optimisation.
+            pass
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group several writes into one locked load and one write.
+
+        Inside the block the lock is held and writes only touch an
+        in-memory copy, which is saved when the block exits without error.
+        """
+        if self._pending is not None:
+            yield
+            return
+        with self.lock():
+            self._pending = self._load_for_write()
+            try:
+                yield
+                self.write_tasks(self._pending)
+            finally:
+                self._pending = None
+
+    def _load_for_write(self):
+        if self._pending is not None:
+            return self._pending
+        return self._load()
+
+    def _write(self, tasks):
+        if self._pending is None:
+            self.write_tasks(tasks)
+
+    @contextlib.contextmanager
+    def _modify(self):
+        with self.lock():
+            tasks = self._load_for_write()
+            yield tasks
+            self._write(tasks)
+
+    def iter_tasks(self):
+        """Yield tasks from the JSON file one at a time, in bounded memory."""
+        if not os.path.exists(self.filename) or \
+                os.path.getsize(self.filename) == 0:
+            return
+        with open(self.filename, 'r') as f:
+            yield from iter_json_array(f)
+
+    def write_tasks(self, task_dicts, filename=None):
+        """Write an iterable of tasks to a JSON file in chunks.
+
+        The data goes to a temporary file that is fsynced and then renamed
+        over the target, so readers and crashes only ever see the old or
+        the new contents.
+        """
+        import tempfile
+        target = filename or self.filename
+        directory = os.path.dirname(os.path.abspath(target))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-',
+                                   suffix='.json')
+        try:
+            os.chmod(tmp, self._file_mode(target))
+            with os.fdopen(fd, 'w') as f:
+                write_json_array(f, task_dicts)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+        self._fsync_dir(directory)
+        if target == self.filename and isinstance(task_dicts, list):
+            self._write_snapshot(self.get_signature(), task_dicts)
+
+    @staticmethod
+    def _file_mode(path):
+        # mkstemp creates files as 0600; keep the mode of the file being
+        # replaced, or what open() would have used for a new one.
+        try:
+            return stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    @staticmethod
+    def _fsync_dir(directory):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:  # not supported on Windows
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
 
     def save_task(self, task_dict):
         """Save a single task to the file."""
-        tasks = self.load_tasks()
-        tasks.append(task_dict)
-        with open(self.filename, 'w') as f:
-            json.dump(tasks, f, indent=4)
-
-    def update_task(self, task_id, task_dict):
-        """Update a task in the file."""
-        tasks = self.load_tasks()
-        for i, t in enumerate(tasks):
-            if t['id'] == task_id:
-                tasks[i] = task_dict
-                break
-        with open(self.filename, 'w') as f:
-            json.dump(tasks, f, indent=4)
+        with self._modify() as tasks:
+            tasks.append(task_dict)
+            self._advance_seq(task_dict['id'] + 1)
+
+    def update_task(self, task_id, task_dict, expected=None):
+        """Update a task in the file.
+
+        If expected is given it must match the stored task, otherwise
+        another writer changed it first and ConflictError is raised.
+        """
+        with self._modify() as tasks:
+            for i, t in enumerate(tasks):
+                if t['id'] == task_id:
+                    if expected is not None and not same_task(t, expected):
+                        raise ConflictError(
+                            f"Task {task_id} was changed by another writer")
+                    tasks[i] = task_dict
+                    break
+            else:
+                if expected is not None:
+                    raise ConflictError(
+                        f"Task {task_id} was deleted by another writer")
+
+    def patch_task(self, task_id, fields, expected=None):
+        """Change some fields of a task.
+
+        JSON has no way to record a delta, so the file is still rewritten;
+        expected works as in update_task.
+        """
+        with self._modify() as tasks:
+            for t in tasks:
+                if t['id'] == task_id:
+                    if expected is not None and not same_task(t, expected):
+                        raise ConflictError(
+                            f"Task {task_id} was changed by another writer")
+                    t.update(fields)
+                    break
+            else:
+                if expected is not None:
+                    raise ConflictError(
+                        f"Task {task_id} was deleted by another writer")
 
     def delete_task(self, task_id):
         """Delete a task from the file."""
-        tasks = self.load_tasks()
-        tasks = [t for t in tasks if t['id'] != task_id]
-        with open(self.filename, 'w') as f:
-            json.dump(tasks, f, indent=4)
+        with self._modify() as tasks:
+            tasks[:] = [t for t in tasks if t['id'] != task_id]
 
-    def get_next_id(self):
-        """Get the next available ID."""
-        tasks = self.load_tasks()
-        if not tasks:
-            return 1
-        return max(t['id'] for t in tasks) + 1
\ No newline at end of file
+    def save_tasks(self, task_dicts):
+        """Append several tasks with a single write."""
+        task_dicts = list(task_dicts)
+        with self._modify() as tasks:
+            tasks.extend(task_dicts)
+            if task_dicts:
+                self._advance_seq(max(t['id'] for t in task_dicts) + 1)
+
+    def update_tasks(self, task_dicts):
+        """Replace several tasks, matched by id, with a single write."""
+        updates = {t['id']: t for t in task_dicts}
+        with self._modify() as tasks:
+            tasks[:] = [updates.get(t['id'], t) for t in tasks]
+
+    def upsert_tasks(self, task_dicts):
+        """Replace tasks with the same id in place and append the rest."""
+        task_dicts = list(task_dicts)
+        new = {t['id']: t for t in task_dicts}
+        with self._modify() as tasks:
+            for i, t in enumerate(tasks):
+                if t['id'] in new:
+                    tasks[i] = new.pop(t['id'])
+            tasks.extend(new.values())
+            if task_dicts:
+                self._advance_seq(max(t['id'] for t in task_dicts) + 1)
+
+    def patch_tasks(self, patches):
+        """Change fields of several tasks ({id: fields}) in one write."""
+        with self._modify() as tasks:
+            for t in tasks:
+                fields = patches.get(t['id'])
+                if fields:
+                    t.update(fields)
+
+    def delete_tasks(self, task_ids):
+        """Delete several tasks with a single write."""
+        task_ids = set(task_ids)
+        with self._modify() as tasks:
+            tasks[:] = [t for t in tasks if t['id'] not in task_ids]
+
+    def get_signature(self):
+        """Return (mtime, size) of the file, or None if it does not exist."""
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _max_id(self):
+        # Only used to seed the sequence for files written before it existed.
+        tasks = self._load_for_write()
+        return max((t['id'] for t in tasks), default=0)
+
+def create_file_handler(backend=None):
+    """Return a file handler for the configured storage backend."""
+    backend = backend or STORAGE_BACKEND
+    if backend == 'json':
+        return FileHandler()
+    if backend == 'log':
+        from log_storage import LogFileHandler
+        return LogFileHandler()
+    if backend == 'sqlite':
+        from sqlite_storage import SQLiteHandler
+        return SQLiteHandler()
+    if backend == 'sharded':
+        from sharded_storage import ShardedFileHandler
+        return ShardedFileHandler()
+    raise ValueError(f"Unknown storage backend: {backend}")
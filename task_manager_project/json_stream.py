@@ -0,0 +1,92 @@
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+# Encodes a flat dict as the body of its indent=4 array-element form using
+# the C encoder, which json.dumps(indent=...) cannot use.
+_flat_encoder = json.JSONEncoder(separators=(',\n        ', ': '))
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in chunks of chunk_size characters, so memory use is
+    bounded by the largest single element rather than the whole file.
+    Raises ValueError on malformed input.
+    """
+    buf, pos, eof = '', 0, False
+    state = 'start'
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            buf, pos, eof = _read_more(f, buf, pos, chunk_size)
+            continue
+        ch = buf[pos]
+        if state == 'start':
+            if ch != '[':
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            state = 'first'
+        elif state == 'sep':
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError(f"Expected ',' or ']' at {ch!r}")
+            pos += 1
+            state = 'value'
+        else:
+            if state == 'first' and ch == ']':
+                return
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                end = None
+            # A value that reaches the end of the buffer may have been cut
+            # short, and so may a number followed by something that could
+            # continue it ('12' of '12.5'), so read on before trusting it.
+            if end is None or (not eof and (
+                    end == len(buf) or (type(value) in (int, float)
+                                        and buf[end] in _NUMBER_CHARS))):
+                if eof:
+                    raise ValueError("Malformed JSON array")
+                buf, pos, eof = _read_more(f, buf, pos, chunk_size)
+                continue
+            yield value
+            pos = end
+            state = 'sep'
+
+
+def _read_more(f, buf, pos, chunk_size):
+    more = f.read(chunk_size)
+    return buf[pos:] + more, 0, not more
+
+
+def write_json_array(f, items, chunk_size=CHUNK_SIZE):
+    """Write items as an indented JSON array, flushing in chunks.
+
+    The output matches json.dump(items, f, indent=4) but never holds more
+    than about chunk_size characters of it in memory.
+    """
+    parts = []
+    size = 0
+    first = True
+    for item in items:
+        if isinstance(item, dict) and item and not any(
+                isinstance(v, (dict, list, tuple)) for v in item.values()):
+            text = '{\n        ' + _flat_encoder.encode(item)[1:-1] + '\n    }'
+        else:
+            text = json.dumps(item, indent=4).replace('\n', '\n    ')
+        parts.append(('[\n    ' if first else ',\n    ') + text)
+        size += len(parts[-1])
+        first = False
+        if size >= chunk_size:
+            f.write(''.join(parts))
+            parts, size = [], 0
+    parts.append('[]' if first else '\n]')
+    f.write(''.join(parts))
@@ -0,0 +1,298 @@
+import json
+import os
+from config import LOG_FILENAME, LOG_COMPACT_RATIO, LOG_COMPACT_MIN_RECORDS
+from data_access import ConflictError, CorruptFileError, same_task
+
+
+class LogFileHandler:
+    """Task storage backed by an append-only operation log.
+
+    Each write appends one JSON line to the log instead of rewriting the
+    whole file, and an in-memory index maps every live task id to the
+    offset of its latest full record. Partial updates are logged as
+    patch records holding only the changed fields, and their offsets are
+    kept alongside. Superseded records are dropped by compact(), which
+    runs automatically once they pile up.
+
+    Only one process should write to a given log at a time. Other
+    handlers on the same log rebuild their index when they see the file
+    change, so they can keep reading it.
+    """
+
+    def __init__(self, filename=None, compact_ratio=LOG_COMPACT_RATIO,
+                 compact_min_records=LOG_COMPACT_MIN_RECORDS):
+        self.filename = filename or LOG_FILENAME
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self._index = {}
+        self._patches = {}
+        self._dead = 0
+        # _next_id is what replaying the log gives; _reserved is the end of
+        # the ids handed out since, which only needs logging if those ids
+        # are not all used by the tasks that follow.
+        self._next_id = 1
+        self._reserved = 1
+        self._size = 0
+        self._signature = None
+        # get_signature() just before the last append; see TaskStore.
+        self.signature_before_write = None
+        self._file = None
+        self._build_index()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.filename, 'a+b')
+        return self._file
+
+    def close(self):
+        """Close the underlying log file."""
+        if self._reserved > self._next_id:
+            self._append([])
+        self._close_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _records(self):
+        """Yield (offset, length, record) for every complete record.
+
+        A last line without a newline is a torn write from a crash and is
+        skipped; _build_index truncates it away. Any other line that does
+        not parse raises CorruptFileError, as the records after it cannot
+        be trusted to be complete either.
+        """
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'rb') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    return
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise CorruptFileError(
+                        f"{self.filename} is corrupt at byte {offset} ({e})")
+                yield offset, len(line), record
+                offset += len(line)
+
+    def _apply(self, offset, record):
+        op = record['op']
+        if op == 'put':
+            task_id = record['task']['id']
+            if task_id in self._index:
+                self._dead += 1
+                self._patches.pop(task_id, None)
+            self._index[task_id] = offset
+            self._next_id = max(self._next_id, task_id + 1)
+        elif op == 'patch':
+            # Counted as dead straight away: compaction folds it into the
+            # task's full record.
+            if record['id'] in self._index:
+                self._patches.setdefault(record['id'], []).append(offset)
+            self._dead += 1
+        elif op == 'del':
+            if self._index.pop(record['id'], None) is not None:
+                self._dead += 1
+                self._patches.pop(record['id'], None)
+            self._dead += 1
+        elif op == 'meta':
+            self._next_id = max(self._next_id, record['next_id'])
+            self._dead += 1
+
+    def _build_index(self, truncate=True):
+        self._index = {}
+        self._patches = {}
+        self._dead = 0
+        self._size = 0
+        # Taken first: a write made while we read changes it again.
+        self._signature = self.get_signature()
+        for offset, length, record in self._records():
+            self._apply(offset, record)
+            self._size = offset + length
+        if truncate and os.path.exists(self.filename) and \
+                os.path.getsize(self.filename) != self._size:
+            with open(self.filename, 'r+b') as f:
+                f.truncate(self._size)
+            self._signature = self.get_signature()
+
+    def _refresh_index(self):
+        """Rebuild the index if another handler changed the log.
+
+        The torn tail of a write still in progress elsewhere is left
+        alone.
+        """
+        if self.get_signature() == self._signature:
+            return
+        # A compaction elsewhere replaces the file, so reopen it.
+        self._close_file()
+        self._build_index(truncate=False)
+
+    def _append(self, records):
+        end = max([self._next_id] + [r['task']['id'] + 1 for r in records
+                                     if r['op'] == 'put'])
+        if self._reserved > end:
+            records = records + [{'op': 'meta', 'next_id': self._reserved}]
+        if not records:
+            return
+        lines = [(json.dumps(r) + '\n').encode('utf-8') for r in records]
+        self.signature_before_write = self.get_signature()
+        f = self._open()
+        f.write(b''.join(lines))
+        f.flush()
+        for record, line in zip(records, lines):
+            self._apply(self._size, record)
+            self._size += len(line)
+        self._signature = self.get_signature()
+        self._maybe_compact()
+
+    def _read_at(self, offset):
+        f = self._open()
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def load_tasks(self):
+        """Load all live tasks, in the order they were first saved."""
+        self._refresh_index()
+        by_offset = {}
+        live = set(self._index.values())
+        for offsets in self._patches.values():
+            live.update(offsets)
+        for offset, _, record in self._records():
+            if offset in live:
+                by_offset[offset] = record
+        tasks = []
+        for task_id, offset in self._index.items():
+            task = by_offset[offset]['task']
+            for patch_offset in self._patches.get(task_id, ()):
+                task.update(by_offset[patch_offset]['fields'])
+            tasks.append(task)
+        return tasks
+
+    def iter_tasks(self):
+        """Yield live tasks one at a time, in the order last written."""
+        self._refresh_index()
+        for offset, _, record in self._records():
+            if record['op'] == 'put' and \
+                    self._index.get(record['task']['id']) == offset:
+                yield self._with_patches(record['task'])
+
+    def _with_patches(self, task):
+        for offset in self._patches.get(task['id'], ()):
+            task.update(self._read_at(offset)['fields'])
+        return task
+
+    def get_task(self, task_id):
+        """Return a single task dict by id, or None."""
+        self._refresh_index()
+        offset = self._index.get(task_id)
+        if offset is None:
+            return None
+        return self._with_patches(self._read_at(offset)['task'])
+
+    def save_task(self, task_dict):
+        """Append a new task to the log."""
+        self._append([{'op': 'put', 'task': task_dict}])
+
+    def update_task(self, task_id, task_dict, expected=None):
+        """Append the new version of a task to the log.
+
+        If expected is given it must match the stored task, otherwise
+        ConflictError is raised.
+        """
+        if expected is not None:
+            stored = self.get_task(task_id)
+            if stored is None or not same_task(stored, expected):
+                raise ConflictError(
+                    f"Task {task_id} was changed by another writer")
+        if task_id not in self._index:
+            return
+        self._append([{'op': 'put', 'task': task_dict}])
+
+    def patch_task(self, task_id, fields, expected=None):
+        """Append a record holding only the changed fields of a task.
+
+        expected works as in update_task.
+        """
+        if expected is not None:
+            stored = self.get_task(task_id)
+            if stored is None or not same_task(stored, expected):
+                raise ConflictError(
+                    f"Task {task_id} was changed by another writer")
+        if task_id not in self._index:
+            return
+        self._append([{'op': 'patch', 'id': task_id, 'fields': fields}])
+
+    def delete_task(self, task_id):
+        """Append a delete marker for a task."""
+        if task_id not in self._index:
+            return
+        self._append([{'op': 'del', 'id': task_id}])
+
+    def save_tasks(self, task_dicts):
+        """Append several new tasks with a single write."""
+        self._append([{'op': 'put', 'task': t} for t in task_dicts])
+
+    def update_tasks(self, task_dicts):
+        """Append new versions of several tasks with a single write."""
+        self._append([{'op': 'put', 'task': t} for t in task_dicts
+                      if t['id'] in self._index])
+
+    def patch_tasks(self, patches):
+        """Append patch records for several tasks ({id: fields}) at once."""
+        self._append([{'op': 'patch', 'id': task_id, 'fields': fields}
+                      for task_id, fields in patches.items()
+                      if fields and task_id in self._index])
+
+    def delete_tasks(self, task_ids):
+        """Append delete markers for several tasks with a single write."""
+        self._append([{'op': 'del', 'id': i} for i in set(task_ids)
+                      if i in self._index])
+
+    def get_next_id(self):
+        """Return the next id the sequence will hand out, without taking it."""
+        return max(self._next_id, self._reserved)
+
+    def reserve_ids(self, count=1):
+        """Allocate count consecutive ids and return the first one.
+
+        Replaying the log moves the sequence past every task ever put, so
+        ids of deleted tasks are never reused. Only when reserved ids are
+        left unused is the end of the sequence appended as a meta record,
+        with the next write or on close().
+        """
+        first = self.get_next_id()
+        self._reserved = first + count
+        return first
+
+    def get_signature(self):
+        """Return (mtime, size) of the log, or None if it does not exist."""
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _maybe_compact(self):
+        if self._dead < self.compact_min_records:
+            return
+        if self._dead > len(self._index) * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log so that it holds only the live records."""
+        tasks = self.load_tasks()
+        self.close()
+        tmp = self.filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            meta = {'op': 'meta', 'next_id': self.get_next_id()}
+            f.write((json.dumps(meta) + '\n').encode('utf-8'))
+            for task in tasks:
+                record = {'op': 'put', 'task': task}
+                f.write((json.dumps(record) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filename)
+        self._build_index()
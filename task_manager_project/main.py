@@ -1,4 +1,8 @@
-from user_interface import start_application
+import sys
 
 if __name__ == "__main__":
-    start_application()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main())
+    from user_interface import start_application
+    start_application()
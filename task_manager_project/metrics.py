@@ -0,0 +1,207 @@
+"""Operation metrics for TaskManager and its storage backend.
+
+instrument(manager) wraps the public methods of a TaskManager and of its
+file handler so that every call records its count, errors and duration,
+plus bytes read and written and tasks parsed for storage calls. Nothing
+is wrapped unless instrument() is called (TaskManager does so when
+config.METRICS_ENABLED is set), so disabled metrics cost nothing.
+
+    tm = TaskManager()
+    registry = instrument(tm)
+    ...
+    print(registry.to_prometheus())
+"""
+import functools
+import json
+import os
+import threading
+import time
+import types
+from data_access import FileHandler
+
+# Handler methods that read every task, and those that write.
+FULL_READS = ('load_tasks', 'iter_tasks', 'select_tasks')
+WRITES = ('save_task', 'save_tasks', 'update_task', 'update_tasks',
+          'patch_task', 'patch_tasks', 'delete_task', 'delete_tasks',
+          'upsert_tasks', 'write_tasks', 'reserve_ids', 'archive_completed',
+          'compact')
+HANDLER_OPS = FULL_READS + WRITES + ('get_task', 'get_next_id',
+                                     'get_signature')
+MANAGER_OPS = ('get_all_tasks', 'get_task_by_id', 'add_task', 'update_task',
+               'patch_task', 'delete_task', 'mark_complete', 'add_tasks',
+               'update_tasks', 'delete_tasks', 'mark_complete_many',
+               'filter_tasks', 'sort_tasks', 'search', 'stats', 'iter_tasks',
+               'export_tasks', 'archive_completed')
+
+FIELDS = ('count', 'errors', 'seconds', 'max_seconds', 'bytes_read',
+          'bytes_written', 'tasks_parsed')
+
+
+class Metrics:
+    """Thread-safe counters keyed by (layer, operation)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, layer, op, seconds, error=False, bytes_read=0,
+               bytes_written=0, tasks_parsed=0):
+        with self._lock:
+            stats = self._ops.get((layer, op))
+            if stats is None:
+                stats = self._ops[(layer, op)] = dict.fromkeys(FIELDS, 0)
+            stats['count'] += 1
+            stats['errors'] += error
+            stats['seconds'] += seconds
+            if seconds > stats['max_seconds']:
+                stats['max_seconds'] = seconds
+            stats['bytes_read'] += bytes_read
+            stats['bytes_written'] += bytes_written
+            stats['tasks_parsed'] += tasks_parsed
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+    def to_dict(self):
+        """Return {layer: {operation: {field: value}}}."""
+        result = {}
+        with self._lock:
+            for (layer, op), stats in sorted(self._ops.items()):
+                result.setdefault(layer, {})[op] = dict(stats)
+        return result
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=4)
+
+    def to_prometheus(self, prefix='task_manager'):
+        """Return the metrics in the Prometheus text exposition format."""
+        metrics = (
+            ('operations_total', 'count', 'counter', "Operations performed."),
+            ('operation_errors_total', 'errors', 'counter',
+             "Operations that raised an exception."),
+            ('operation_seconds_total', 'seconds', 'counter',
+             "Time spent in operations."),
+            ('operation_seconds_max', 'max_seconds', 'gauge',
+             "Slowest single operation."),
+            ('bytes_read_total', 'bytes_read', 'counter',
+             "Bytes of storage read."),
+            ('bytes_written_total', 'bytes_written', 'counter',
+             "Bytes of storage written."),
+            ('tasks_parsed_total', 'tasks_parsed', 'counter',
+             "Tasks decoded from storage."),
+        )
+        data = self.to_dict()
+        lines = []
+        for name, field, kind, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for layer, ops in data.items():
+                for op, stats in ops.items():
+                    lines.append(f'{prefix}_{name}{{layer="{layer}",'
+                                 f'op="{op}"}} {stats[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Metrics()
+
+
+def _storage_size(handler):
+    try:
+        return os.path.getsize(handler.filename)
+    except (AttributeError, OSError):
+        return None
+
+
+def _wrap(method, registry, layer, op, handler=None):
+    """Return method wrapped to record its calls in registry.
+
+    For storage calls (handler given) the size of the storage file gives
+    the bytes: a full read reads all of it, and a write adds its growth,
+    or all of it for backends that rewrite the file.
+    """
+    rewrites = isinstance(handler, FileHandler)
+    measure_writes = handler is not None and op in WRITES
+    perf_counter = time.perf_counter
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        before = _storage_size(handler) if measure_writes else None
+        start = perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            registry.record(layer, op, perf_counter() - start, error=True)
+            raise
+        if isinstance(result, types.GeneratorType):
+            return _wrap_iter(result, registry, layer, op, handler, start)
+        seconds = perf_counter() - start
+        bytes_read = bytes_written = tasks_parsed = 0
+        if handler is not None:
+            if op in FULL_READS:
+                bytes_read = _storage_size(handler) or 0
+                tasks_parsed = len(result)
+            elif measure_writes:
+                after = _storage_size(handler) or 0
+                bytes_written = after if rewrites else \
+                    max(0, after - (before or 0))
+        registry.record(layer, op, seconds, bytes_read=bytes_read,
+                        bytes_written=bytes_written,
+                        tasks_parsed=tasks_parsed)
+        return result
+    return wrapper
+
+
+def _wrap_iter(iterator, registry, layer, op, handler, start):
+    # Generators do their work while being consumed, so they are timed
+    # from the call until they are exhausted or closed.
+    count = 0
+    error = False
+    try:
+        for item in iterator:
+            count += 1
+            yield item
+    except BaseException:
+        error = True
+        raise
+    finally:
+        registry.record(
+            layer, op, time.perf_counter() - start, error=error,
+            bytes_read=(_storage_size(handler) or 0) if handler else 0,
+            tasks_parsed=count if handler is not None else 0)
+
+
+class InstrumentedHandler:
+    """Proxy for a file handler that records every storage call."""
+
+    def __init__(self, handler, registry=None):
+        self._handler = handler
+        self._registry = registry or REGISTRY
+
+    def __getattr__(self, name):
+        attr = getattr(self._handler, name)
+        if name in HANDLER_OPS and callable(attr):
+            attr = _wrap(attr, self._registry, 'handler', name,
+                         handler=self._handler)
+            # Cache the wrapper so later calls skip __getattr__.
+            setattr(self, name, attr)
+        return attr
+
+
+def instrument(manager, registry=None):
+    """Record the calls of a TaskManager and its file handler.
+
+    The handler is replaced by an InstrumentedHandler and the manager's
+    public methods by recording wrappers. Returns the registry used.
+    """
+    registry = registry or REGISTRY
+    if isinstance(manager.file_handler, InstrumentedHandler):
+        return registry
+    handler = InstrumentedHandler(manager.file_handler, registry)
+    manager.file_handler = handler
+    manager.store.file_handler = handler
+    for name in MANAGER_OPS:
+        method = getattr(manager, name, None)
+        if method is not None:
+            setattr(manager, name, _wrap(method, registry, 'manager', name))
+    return registry
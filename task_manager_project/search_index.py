@@ -0,0 +1,121 @@
+import bisect
+import heapq
+import re
+
+_TOKEN = re.compile(r'\w+')
+# Sorts after every token that starts with a given prefix.
+_PREFIX_END = '\U0010ffff'
+
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+# Extra weight when a query term matches a whole token, not just a prefix.
+EXACT_BONUS = 2
+
+
+def tokenize(text):
+    """Split text into lower-case word tokens."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """Inverted index over task titles and descriptions.
+
+    postings maps every token to {task id: weight}, where title
+    occurrences weigh more than description ones. tokens is the sorted
+    vocabulary, so all tokens starting with a prefix form one bisectable
+    slice.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self._task_tokens = {}
+
+    def add(self, task, keep_sorted=True):
+        weights = {}
+        for token in tokenize(task.title):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(task.description):
+            weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                if keep_sorted:
+                    bisect.insort(self.tokens, token)
+                else:
+                    self.tokens.append(token)
+            postings[task.id] = weight
+        self._task_tokens[task.id] = tuple(weights)
+
+    def sort(self):
+        """Restore the sorted vocabulary after add(..., keep_sorted=False)."""
+        self.tokens.sort()
+
+    def remove(self, task_id):
+        for token in self._task_tokens.pop(task_id, ()):
+            postings = self.postings[token]
+            del postings[task_id]
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def _prefix_tokens(self, term):
+        start = bisect.bisect_left(self.tokens, term)
+        end = bisect.bisect_left(self.tokens, term + _PREFIX_END, start)
+        return self.tokens[start:end]
+
+    def search(self, query, limit=None, tiebreak=None):
+        """Return the ids of the tasks matching every query term, best first.
+
+        Each term matches tokens it is a prefix of. A task scores the
+        weights of the tokens it matched, plus a bonus for whole-word
+        matches; equal scores are ordered by tiebreak(id) if given.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        matches = []
+        for term in terms:
+            tokens = self._prefix_tokens(term)
+            if not tokens:
+                return []
+            size = sum(len(self.postings[t]) for t in tokens)
+            matches.append((size, term, tokens))
+        # Start from the most selective term so the candidate set is small.
+        matches.sort()
+        scores = None
+        for size, term, tokens in matches:
+            term_scores = {}
+            if scores is not None and len(scores) < size:
+                # Few candidates left: check their own tokens instead of
+                # walking long posting lists.
+                for task_id in scores:
+                    for token in self._task_tokens[task_id]:
+                        if token.startswith(term):
+                            bonus = EXACT_BONUS if token == term else 1
+                            score = self.postings[token][task_id] * bonus
+                            term_scores[task_id] = \
+                                term_scores.get(task_id, 0) + score
+            else:
+                for token in tokens:
+                    bonus = EXACT_BONUS if token == term else 1
+                    for task_id, weight in self.postings[token].items():
+                        if scores is None or task_id in scores:
+                            term_scores[task_id] = \
+                                term_scores.get(task_id, 0) + weight * bonus
+            if scores is not None:
+                for task_id in term_scores:
+                    term_scores[task_id] += scores[task_id]
+            scores = term_scores
+            if not scores:
+                return []
+        if tiebreak is None:
+            def key(task_id):
+                return -scores[task_id]
+        else:
+            def key(task_id):
+                return (-scores[task_id], tiebreak(task_id))
+        if limit is None:
+            return sorted(scores, key=key)
+        return heapq.nsmallest(limit, scores, key=key)
@@ -0,0 +1,324 @@
+import marshal
+import os
+import re
+from config import SHARD_DIRECTORY, SHARD_BY
+from data_access import (FileHandler, LockedSequenceMixin, ConflictError,
+                         same_task)
+
+ARCHIVE_PREFIX = 'archive-'
+# Bump when the layout of the manifest file changes.
+MANIFEST_VERSION = 1
+
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_MONTH = re.compile(r'\d{4}-\d{2}')
+
+
+def created_month(task_dict):
+    """Return 'YYYY-MM' of the task's created date, or 'undated'."""
+    created = task_dict.get('created_date')
+    if isinstance(created, str) and _DATE.fullmatch(created):
+        return created[:7]
+    return 'undated'
+
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '_', str(value).lower()).strip('_') or 'none'
+
+
+class ShardedFileHandler(LockedSequenceMixin):
+    """Task storage split over several JSON files (shards) in a directory.
+
+    Tasks are partitioned by status and/or created month (shard_by), so
+    with the default layout pending tasks created in May 2024 live in
+    'pending-2024-05.json'. archive_completed() moves completed tasks
+    into 'archive-<month>.json' shards, which load_tasks() leaves out.
+
+    A manifest maps every task id to its shard, so a write touches only
+    the shards involved and a status query only reads the shards of that
+    status. Each shard is a FileHandler, with its atomic saves and
+    snapshot; the manifest and the id sequence are updated under a
+    directory-wide lock.
+    """
+
+    def __init__(self, directory=None, shard_by=SHARD_BY):
+        self.directory = directory or SHARD_DIRECTORY
+        self.shard_by = tuple(shard_by)
+        for key in self.shard_by:
+            if key not in ('status', 'month'):
+                raise ValueError(f"Unknown shard key: {key}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.filename = os.path.join(self.directory, 'shards')
+        self.manifest_filename = os.path.join(self.directory, 'manifest.bin')
+        self.seq_filename = self.filename + '.seq'
+        self._lock_depth = 0
+        self._lock_file = None
+        self._shards = {}
+        self._manifest = None
+        self._manifest_signature = None
+
+    def shard_name(self, task_dict):
+        """Return the name of the hot shard a task belongs in."""
+        parts = []
+        if 'status' in self.shard_by:
+            parts.append(_slug(task_dict.get('status') or 'Pending'))
+        if 'month' in self.shard_by:
+            parts.append(created_month(task_dict))
+        return '-'.join(parts) or 'tasks'
+
+    def _shard(self, name):
+        shard = self._shards.get(name)
+        if shard is None:
+            path = os.path.join(self.directory, name + '.json')
+            shard = self._shards[name] = FileHandler(path, use_sequence=False)
+        return shard
+
+    # Manifest
+
+    def _load_manifest(self):
+        signature = _stat(self.manifest_filename)
+        if self._manifest is not None and \
+                signature == self._manifest_signature:
+            return self._manifest
+        try:
+            with open(self.manifest_filename, 'rb') as f:
+                version, manifest = marshal.loads(f.read())
+            if version != MANIFEST_VERSION:
+                raise ValueError("Unsupported manifest version")
+        except FileNotFoundError:
+            manifest = self._scan_shards()
+        except (EOFError, ValueError, TypeError):
+            manifest = self._scan_shards()
+        self._manifest = manifest
+        self._manifest_signature = signature
+        return manifest
+
+    def _scan_shards(self):
+        # Rebuild the manifest from the shard files themselves.
+        manifest = {}
+        for entry in sorted(os.listdir(self.directory)):
+            if entry.endswith('.json') and not entry.startswith('.'):
+                name = entry[:-len('.json')]
+                for task in self._shard(name).load_tasks():
+                    manifest[task['id']] = name
+        return manifest
+
+    def _write_manifest(self):
+        tmp = self.manifest_filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(marshal.dumps((MANIFEST_VERSION, self._manifest)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_filename)
+        self._manifest_signature = _stat(self.manifest_filename)
+
+    def shard_names(self, status=None, include_archive=False):
+        """Return the names of the shards that can hold matching tasks."""
+        names = set(self._load_manifest().values())
+        hot = [n for n in names if not n.startswith(ARCHIVE_PREFIX)]
+        if status and 'status' in self.shard_by:
+            prefix = _slug(status)
+            hot = [n for n in hot if n == prefix or n.startswith(prefix + '-')]
+        archive = []
+        if include_archive and (not status or status == 'Completed'):
+            archive = [n for n in names if n.startswith(ARCHIVE_PREFIX)]
+        return sorted(hot) + sorted(archive)
+
+    # Reads
+
+    def _read_shard(self, name):
+        # A task interrupted while moving between shards can be in both;
+        # the manifest says which copy is current.
+        manifest = self._load_manifest()
+        return [t for t in self._shard(name).load_tasks()
+                if manifest.get(t['id']) == name]
+
+    def load_tasks(self):
+        """Load the tasks of every hot (non-archive) shard, by id."""
+        tasks = []
+        for name in self.shard_names():
+            tasks.extend(self._read_shard(name))
+        tasks.sort(key=lambda t: t['id'])
+        return tasks
+
+    def iter_tasks(self):
+        """Yield the hot tasks one shard at a time."""
+        yield from self.select_tasks()
+
+    def select_tasks(self, status=None, include_archive=False):
+        """Yield tasks with the given status, reading only their shards."""
+        for name in self.shard_names(status, include_archive):
+            manifest = self._load_manifest()
+            for task in self._shard(name).iter_tasks():
+                if manifest.get(task['id']) != name:
+                    continue
+                if status and task.get('status', 'Pending') != status:
+                    continue
+                yield task
+
+    def get_task(self, task_id):
+        """Return a single task dict by id (archived ones too), or None."""
+        name = self._load_manifest().get(task_id)
+        if name is None:
+            return None
+        for task in self._shard(name).load_tasks():
+            if task['id'] == task_id:
+                return task
+        return None
+
+    # Writes
+
+    def _put(self, task_dicts):
+        """Save tasks into their shards, moving any that changed shard."""
+        manifest = self._load_manifest()
+        groups, moved = {}, {}
+        for task in task_dicts:
+            name = self.shard_name(task)
+            groups.setdefault(name, []).append(task)
+            old = manifest.get(task['id'])
+            if old is not None and old != name:
+                moved.setdefault(old, []).append(task['id'])
+        for name, group in groups.items():
+            self._shard(name).upsert_tasks(group)
+        changed = False
+        for name, group in groups.items():
+            for task in group:
+                if manifest.get(task['id']) != name:
+                    manifest[task['id']] = name
+                    changed = True
+        # The manifest switches over before the old copies are removed,
+        # so a crash in between leaves a stale copy rather than a loss.
+        if changed:
+            self._write_manifest()
+        for name, ids in moved.items():
+            self._shard(name).delete_tasks(ids)
+
+    def save_task(self, task_dict):
+        """Save a single task into its shard."""
+        self.save_tasks([task_dict])
+
+    def save_tasks(self, task_dicts):
+        """Save several tasks, one write per shard."""
+        task_dicts = list(task_dicts)
+        if not task_dicts:
+            return
+        with self.lock():
+            self._put(task_dicts)
+            self._advance_seq(max(t['id'] for t in task_dicts) + 1)
+
+    def _check(self, task_id, expected):
+        stored = self.get_task(task_id)
+        if expected is not None and (stored is None or
+                                     not same_task(stored, expected)):
+            raise ConflictError(
+                f"Task {task_id} was changed by another writer")
+        return stored
+
+    def update_task(self, task_id, task_dict, expected=None):
+        """Replace a task, moving it if its shard changes.
+
+        If expected is given it must match the stored task, otherwise
+        ConflictError is raised.
+        """
+        with self.lock():
+            if self._check(task_id, expected) is not None:
+                self._put([task_dict])
+
+    def patch_task(self, task_id, fields, expected=None):
+        """Change some fields of a task; expected works as in update_task."""
+        with self.lock():
+            stored = self._check(task_id, expected)
+            if stored is not None:
+                stored.update(fields)
+                self._put([stored])
+
+    def update_tasks(self, task_dicts):
+        """Replace several existing tasks, one write per shard."""
+        with self.lock():
+            manifest = self._load_manifest()
+            self._put([t for t in task_dicts if t['id'] in manifest])
+
+    def patch_tasks(self, patches):
+        """Change fields of several tasks ({id: fields})."""
+        with self.lock():
+            manifest = self._load_manifest()
+            by_shard = {}
+            for task_id in patches:
+                if task_id in manifest:
+                    by_shard.setdefault(manifest[task_id], set()).add(task_id)
+            changed = []
+            for name, ids in by_shard.items():
+                for task in self._read_shard(name):
+                    if task['id'] in ids:
+                        task.update(patches[task['id']])
+                        changed.append(task)
+            self._put(changed)
+
+    def delete_task(self, task_id):
+        """Delete a task from its shard."""
+        self.delete_tasks([task_id])
+
+    def delete_tasks(self, task_ids):
+        """Delete several tasks, one write per shard."""
+        with self.lock():
+            manifest = self._load_manifest()
+            by_shard = {}
+            for task_id in set(task_ids):
+                name = manifest.pop(task_id, None)
+                if name is not None:
+                    by_shard.setdefault(name, []).append(task_id)
+            if not by_shard:
+                return
+            self._write_manifest()
+            for name, ids in by_shard.items():
+                self._shard(name).delete_tasks(ids)
+
+    def archive_completed(self, before=None):
+        """Move completed tasks out of the hot shards.
+
+        They go to 'archive-<created month>' shards. With before
+        ('YYYY-MM'), only tasks created before that month are moved.
+        Returns the number of tasks archived.
+        """
+        # Months are compared as strings, so '2024-5' would sort after
+        # '2024-10'.
+        if before is not None and not _MONTH.fullmatch(before):
+            raise ValueError("Month must be in YYYY-MM format")
+        with self.lock():
+            manifest = self._load_manifest()
+            moved = {}
+            for name in self.shard_names(status='Completed'):
+                for task in self._read_shard(name):
+                    month = created_month(task)
+                    if task.get('status') != 'Completed' or \
+                            (before is not None and month >= before):
+                        continue
+                    moved.setdefault(ARCHIVE_PREFIX + month, []).append(
+                        (name, task))
+            if not moved:
+                return 0
+            emptied = {}
+            for archive, items in moved.items():
+                self._shard(archive).upsert_tasks(t for _, t in items)
+                for name, task in items:
+                    manifest[task['id']] = archive
+                    emptied.setdefault(name, []).append(task['id'])
+            self._write_manifest()
+            for name, ids in emptied.items():
+                self._shard(name).delete_tasks(ids)
+            return sum(len(items) for items in moved.values())
+
+    def _max_id(self):
+        return max(self._load_manifest(), default=0)
+
+    def get_signature(self):
+        """Return a value that changes whenever a hot shard is written."""
+        return (_stat(self.manifest_filename),) + tuple(
+            self._shard(name).get_signature() for name in self.shard_names())
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
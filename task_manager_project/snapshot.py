@@ -0,0 +1,102 @@
+"""Binary snapshots of a tasks JSON file.
+
+A snapshot holds the same task dicts as the JSON file, marshalled instead
+of indented JSON: about half the size and two to three times faster to
+load. It starts with a fixed header
+
+    magic b'TASKSNAP', format version, marshal version,
+    source mtime (ns), source size, task count, body length
+
+so a reader can tell at once whether the snapshot is in a layout it
+understands and still matches the JSON file it was built from.
+
+    python snapshot.py [tasks.json]     # build or refresh the snapshot
+"""
+import contextlib
+import marshal
+import os
+import struct
+import sys
+
+MAGIC = b'TASKSNAP'
+# Bump when the layout of the header or the body changes.
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHHqqIQ')
+SUFFIX = '.snap'
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a snapshot this version can read."""
+
+
+def snapshot_path(filename):
+    return filename + SUFFIX
+
+
+def write(path, tasks, source_signature):
+    """Write tasks to a snapshot of the file with source_signature.
+
+    The snapshot is written to a temporary file and renamed into place,
+    so readers never see a partial one.
+    """
+    body = marshal.dumps(tasks)
+    mtime_ns, size = source_signature
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, mtime_ns,
+                         size, len(tasks), len(body))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def read_header(data):
+    """Return (mtime_ns, size, count, body length) from a snapshot header."""
+    if len(data) < HEADER.size:
+        raise SnapshotError("Truncated snapshot header")
+    magic, version, marshal_version, mtime_ns, size, count, length = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Not a task snapshot")
+    if version != FORMAT_VERSION or marshal_version != marshal.version:
+        raise SnapshotError(
+            f"Unsupported snapshot version {version}/{marshal_version}")
+    return mtime_ns, size, count, length
+
+
+def read(path, source_signature=None):
+    """Return the tasks in a snapshot.
+
+    If source_signature is given and the snapshot was built from a
+    different version of the JSON file, None is returned instead.
+    Raises SnapshotError if the file is not a usable snapshot.
+    """
+    # One read plus marshal.loads is much faster than marshal.load on
+    # the file object.
+    with open(path, 'rb') as f:
+        data = f.read()
+    mtime_ns, size, count, length = read_header(data)
+    if source_signature is not None and \
+            (mtime_ns, size) != tuple(source_signature):
+        return None
+    if len(data) != HEADER.size + length:
+        raise SnapshotError("Truncated snapshot")
+    try:
+        tasks = marshal.loads(memoryview(data)[HEADER.size:])
+    except (EOFError, ValueError, TypeError) as e:
+        raise SnapshotError(f"Corrupt snapshot ({e})")
+    if type(tasks) is not list or len(tasks) != count:
+        raise SnapshotError("Corrupt snapshot")
+    return tasks
+
+
+if __name__ == "__main__":
+    from data_access import FileHandler
+    handler = FileHandler(sys.argv[1] if len(sys.argv) > 1 else None)
+    count = len(handler.load_tasks())
+    print(f"Snapshot of {count} tasks in {handler.snapshot_filename}.")
@@ -0,0 +1,244 @@
+import contextlib
+import json
+import sqlite3
+import sys
+from config import SQLITE_FILENAME, FILENAME
+from data_access import ConflictError, same_task
+
+COLUMNS = ('id', 'title', 'description', 'priority', 'due_date', 'status',
+           'created_date')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    priority TEXT,
+    due_date TEXT,
+    status TEXT,
+    created_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (due_date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta
+    SELECT 'next_id', COALESCE(MAX(id), 0) + 1 FROM tasks;
+CREATE TRIGGER IF NOT EXISTS tasks_advance_next_id AFTER INSERT ON tasks
+BEGIN
+    UPDATE meta SET value = NEW.id + 1
+    WHERE key = 'next_id' AND value <= NEW.id;
+END;
+"""
+
+
+class SQLiteHandler:
+    """Task storage in a SQLite database, with the FileHandler API.
+
+    The database runs in WAL mode and every write is its own transaction,
+    so a crash never leaves a half-written task list behind. id is the
+    primary key; status, priority and due_date are indexed. The id
+    sequence is kept in the meta table and only moves forward.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or SQLITE_FILENAME
+        # The connection may be used from executor threads (see
+        # async_manager); sqlite3 serialises access to it.
+        self._conn = sqlite3.connect(self.filename, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        # get_signature() inside the last write transaction, before the
+        # write; TaskStore compares it with what it cached.
+        self.signature_before_write = None
+
+    @contextlib.contextmanager
+    def _write(self):
+        """Run the block as one write transaction.
+
+        BEGIN IMMEDIATE takes the write lock up front, so nothing can
+        commit between reading the signature (or a task to check) and the
+        write.
+        """
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self.signature_before_write = self.get_signature()
+            yield
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    @staticmethod
+    def _row(task_dict):
+        return (
+            task_dict['id'],
+            task_dict['title'],
+            task_dict.get('description', ''),
+            task_dict.get('priority', 'Medium'),
+            task_dict.get('due_date'),
+            task_dict.get('status', 'Pending'),
+            task_dict.get('created_date'),
+        )
+
+    def load_tasks(self):
+        """Load all tasks from the database."""
+        cursor = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM tasks ORDER BY id")
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def iter_tasks(self):
+        """Yield tasks one row at a time."""
+        cursor = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM tasks ORDER BY id")
+        for row in cursor:
+            yield dict(zip(COLUMNS, row))
+
+    def get_task(self, task_id):
+        """Return a single task dict by id, or None."""
+        row = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM tasks WHERE id = ?",
+            (task_id,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def save_task(self, task_dict):
+        """Insert a single task."""
+        with self._write():
+            self._conn.execute(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._row(task_dict))
+
+    def update_task(self, task_id, task_dict, expected=None):
+        """Update a task in the database.
+
+        If expected is given it must match the stored task, otherwise
+        ConflictError is raised and nothing is written.
+        """
+        row = self._row(task_dict)
+        with self._write():
+            if expected is not None:
+                stored = self.get_task(task_id)
+                if stored is None or not same_task(stored, expected):
+                    raise ConflictError(
+                        f"Task {task_id} was changed by another writer")
+            self._conn.execute(
+                "UPDATE tasks SET title = ?, description = ?, priority = ?, "
+                "due_date = ?, status = ?, created_date = ? WHERE id = ?",
+                row[1:] + (task_id,))
+
+    @staticmethod
+    def _set_clause(fields):
+        names = [name for name in fields if name != 'id']
+        for name in names:
+            if name not in COLUMNS:
+                raise ValueError(f"Unknown task field: {name}")
+        return ', '.join(f"{name} = ?" for name in names), names
+
+    def patch_task(self, task_id, fields, expected=None):
+        """Update only the given columns of a task.
+
+        expected works as in update_task.
+        """
+        clause, names = self._set_clause(fields)
+        with self._write():
+            if expected is not None:
+                stored = self.get_task(task_id)
+                if stored is None or not same_task(stored, expected):
+                    raise ConflictError(
+                        f"Task {task_id} was changed by another writer")
+            if names:
+                self._conn.execute(
+                    f"UPDATE tasks SET {clause} WHERE id = ?",
+                    [fields[name] for name in names] + [task_id])
+
+    def patch_tasks(self, patches):
+        """Update the given columns of several tasks ({id: fields}).
+
+        Tasks changing the same set of columns share one statement.
+        """
+        groups = {}
+        for task_id, fields in patches.items():
+            if fields:
+                groups.setdefault(tuple(fields), []).append((task_id, fields))
+        with self._write():
+            for names, items in groups.items():
+                clause, names = self._set_clause(names)
+                if not names:
+                    continue
+                self._conn.executemany(
+                    f"UPDATE tasks SET {clause} WHERE id = ?",
+                    [[fields[name] for name in names] + [task_id]
+                     for task_id, fields in items])
+
+    def delete_task(self, task_id):
+        """Delete a task from the database."""
+        with self._write():
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def save_tasks(self, task_dicts):
+        """Insert several tasks in one transaction."""
+        with self._write():
+            self._conn.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._row(t) for t in task_dicts])
+
+    def update_tasks(self, task_dicts):
+        """Update several tasks in one transaction."""
+        rows = [self._row(t) for t in task_dicts]
+        with self._write():
+            self._conn.executemany(
+                "UPDATE tasks SET title = ?, description = ?, priority = ?, "
+                "due_date = ?, status = ?, created_date = ? WHERE id = ?",
+                [row[1:] + row[:1] for row in rows])
+
+    def delete_tasks(self, task_ids):
+        """Delete several tasks in one transaction."""
+        with self._write():
+            self._conn.executemany("DELETE FROM tasks WHERE id = ?",
+                                   [(i,) for i in task_ids])
+
+    def get_next_id(self):
+        """Return the next id the sequence will hand out, without taking it."""
+        (next_id,) = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return next_id
+
+    def reserve_ids(self, count=1):
+        """Allocate count consecutive ids and return the first one."""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            first = self.get_next_id()
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'next_id'",
+                (first + count,))
+        return first
+
+    def get_signature(self):
+        """Return a value that changes when another connection commits."""
+        return self._conn.execute('PRAGMA data_version').fetchone()
+
+    def import_json(self, filename=None):
+        """Import the tasks from a JSON file written by FileHandler.
+
+        Tasks that already exist are replaced. Returns the number of
+        tasks imported.
+        """
+        with open(filename or FILENAME, 'r') as f:
+            tasks = json.load(f)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._row(t) for t in tasks])
+        return len(tasks)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else FILENAME
+    handler = SQLiteHandler()
+    count = handler.import_json(source)
+    handler.close()
+    print(f"Imported {count} tasks from {source} into {handler.filename}.")
@@ -1,6 +1,12 @@
+import copy
+import csv
 import datetime
+import functools
+import itertools
 import unittest
+import unittest.mock
 import os
+import tempfile
 from pathlib import Path
 
 # Constants
@@ -9,15 +15,27 @@ USER_FILE = 'user.txt'
 TASK_FILE = 'tasks.txt'
 TASK_OVERVIEW_FILE = 'task_overview.txt'
 USER_OVERVIEW_FILE = 'user_overview.txt'
+# First line of the task and user files; bump the version when the
+# columns change.
+TASKS_HEADER = '#tasks v3'
+USERS_HEADER = '#users v2'
+# Task files are compacted once the rows superseded by later ones number
+# more than the tasks and more than this.
+TASKS_COMPACT_MIN_ROWS = 100
 
 # Classes
+class FileFormatError(ValueError):
+    """Raised for a task or user file written in an unsupported format."""
+
 class User:
     def __init__(self, username, password):
         self.username = username
         self.password = password  # Note: In production, hash passwords
 
 class Task:
-    def __init__(self, username, title, description, assigned_date, due_date, completed='No'):
+    def __init__(self, username, title, description, assigned_date, due_date,
+                 completed='No', task_id=None):
+        self.id = task_id
         self.username = username
         self.title = title
         self.description = description
@@ -27,6 +45,7 @@ class Task:
 
     def to_dict(self):
         return {
+            'id': self.id,
             'username': self.username,
             'title': self.title,
             'description': self.description,
@@ -37,71 +56,446 @@ class Task:
 
     @classmethod
     def from_dict(cls, d):
-        return cls(d['username'], d['title'], d['description'], d['assigned_date'], d['due_date'], d['completed'])
+        return cls(d['username'], d['title'], d['description'],
+                   d['assigned_date'], d['due_date'], d['completed'],
+                   d.get('id'))
+
+# Reports
+@functools.lru_cache(maxsize=None)
+def parse_due_date(text):
+    """Parse a DATE_FORMAT date, or return None if it is invalid.
+
+    Memoised: due dates repeat a lot and strptime is slow.
+    """
+    try:
+        return datetime.datetime.strptime(text, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+class ReportStats:
+    """Task totals behind the overview reports.
+
+    Built in one pass with from_tasks(), then kept current with add() and
+    remove() as tasks change. Overdue counts only move with the date, so
+    roll_forward() catches them up from the open tasks' due dates.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or datetime.date.today()
+        self.total = 0
+        self.completed = 0
+        self.overdue = 0
+        # username -> [total, completed, overdue]
+        self.users = {}
+        # due date -> {username: count} of the tasks not yet completed
+        self._open_due = {}
+
+    @classmethod
+    def from_tasks(cls, tasks, today=None):
+        stats = cls(today)
+        for task in tasks:
+            stats.add(task)
+        return stats
+
+    def add(self, task):
+        self._count(task, 1)
+
+    def remove(self, task):
+        self._count(task, -1)
+
+    def _count(self, task, sign):
+        username = task.username
+        counts = self.users.get(username)
+        if counts is None:
+            counts = self.users[username] = [0, 0, 0]
+        self.total += sign
+        counts[0] += sign
+        if task.completed == 'Yes':
+            self.completed += sign
+            counts[1] += sign
+        elif task.completed == 'No':
+            due_date = parse_due_date(task.due_date)
+            if due_date is not None:
+                open_due = self._open_due.get(due_date)
+                if open_due is None:
+                    open_due = self._open_due[due_date] = {}
+                open_due[username] = open_due.get(username, 0) + sign
+                if not open_due[username]:
+                    del open_due[username]
+                    if not open_due:
+                        del self._open_due[due_date]
+                if due_date < self.today:
+                    self.overdue += sign
+                    counts[2] += sign
+        if not counts[0]:
+            del self.users[username]
+
+    def roll_forward(self, today=None):
+        """Move the stats on to today, counting the tasks that fell overdue."""
+        today = today or datetime.date.today()
+        if today <= self.today:
+            return
+        for due_date, open_due in self._open_due.items():
+            if self.today <= due_date < today:
+                for username, count in open_due.items():
+                    self.overdue += count
+                    self.users[username][2] += count
+        self.today = today
+
+    def task_overview(self):
+        total = self.total
+        uncompleted = total - self.completed
+        incomplete_percentage = (uncompleted / total * 100) if total > 0 else 0
+        overdue_percentage = (self.overdue / total * 100) if total > 0 else 0
+        return (f"Total tasks: {total}\n"
+                f"Completed tasks: {self.completed}\n"
+                f"Uncompleted tasks: {uncompleted}\n"
+                f"Overdue tasks: {self.overdue}\n"
+                f"Incomplete percentage: {incomplete_percentage:.2f}%\n"
+                f"Overdue percentage: {overdue_percentage:.2f}%\n")
+
+    def user_overview(self, usernames):
+        total_tasks = self.total
+        lines = [f"Total users: {len(usernames)}\n",
+                 f"Total tasks: {total_tasks}\n"]
+        for username in usernames:
+            user_total, user_completed, overdue = \
+                self.users.get(username, (0, 0, 0))
+            user_percentage = \
+                (user_total / total_tasks * 100) if total_tasks > 0 else 0
+            if user_total > 0:
+                completed_percentage = user_completed / user_total * 100
+                uncompleted_percentage = \
+                    (user_total - user_completed) / user_total * 100
+                overdue_percentage = overdue / user_total * 100
+            else:
+                completed_percentage = uncompleted_percentage = 0
+                overdue_percentage = 0
+            lines.append(
+                f"\nUser: {username}\n"
+                f"  Total tasks: {user_total}\n"
+                f"  Percentage of total tasks: {user_percentage:.2f}%\n"
+                f"  Completed percentage: {completed_percentage:.2f}%\n"
+                f"  Uncompleted percentage: {uncompleted_percentage:.2f}%\n"
+                f"  Overdue percentage: {overdue_percentage:.2f}%\n")
+        return ''.join(lines)
+
+# File formats
+# Since v2 both files are CSV under a header line, so any field may hold
+# commas, quotes or newlines. Older files had no header and joined the
+# fields with bare commas; they are still read, and rewritten in the
+# current format on the next save.
+# Since tasks v3, edits and deletes are appended: a task's row may be
+# followed by newer rows for the same id, or by a delete marker (a row
+# holding only the id). The last row for an id wins, and the task keeps
+# the place of its first row.
+def _task_row(task):
+    return (task.id, task.username, task.title, task.description,
+            task.assigned_date, task.due_date, task.completed)
+
+def _parse_legacy_task(line):
+    # A description containing commas was split into extra parts. Legacy
+    # rows carry no id; the data access layer numbers them.
+    parts = line.strip().split(',')
+    if len(parts) < 6:
+        return None
+    return Task(parts[0], parts[1], ','.join(parts[2:-3]), *parts[-3:])
+
+def read_tasks(f):
+    """Read a tasks file opened with newline=''.
+
+    Returns (tasks, whether the file was in the current format, number
+    of rows superseded by later ones).
+    """
+    first = f.readline()
+    header = first.rstrip('\r\n')
+    if header in (TASKS_HEADER, '#tasks v2'):
+        tasks, superseded = {}, 0
+        for row in csv.reader(f):
+            if not row or not row[0].isdigit():
+                continue
+            task_id = int(row[0])
+            if len(row) == 7:
+                if task_id in tasks:
+                    superseded += 1
+                tasks[task_id] = Task(row[1], row[2], row[3], row[4],
+                                      row[5], row[6], task_id)
+            elif len(row) == 1:
+                superseded += 1
+                if tasks.pop(task_id, None) is not None:
+                    superseded += 1
+        return list(tasks.values()), header == TASKS_HEADER, superseded
+    if first.startswith('#tasks '):
+        raise FileFormatError(
+            f"Unsupported tasks file version: {first.strip()}")
+    lines = itertools.chain([first], f)
+    tasks = [task for task in map(_parse_legacy_task, lines)
+             if task is not None]
+    return tasks, False, 0
+
+def write_tasks(f, tasks):
+    f.write(TASKS_HEADER + '\n')
+    csv.writer(f, lineterminator='\n').writerows(map(_task_row, tasks))
+
+def read_users(f):
+    """Read a users file opened with newline=''.
+
+    Returns {username: password}.
+    """
+    first = f.readline()
+    if first.rstrip('\r\n') == USERS_HEADER:
+        return {row[0]: row[1] for row in csv.reader(f) if len(row) == 2}
+    if first.startswith('#users '):
+        raise FileFormatError(
+            f"Unsupported users file version: {first.strip()}")
+    users = {}
+    for line in itertools.chain([first], f):
+        username, sep, password = line.strip().partition(', ')
+        if sep:
+            users[username] = password
+    return users
+
+def write_users(f, users):
+    f.write(USERS_HEADER + '\n')
+    csv.writer(f, lineterminator='\n').writerows(users.items())
 
 # Data Access Layer
-class DataAccess:
+class ReportStatsMixin:
+    """Report stats cached by a data access object.
+
+    They are built from the stored tasks on first use; TaskManager then
+    applies each of its changes with track_task_change(), so reports do
+    not need to reload every task.
+    """
+
+    _report_stats = None
+    _report_signature = None
+
+    def _tasks_signature(self):
+        return None
+
+    def report_stats(self):
+        """Return the current ReportStats of the stored tasks."""
+        signature = self._tasks_signature()
+        if self._report_stats is None or signature != self._report_signature:
+            self._report_stats = ReportStats.from_tasks(self.load_tasks())
+            self._report_signature = signature
+        self._report_stats.roll_forward()
+        return self._report_stats
+
+    def track_task_change(self, old=None, new=None):
+        """Apply a change (old task replaced by new) to the cached stats."""
+        if self._report_stats is not None:
+            if old is not None:
+                self._report_stats.remove(old)
+            if new is not None:
+                self._report_stats.add(new)
+
+class DataAccess(ReportStatsMixin):
     def __init__(self, user_file=USER_FILE, task_file=TASK_FILE):
         self.user_file = Path(user_file)
         self.task_file = Path(task_file)
-
+        # id -> Task, in file order; reloaded when the file changes
+        self._index = None
+        # username -> {id: None}, in file order; may still hold ids of tasks
+        # since deleted or reassigned, which get_user_tasks() drops
+        self._by_user = {}
+        self._index_signature = None
+        self._next_id = 1
+        # Whether the file must be rewritten before rows can be appended
+        self._rewrite = True
+        # Rows in the file superseded by later ones
+        self._superseded = 0
+
+    # An unsupported file version raises FileFormatError rather than being
+    # treated as empty, which the next save would overwrite.
     def load_users(self):
         users = {}
         if not self.user_file.exists():
             return users
         try:
-            with open(self.user_file, 'r') as f:
-                for line in f:
-                    parts = line.strip().split(', ')
-                    if len(parts) == 2:
-                        users[parts[0]] = parts[1]
+            with open(self.user_file, 'r', newline='') as f:
+                users = read_users(f)
+        except FileFormatError as e:
+            raise FileFormatError(f"{self.user_file}: {e}") from None
         except Exception as e:
             print(f"Error loading users: {e}")
         return users
 
     def save_users(self, users):
         try:
-            with open(self.user_file, 'w') as f:
-                for u, p in users.items():
-                    f.write(f"{u}, {p}\n")
+            with open(self.user_file, 'w', newline='') as f:
+                write_users(f, users)
         except Exception as e:
             print(f"Error saving users: {e}")
 
-    def load_tasks(self):
-        tasks = []
+    def _parse_tasks(self):
         if not self.task_file.exists():
-            return tasks
+            return [], False, 0
         try:
-            with open(self.task_file, 'r') as f:
-                for line in f:
-                    parts = line.strip().split(',')
-                    if len(parts) == 6:
-                        tasks.append(Task.from_dict({
-                            'username': parts[0],
-                            'title': parts[1],
-                            'description': parts[2],
-                            'assigned_date': parts[3],
-                            'due_date': parts[4],
-                            'completed': parts[5]
-                        }))
+            with open(self.task_file, 'r', newline='') as f:
+                return read_tasks(f)
+        except FileFormatError as e:
+            raise FileFormatError(f"{self.task_file}: {e}") from None
         except Exception as e:
             print(f"Error loading tasks: {e}")
+        return [], False, 0
+
+    def _load_index(self):
+        signature = self._tasks_signature()
+        if self._index is None or signature != self._index_signature:
+            tasks, current_format, superseded = self._parse_tasks()
+            numbered = self._set_index(tasks)
+            self._rewrite = numbered or not current_format
+            self._superseded = superseded
+            self._index_signature = signature
+        return self._index
+
+    def _set_index(self, tasks):
+        # Tasks from files written before ids existed are numbered in file
+        # order after the highest id in use, and keep that id once saved.
+        self._next_id = max((t.id for t in tasks if t.id is not None),
+                            default=0) + 1
+        self._index = {}
+        self._by_user = {}
+        numbered = False
+        for task in tasks:
+            if task.id is None or task.id in self._index:
+                task.id = self._next_id
+                self._next_id += 1
+                numbered = True
+            self._index[task.id] = task
+            self._by_user.setdefault(task.username, {})[task.id] = None
+        return numbered
+
+    # Like MemoryDataAccess, loads return the stored Task objects
+    # themselves; change them through TaskManager so the file follows.
+    def load_tasks(self):
+        return list(self._load_index().values())
+
+    def get_task(self, task_id):
+        return self._load_index().get(task_id)
+
+    def get_user_tasks(self, username):
+        index = self._load_index()
+        ids = self._by_user.get(username)
+        if not ids:
+            return []
+        tasks = [index[i] for i in ids
+                 if i in index and index[i].username == username]
+        if len(tasks) != len(ids):
+            self._by_user[username] = dict.fromkeys(t.id for t in tasks)
         return tasks
 
     def save_tasks(self, tasks):
+        self._set_index(tasks)
+        # A bulk save is not tracked, so the report stats start over.
+        self._report_stats = None
+        self._write_tasks()
+
+    def add_task(self, task):
+        """Give task the next id and append it to the file."""
+        index = self._load_index()
+        task.id = self._next_id
+        self._next_id += 1
+        index[task.id] = task
+        self._by_user.setdefault(task.username, {})[task.id] = None
+        self._append_rows([_task_row(task)])
+
+    def update_task(self, task):
+        """Replace the stored task with the same id.
+
+        The new row is appended; it supersedes the old one on load.
+        """
+        index = self._load_index()
+        if task.id in index:
+            index[task.id] = task
+            if task.id not in self._by_user.get(task.username, ()):
+                # Reassigned: list the new owner's tasks in file order again.
+                self._by_user[task.username] = dict.fromkeys(
+                    t.id for t in index.values()
+                    if t.username == task.username)
+            self._superseded += 1
+            self._append_rows([_task_row(task)])
+
+    def delete_task(self, task_id):
+        """Remove a task by appending a delete marker for its id."""
+        index = self._load_index()
+        task = index.pop(task_id, None)
+        if task is not None:
+            self._by_user.get(task.username, {}).pop(task_id, None)
+            # The marker and the task's row are both dead from now on.
+            self._superseded += 2
+            self._append_rows([(task_id,)])
+
+    def _append_rows(self, rows):
+        limit = max(TASKS_COMPACT_MIN_ROWS, len(self._index))
+        if self._rewrite or self._superseded > limit:
+            # Older or missing files get the header and the ids written,
+            # and files mostly made of superseded rows are compacted.
+            self._write_tasks()
+            return
+        current = self._report_signature == self._tasks_signature()
+        try:
+            missing_newline = self._missing_final_newline()
+            with open(self.task_file, 'a', newline='') as f:
+                if missing_newline:
+                    f.write('\n')
+                csv.writer(f, lineterminator='\n').writerows(rows)
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+            current = False
+        self._written(current)
+
+    def _write_tasks(self):
+        # Written from the index rather than a reload.
+        current = self._report_signature == self._tasks_signature()
         try:
-            with open(self.task_file, 'w') as f:
-                for task in tasks:
-                    d = task.to_dict()
-                    f.write(f"{d['username']},{d['title']},{d['description']},{d['assigned_date']},{d['due_date']},{d['completed']}\n")
+            with open(self.task_file, 'w', newline='') as f:
+                write_tasks(f, self._index.values())
+            self._rewrite = False
+            self._superseded = 0
         except Exception as e:
             print(f"Error saving tasks: {e}")
+            current = False
+        self._written(current)
+
+    def _written(self, current):
+        # Stats that matched the file before our own write still hold once
+        # TaskManager has applied the change; others must be rebuilt.
+        signature = self._tasks_signature()
+        self._index_signature = signature
+        if current:
+            self._report_signature = signature
+        else:
+            self._report_stats = None
+
+    def _missing_final_newline(self):
+        try:
+            with open(self.task_file, 'rb') as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except FileNotFoundError:
+            return False
+
+    def _tasks_signature(self):
+        try:
+            st = self.task_file.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
 # In-memory Data Access for Testing
-class MemoryDataAccess:
+class MemoryDataAccess(ReportStatsMixin):
     def __init__(self):
         self.users = {}
         self.tasks = []
+        self._by_id = {}
+        # username -> {id: None}, as in DataAccess
+        self._by_user = {}
+        self._next_id = 1
 
     def load_users(self):
         return self.users.copy()
@@ -112,8 +506,57 @@ class MemoryDataAccess:
     def load_tasks(self):
         return self.tasks.copy()
 
+    def get_task(self, task_id):
+        return self._by_id.get(task_id)
+
+    def get_user_tasks(self, username):
+        ids = self._by_user.get(username)
+        if not ids:
+            return []
+        by_id = self._by_id
+        tasks = [by_id[i] for i in ids
+                 if i in by_id and by_id[i].username == username]
+        if len(tasks) != len(ids):
+            self._by_user[username] = dict.fromkeys(t.id for t in tasks)
+        return tasks
+
     def save_tasks(self, tasks):
         self.tasks = tasks.copy()
+        self._next_id = max((t.id for t in tasks if t.id is not None),
+                            default=0) + 1
+        self._by_id = {}
+        self._by_user = {}
+        for task in self.tasks:
+            if task.id is None or task.id in self._by_id:
+                task.id = self._next_id
+                self._next_id += 1
+            self._by_id[task.id] = task
+            self._by_user.setdefault(task.username, {})[task.id] = None
+        self._report_stats = None
+
+    def add_task(self, task):
+        task.id = self._next_id
+        self._next_id += 1
+        self.tasks.append(task)
+        self._by_id[task.id] = task
+        self._by_user.setdefault(task.username, {})[task.id] = None
+
+    def update_task(self, task):
+        stored = self._by_id.get(task.id)
+        if stored is None:
+            return
+        if stored is not task:
+            self.tasks[self.tasks.index(stored)] = task
+            self._by_id[task.id] = task
+        if task.id not in self._by_user.get(task.username, ()):
+            self._by_user[task.username] = dict.fromkeys(
+                t.id for t in self.tasks if t.username == task.username)
+
+    def delete_task(self, task_id):
+        stored = self._by_id.pop(task_id, None)
+        if stored is not None:
+            self.tasks.remove(stored)
+            self._by_user.get(stored.username, {}).pop(task_id, None)
 
 # Business Logic Layer
 class TaskManager:
@@ -143,43 +586,56 @@ class TaskManager:
             datetime.datetime.strptime(due_date, DATE_FORMAT)
         except ValueError:
             return "Invalid due date format. Use DD MMM YYYY."
-        tasks = self.data_access.load_tasks()
         assigned_date = datetime.date.today().strftime(DATE_FORMAT)
         task = Task(username, title, description, assigned_date, due_date)
-        tasks.append(task)
-        self.data_access.save_tasks(tasks)
+        self.data_access.add_task(task)
+        self._track(new=task)
         return "Task added successfully."
 
     def get_all_tasks(self):
         return self.data_access.load_tasks()
 
     def get_user_tasks(self, username):
+        get_user_tasks = getattr(self.data_access, 'get_user_tasks', None)
+        if get_user_tasks is not None:
+            return get_user_tasks(username)
         tasks = self.data_access.load_tasks()
         return [t for t in tasks if t.username == username]
 
+    def _find_stored(self, task):
+        if task.id is not None:
+            return self.data_access.get_task(task.id)
+        # A task built by the caller rather than loaded has no id yet.
+        for t in self.data_access.load_tasks():
+            if t.username == task.username and t.title == task.title and t.assigned_date == task.assigned_date:
+                return t
+        return None
+
+    def _track(self, old=None, new=None):
+        # Keep the data access layer's report stats in step, if it has any.
+        track = getattr(self.data_access, 'track_task_change', None)
+        if track is not None:
+            track(old, new)
+
+    def _edit_task(self, task, field, value):
+        stored = self._find_stored(task)
+        old = copy.copy(stored) if stored is not None else None
+        setattr(task, field, value)
+        if stored is not None:
+            setattr(stored, field, value)
+            self.data_access.update_task(stored)
+            self._track(old, stored)
+
     def mark_task_complete(self, task):
         if task.completed == 'No':
-            task.completed = 'Yes'
-            tasks = self.data_access.load_tasks()
-            # Update the task in list
-            for t in tasks:
-                if t.username == task.username and t.title == task.title and t.assigned_date == task.assigned_date:
-                    t.completed = 'Yes'
-                    break
-            self.data_access.save_tasks(tasks)
+            self._edit_task(task, 'completed', 'Yes')
             return True
         return False
 
     def update_task_username(self, task, new_username):
         if not new_username:
             return False
-        task.username = new_username
-        tasks = self.data_access.load_tasks()
-        for t in tasks:
-            if t.username == task.username and t.title == task.title and t.assigned_date == task.assigned_date:
-                t.username = new_username
-                break
-        self.data_access.save_tasks(tasks)
+        self._edit_task(task, 'username', new_username)
         return True
 
     def update_task_due_date(self, task, new_due_date):
@@ -187,79 +643,36 @@ class TaskManager:
             datetime.datetime.strptime(new_due_date, DATE_FORMAT)
         except ValueError:
             return False
-        task.due_date = new_due_date
-        tasks = self.data_access.load_tasks()
-        for t in tasks:
-            if t.username == task.username and t.title == task.title and t.assigned_date == task.assigned_date:
-                t.due_date = new_due_date
-                break
-        self.data_access.save_tasks(tasks)
+        self._edit_task(task, 'due_date', new_due_date)
         return True
 
     def delete_task(self, index):
         tasks = self.data_access.load_tasks()
         if 0 <= index < len(tasks):
-            del tasks[index]
-            self.data_access.save_tasks(tasks)
+            removed = tasks[index]
+            self.data_access.delete_task(removed.id)
+            self._track(old=removed)
             return True
         return False
 
-    def generate_reports(self):
-        tasks = self.data_access.load_tasks()
+    def report_stats(self):
+        report_stats = getattr(self.data_access, 'report_stats', None)
+        if report_stats is not None:
+            return report_stats()
+        return ReportStats.from_tasks(self.data_access.load_tasks())
+
+    def generate_reports(self, task_overview_file=TASK_OVERVIEW_FILE,
+                         user_overview_file=USER_OVERVIEW_FILE):
         users = self.data_access.load_users()
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.completed == 'Yes'])
-        uncompleted_tasks = total_tasks - completed_tasks
-        overdue_tasks = 0
-        today = datetime.date.today()
-        for task in tasks:
-            if task.completed == 'No':
-                try:
-                    due_date = datetime.datetime.strptime(task.due_date, DATE_FORMAT).date()
-                    if due_date < today:
-                        overdue_tasks += 1
-                except ValueError:
-                    pass  # skip invalid dates
-        incomplete_percentage = (uncompleted_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        overdue_percentage = (overdue_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        stats = self.report_stats()
         try:
-            with open(TASK_OVERVIEW_FILE, 'w') as file:
-                file.write(f"Total tasks: {total_tasks}\n")
-                file.write(f"Completed tasks: {completed_tasks}\n")
-                file.write(f"Uncompleted tasks: {uncompleted_tasks}\n")
-                file.write(f"Overdue tasks: {overdue_tasks}\n")
-                file.write(f"Incomplete percentage: {incomplete_percentage:.2f}%\n")
-                file.write(f"Overdue percentage: {overdue_percentage:.2f}%\n")
+            with open(task_overview_file, 'w') as file:
+                file.write(stats.task_overview())
         except Exception as e:
             print(f"Error writing task overview: {e}")
-        total_users = len(users)
         try:
-            with open(USER_OVERVIEW_FILE, 'w') as file:
-                file.write(f"Total users: {total_users}\n")
-                file.write(f"Total tasks: {total_tasks}\n")
-                for username in users:
-                    user_tasks = [t for t in tasks if t.username == username]
-                    user_total = len(user_tasks)
-                    user_completed = len([t for t in user_tasks if t.completed == 'Yes'])
-                    user_percentage = (user_total / total_tasks * 100) if total_tasks > 0 else 0
-                    completed_percentage = (user_completed / user_total * 100) if user_total > 0 else 0
-                    uncompleted_percentage = ((user_total - user_completed) / user_total * 100) if user_total > 0 else 0
-                    overdue = 0
-                    for task in user_tasks:
-                        if task.completed == 'No':
-                            try:
-                                due_date = datetime.datetime.strptime(task.due_date, DATE_FORMAT).date()
-                                if due_date < today:
-                                    overdue += 1
-                            except ValueError:
-                                pass
-                    overdue_percentage = (overdue / user_total * 100) if user_total > 0 else 0
-                    file.write(f"\nUser: {username}\n")
-                    file.write(f"  Total tasks: {user_total}\n")
-                    file.write(f"  Percentage of total tasks: {user_percentage:.2f}%\n")
-                    file.write(f"  Completed percentage: {completed_percentage:.2f}%\n")
-                    file.write(f"  Uncompleted percentage: {uncompleted_percentage:.2f}%\n")
-                    file.write(f"  Overdue percentage: {overdue_percentage:.2f}%\n")
+            with open(user_overview_file, 'w') as file:
+                file.write(stats.user_overview(list(users)))
         except Exception as e:
             print(f"Error writing user overview: {e}")
         print("Reports generated.")
@@ -366,11 +779,13 @@ def view_mine(username, data_access=None):
     if data_access is None:
         data_access = DataAccess()
     tm = TaskManager(data_access)
-    my_tasks = tm.get_user_tasks(username)
-    if not my_tasks:
-        print("No tasks assigned to you.")
-        return
     while True:
+        # Fetched again each time round, so tasks reassigned to someone
+        # else drop out of the list.
+        my_tasks = tm.get_user_tasks(username)
+        if not my_tasks:
+            print("No tasks assigned to you.")
+            return
         for i, task in enumerate(my_tasks, 1):
             print(f"{i}. {task.title} - {task.description} - Due: {task.due_date} - Completed: {task.completed}")
         print("-1. Return to main menu")
@@ -460,17 +875,12 @@ def generate_reports(data_access=None):
 def display_statistics(data_access=None):
     if data_access is None:
         data_access = DataAccess()
-    try:
-        with open(TASK_OVERVIEW_FILE, 'r') as file:
-            print("Task Overview:")
-            print(file.read())
-        with open(USER_OVERVIEW_FILE, 'r') as file:
-            print("User Overview:")
-            print(file.read())
-    except FileNotFoundError:
-        print("Reports not found. Generating reports first...")
-        generate_reports(data_access)
-        display_statistics(data_access)
+    tm = TaskManager(data_access)
+    stats = tm.report_stats()
+    print("Task Overview:")
+    print(stats.task_overview())
+    print("User Overview:")
+    print(stats.user_overview(list(data_access.load_users())))
 
 # Main function
 def main():
@@ -691,5 +1101,309 @@ class TestReportGeneration(unittest.TestCase):
         self.assertEqual(completed_tasks, 1)
         self.assertEqual(len(users), 2)
 
+class TestReportStats(unittest.TestCase):
+    """Use Case 4: Report figures and file output"""
+
+    def setUp(self):
+        self.data_access = MemoryDataAccess()
+        self.tm = TaskManager(self.data_access)
+        self.tm.register_user('admin', 'admin', 'admin')
+        self.tm.register_user('john', 'pass', 'pass')
+        self.tm.register_user('jane', 'pass', 'pass')
+        self.tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+        self.tm.add_task('john', 'Task 2', 'Desc 2', '11 Dec 2023')
+        self.tm.add_task('admin', 'Task 3', 'Desc 3', '12 Dec 2099')
+        self.tm.mark_task_complete(self.data_access.load_tasks()[0])
+        self.today = datetime.date(2024, 1, 1)
+
+    def test_totals(self):
+        stats = ReportStats.from_tasks(self.data_access.load_tasks(),
+                                       self.today)
+        self.assertEqual((stats.total, stats.completed, stats.overdue),
+                         (3, 1, 1))
+        self.assertEqual(stats.users['john'], [2, 1, 1])
+        self.assertEqual(stats.users['admin'], [1, 0, 0])
+        self.assertNotIn('jane', stats.users)
+
+    def test_invalid_due_date_is_not_overdue(self):
+        tasks = [Task('john', 'Task', 'Desc', '01 Jan 2023', 'someday')]
+        stats = ReportStats.from_tasks(tasks, self.today)
+        self.assertEqual(stats.overdue, 0)
+
+    def test_overview_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            task_file = os.path.join(tmp, 'task_overview.txt')
+            user_file = os.path.join(tmp, 'user_overview.txt')
+            self.tm.generate_reports(task_file, user_file)
+            with open(task_file) as f:
+                self.assertEqual(f.read(),
+                                 "Total tasks: 3\n"
+                                 "Completed tasks: 1\n"
+                                 "Uncompleted tasks: 2\n"
+                                 "Overdue tasks: 1\n"
+                                 "Incomplete percentage: 66.67%\n"
+                                 "Overdue percentage: 33.33%\n")
+            with open(user_file) as f:
+                self.assertEqual(f.read(),
+                                 "Total users: 3\n"
+                                 "Total tasks: 3\n"
+                                 "\nUser: admin\n"
+                                 "  Total tasks: 1\n"
+                                 "  Percentage of total tasks: 33.33%\n"
+                                 "  Completed percentage: 0.00%\n"
+                                 "  Uncompleted percentage: 100.00%\n"
+                                 "  Overdue percentage: 0.00%\n"
+                                 "\nUser: john\n"
+                                 "  Total tasks: 2\n"
+                                 "  Percentage of total tasks: 66.67%\n"
+                                 "  Completed percentage: 50.00%\n"
+                                 "  Uncompleted percentage: 50.00%\n"
+                                 "  Overdue percentage: 50.00%\n"
+                                 "\nUser: jane\n"
+                                 "  Total tasks: 0\n"
+                                 "  Percentage of total tasks: 0.00%\n"
+                                 "  Completed percentage: 0.00%\n"
+                                 "  Uncompleted percentage: 0.00%\n"
+                                 "  Overdue percentage: 0.00%\n")
+
+class TestIncrementalReportStats(unittest.TestCase):
+    """Use Case 4: Report stats kept current as tasks change"""
+
+    def setUp(self):
+        self.data_access = MemoryDataAccess()
+        self.tm = TaskManager(self.data_access)
+        self.tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+        self.tm.add_task('john', 'Task 2', 'Desc 2', '11 Dec 2099')
+        self.stats = self.tm.report_stats()
+
+    def assertCurrent(self):
+        stats = self.tm.report_stats()
+        self.assertIs(stats, self.stats)
+        rebuilt = ReportStats.from_tasks(self.data_access.load_tasks(),
+                                         stats.today)
+        self.assertEqual(
+            (stats.total, stats.completed, stats.overdue, stats.users),
+            (rebuilt.total, rebuilt.completed, rebuilt.overdue, rebuilt.users))
+
+    def test_add_and_delete(self):
+        self.tm.add_task('jane', 'Task 3', 'Desc 3', '01 Jan 2020')
+        self.assertEqual(self.stats.overdue, 2)
+        self.assertCurrent()
+        self.tm.delete_task(0)
+        self.assertEqual(self.stats.users['john'], [1, 0, 0])
+        self.assertCurrent()
+
+    def test_edits(self):
+        task = self.data_access.load_tasks()[0]
+        self.tm.mark_task_complete(task)
+        self.assertEqual((self.stats.completed, self.stats.overdue), (1, 0))
+        self.assertCurrent()
+        self.tm.update_task_username(task, 'jane')
+        self.assertEqual(self.stats.users['jane'], [1, 1, 0])
+        self.assertCurrent()
+        self.tm.update_task_due_date(self.data_access.load_tasks()[1],
+                                     '01 Jan 2020')
+        self.assertEqual(self.stats.overdue, 1)
+        self.assertCurrent()
+
+    def test_roll_forward(self):
+        self.stats.roll_forward(datetime.date(2099, 12, 12))
+        self.assertEqual(self.stats.overdue, 2)
+        self.assertEqual(self.stats.users['john'], [2, 0, 2])
+
+    def test_file_changed_elsewhere(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_access = DataAccess(os.path.join(tmp, 'user.txt'),
+                                     os.path.join(tmp, 'tasks.txt'))
+            tm = TaskManager(data_access)
+            tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+            self.assertEqual(tm.report_stats().total, 1)
+            tm.add_task('john', 'Task 2', 'Desc 2', '10 Dec 2023')
+            self.assertEqual(tm.report_stats().total, 2)
+            other = DataAccess(data_access.user_file, data_access.task_file)
+            TaskManager(other).add_task('jane', 'Task 3', 'Desc 3',
+                                        '10 Dec 2023')
+            self.assertEqual(tm.report_stats().total, 3)
+
+class TestTaskIds(unittest.TestCase):
+    """Use Case 3: Edits find tasks by id and persist them"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.task_file = os.path.join(self.tmp.name, 'tasks.txt')
+        self.data_access = DataAccess(os.path.join(self.tmp.name, 'user.txt'),
+                                      self.task_file)
+        self.tm = TaskManager(self.data_access)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reload(self):
+        data_access = DataAccess(self.data_access.user_file, self.task_file)
+        return data_access.load_tasks()
+
+    def test_ids_assigned(self):
+        self.tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+        self.tm.add_task('jane', 'Task 2', 'Desc 2', '11 Dec 2023')
+        self.assertEqual([t.id for t in self.reload()], [1, 2])
+        self.assertEqual(self.data_access.get_task(2).username, 'jane')
+
+    def test_edits_persisted(self):
+        self.tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+        task = self.reload()[0]
+        self.assertTrue(self.tm.update_task_username(task, 'jane'))
+        self.assertTrue(self.tm.update_task_due_date(task, '20 Dec 2023'))
+        self.assertTrue(self.tm.mark_task_complete(task))
+        stored = self.reload()[0]
+        self.assertEqual(
+            (stored.id, stored.username, stored.due_date, stored.completed),
+            (1, 'jane', '20 Dec 2023', 'Yes'))
+
+    def test_file_without_ids(self):
+        with open(self.task_file, 'w') as f:
+            f.write("john,Task 1,Desc 1,01 Oct 2023,10 Oct 2023,No\n"
+                    "jane,Task 2,Desc 2,02 Oct 2023,11 Oct 2023,Yes")
+        self.tm.add_task('john', 'Task 3', 'Desc 3', '10 Dec 2023')
+        tasks = self.reload()
+        self.assertEqual([(t.id, t.title) for t in tasks],
+                         [(1, 'Task 1'), (2, 'Task 2'), (3, 'Task 3')])
+
+    def rows(self):
+        with open(self.task_file, newline='') as f:
+            return list(csv.reader(f))
+
+    def test_edits_and_deletes_appended(self):
+        for i in range(1, 4):
+            self.tm.add_task('john', f'Task {i}', 'Desc', '10 Dec 2023')
+        self.tm.mark_task_complete(self.data_access.get_task(1))
+        self.tm.delete_task(1)  # the second task, id 2
+        rows = self.rows()
+        self.assertEqual([r[0] for r in rows[1:]], ['1', '2', '3', '1', '2'])
+        self.assertEqual((rows[-2][6], len(rows[-1])), ('Yes', 1))
+        # An edited task keeps its place; the last row for an id wins.
+        self.assertEqual([(t.id, t.completed) for t in self.reload()],
+                         [(1, 'Yes'), (3, 'No')])
+        self.tm.add_task('jane', 'Task 4', 'Desc', '10 Dec 2023')
+        self.assertEqual([t.id for t in self.reload()], [1, 3, 4])
+
+    def test_compaction(self):
+        self.tm.add_task('john', 'Task 1', 'Desc', '10 Dec 2023')
+        self.tm.add_task('john', 'Task 2', 'Desc', '10 Dec 2023')
+        with unittest.mock.patch.dict(globals(), TASKS_COMPACT_MIN_ROWS=5):
+            for day in range(10, 30):
+                self.tm.update_task_due_date(self.data_access.get_task(1),
+                                             f'{day} Dec 2023')
+                self.assertLessEqual(len(self.rows()), 1 + 2 + 6)
+        self.assertEqual([(t.id, t.due_date) for t in self.reload()],
+                         [(1, '29 Dec 2023'), (2, '10 Dec 2023')])
+
+    def test_v2_file_rewritten(self):
+        with open(self.task_file, 'w') as f:
+            f.write("#tasks v2\n"
+                    "1,john,Task 1,Desc 1,01 Oct 2023,10 Oct 2023,No\n")
+        self.tm.mark_task_complete(self.data_access.get_task(1))
+        self.assertEqual(self.rows(), [
+            [TASKS_HEADER],
+            ['1', 'john', 'Task 1', 'Desc 1', '01 Oct 2023', '10 Oct 2023',
+             'Yes']])
+
+class TestFileFormat(unittest.TestCase):
+    """Task and user files round-trip any field content"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.user_file = os.path.join(self.tmp.name, 'user.txt')
+        self.task_file = os.path.join(self.tmp.name, 'tasks.txt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reload(self):
+        return DataAccess(self.user_file, self.task_file)
+
+    def test_round_trip(self):
+        data_access = DataAccess(self.user_file, self.task_file)
+        data_access.save_users({'john': 'pa, "ss"'})
+        task = Task('john', 'Fix, "quoted"', 'Line 1\nLine 2, more',
+                    '01 Oct 2023', '10 Oct 2023')
+        TaskManager(data_access).add_task(task.username, task.title,
+                                          task.description, task.due_date)
+        self.assertEqual(self.reload().load_users(), {'john': 'pa, "ss"'})
+        stored = self.reload().load_tasks()
+        self.assertEqual(len(stored), 1)
+        self.assertEqual((stored[0].title, stored[0].description),
+                         (task.title, task.description))
+        with open(self.task_file) as f:
+            self.assertEqual(f.readline(), TASKS_HEADER + '\n')
+
+    def test_legacy_files(self):
+        with open(self.user_file, 'w') as f:
+            f.write("admin, adm1n\njohn, pass")
+        with open(self.task_file, 'w') as f:
+            f.write("john,Fix Bug,Fix it, then test it,"
+                    "01 Oct 2023,10 Oct 2023,No\n")
+        data_access = self.reload()
+        self.assertEqual(data_access.load_users(),
+                         {'admin': 'adm1n', 'john': 'pass'})
+        task = data_access.load_tasks()[0]
+        self.assertEqual((task.id, task.description, task.completed),
+                         (1, 'Fix it, then test it', 'No'))
+        TaskManager(data_access).mark_task_complete(task)
+        with open(self.task_file) as f:
+            self.assertEqual(f.read(), TASKS_HEADER + '\n'
+                             '1,john,Fix Bug,"Fix it, then test it",'
+                             '01 Oct 2023,10 Oct 2023,Yes\n')
+
+    def test_legacy_numeric_username(self):
+        with open(self.task_file, 'w') as f:
+            f.write("42,Fix,Fix it, then test,01 Oct 2023,10 Oct 2023,No\n")
+        task = self.reload().load_tasks()[0]
+        self.assertEqual(
+            (task.id, task.username, task.title, task.description),
+            (1, '42', 'Fix', 'Fix it, then test'))
+
+    def test_unsupported_version(self):
+        with open(self.task_file, 'w') as f:
+            f.write("#tasks v99\n")
+        with self.assertRaisesRegex(FileFormatError, 'tasks.txt: Unsupported'):
+            self.reload().load_tasks()
+
+    def test_undecodable_file_is_not_a_format_error(self):
+        with open(self.task_file, 'wb') as f:
+            f.write(TASKS_HEADER.encode() +
+                    b"\n1,john,T\xff,D,01 Oct 2023,10 Oct 2023,No\n")
+        self.assertEqual(self.reload().load_tasks(), [])
+
+class TestUserTaskIndex(unittest.TestCase):
+    """Use Case 3: A user's tasks follow adds, edits and deletes"""
+
+    def check(self, data_access):
+        tm = TaskManager(data_access)
+        tm.add_task('john', 'Task 1', 'Desc 1', '10 Dec 2023')
+        tm.add_task('jane', 'Task 2', 'Desc 2', '11 Dec 2023')
+        tm.add_task('john', 'Task 3', 'Desc 3', '12 Dec 2023')
+        self.assertEqual([t.title for t in tm.get_user_tasks('john')],
+                         ['Task 1', 'Task 3'])
+        task = tm.get_user_tasks('john')[0]
+        tm.update_task_username(task, 'jane')
+        # Reassigned tasks keep their place in file order.
+        self.assertEqual([t.title for t in tm.get_user_tasks('jane')],
+                         ['Task 1', 'Task 2'])
+        self.assertIs(tm.get_user_tasks('jane')[0], task)
+        self.assertEqual([t.title for t in tm.get_user_tasks('john')],
+                         ['Task 3'])
+        tm.delete_task(1)
+        self.assertEqual([t.title for t in tm.get_user_tasks('jane')],
+                         ['Task 1'])
+        self.assertEqual(tm.get_user_tasks('nobody'), [])
+
+    def test_memory(self):
+        self.check(MemoryDataAccess())
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.check(DataAccess(os.path.join(tmp, 'user.txt'),
+                                  os.path.join(tmp, 'tasks.txt')))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
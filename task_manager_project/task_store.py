@@ -0,0 +1,369 @@
+import bisect
+import threading
+from constants import PRIORITIES, STATUSES, DATE_FORMAT
+from search_index import SearchIndex
+from utilities import lazy_datetime as _dt
+
+# Tasks without a (valid) due date sort after every real date;
+# this is datetime.date.max.toordinal() + 1.
+NO_DUE_DATE = 3652060
+
+
+class TaskIndex:
+    """Secondary indexes over a set of tasks.
+
+    status and priority are kept as hash maps from value to task ids, and
+    due_date/created_date as sorted lists of (date ordinal, position, id),
+    so that
+    filters and ordered scans cost roughly the size of their result.
+    Positions record file order and break ties the same way a stable sort
+    over the file would. open_due counts the tasks that are not completed
+    by due date ordinal, which keeps the overdue count cheap.
+    """
+
+    def __init__(self):
+        self.by_status = {status: set() for status in STATUSES}
+        self.by_priority = {priority: set() for priority in PRIORITIES}
+        self.by_due_date = []
+        self.by_created_date = []
+        self.position = {}
+        self._next_position = 0
+        self.open_due = {}
+        # Number of open tasks due before self._today, once asked for.
+        self._overdue = 0
+        self._today = None
+
+    @staticmethod
+    def due_key(task):
+        ordinal = task.due_ordinal
+        return NO_DUE_DATE if ordinal is None else ordinal
+
+    @staticmethod
+    def created_key(task):
+        ordinal = task.created_ordinal
+        return 0 if ordinal is None else ordinal
+
+    def add(self, task, keep_sorted=True):
+        position = self.position.get(task.id)
+        if position is None:
+            position = self._next_position
+            self._next_position += 1
+            self.position[task.id] = position
+        self.by_status.setdefault(task.status, set()).add(task.id)
+        self.by_priority.setdefault(task.priority, set()).add(task.id)
+        self._count_open(task, 1)
+        due = (self.due_key(task), position, task.id)
+        created = (self.created_key(task), position, task.id)
+        if keep_sorted:
+            bisect.insort(self.by_due_date, due)
+            bisect.insort(self.by_created_date, created)
+        else:
+            self.by_due_date.append(due)
+            self.by_created_date.append(created)
+
+    def sort(self):
+        """Restore the sorted lists after add(..., keep_sorted=False)."""
+        self.by_due_date.sort()
+        self.by_created_date.sort()
+
+    def remove(self, task, keep_position=False):
+        position = self.position[task.id]
+        self.by_status[task.status].discard(task.id)
+        self.by_priority[task.priority].discard(task.id)
+        self._count_open(task, -1)
+        self._remove_sorted(self.by_due_date, self.due_key(task), position)
+        self._remove_sorted(self.by_created_date, self.created_key(task),
+                            position)
+        if not keep_position:
+            del self.position[task.id]
+
+    def _count_open(self, task, delta):
+        due = task.due_ordinal
+        if due is None or task.status == 'Completed':
+            return
+        count = self.open_due.get(due, 0) + delta
+        if count:
+            self.open_due[due] = count
+        else:
+            del self.open_due[due]
+        if self._today is not None and due < self._today:
+            self._overdue += delta
+
+    def overdue(self, today):
+        """Count the open tasks due before the date ordinal today.
+
+        The count is kept up to date by add() and remove() and rolled
+        forward a day at a time as today advances.
+        """
+        if self._today is None or today < self._today or \
+                today - self._today > len(self.open_due):
+            self._overdue = sum(count for due, count in self.open_due.items()
+                                if due < today)
+        else:
+            for due in range(self._today, today):
+                self._overdue += self.open_due.get(due, 0)
+        self._today = today
+        return self._overdue
+
+    @staticmethod
+    def _remove_sorted(entries, key, position):
+        i = bisect.bisect_left(entries, (key, position))
+        if i < len(entries) and entries[i][1] == position:
+            del entries[i]
+
+    @staticmethod
+    def date_ordinal(text):
+        """Parse a YYYY-MM-DD date into a date ordinal."""
+        try:
+            date = _dt().datetime.strptime(text, DATE_FORMAT).date()
+        except ValueError:
+            raise ValueError("Due date must be in YYYY-MM-DD format")
+        return date.toordinal()
+
+    def due_count(self, ordinal):
+        """Number of entries in by_due_date due before the date ordinal."""
+        return bisect.bisect_left(self.by_due_date, (ordinal,))
+
+    def ordered_ids(self, entries, reverse=False):
+        """Yield ids from a sorted index the way a stable sort would."""
+        if not reverse:
+            for entry in entries:
+                yield entry[2]
+            return
+        # Reversed keys, but ties keep their file order.
+        end = len(entries)
+        while end > 0:
+            start = bisect.bisect_left(entries, (entries[end - 1][0],),
+                                       0, end)
+            for entry in entries[start:end]:
+                yield entry[2]
+            end = start
+
+    def ids_by_priority(self, reverse=False):
+        """Yield ids grouped by priority rank, ties in file order."""
+        order = {p: i for i, p in enumerate(PRIORITIES)}
+        ranks = {}
+        for priority, ids in self.by_priority.items():
+            ranks.setdefault(order.get(priority, 0), []).extend(ids)
+        for rank in sorted(ranks, reverse=reverse):
+            yield from sorted(ranks[rank], key=self.position.__getitem__)
+
+
+class TaskStore:
+    """In-memory cache of the tasks held by a file handler.
+
+    Tasks are parsed once and served from memory until the file's
+    signature (mtime and size) changes underneath us. Writes made through
+    TaskManager are applied to the cache directly, so they do not force a
+    reload.
+
+    Callers get copies of the cached tasks, and put() stores a copy, so
+    changing a task in hand never touches the cache or its indexes.
+    """
+
+    def __init__(self, file_handler, task_factory):
+        self.file_handler = file_handler
+        self.task_factory = task_factory
+        self._tasks = None
+        self._index = None
+        self._search = None
+        self._signature = None
+        # Reader threads may call refresh() and stats() at the same time.
+        self._refresh_lock = threading.Lock()
+
+    def _current_signature(self):
+        get_signature = getattr(self.file_handler, 'get_signature', None)
+        if get_signature is None:
+            return None
+        return get_signature()
+
+    def refresh(self):
+        """Reload the tasks if the underlying file changed."""
+        with self._refresh_lock:
+            signature = self._current_signature()
+            if self._tasks is not None and signature is not None \
+                    and signature == self._signature:
+                return
+            tasks = {}
+            index = TaskIndex()
+            for task_dict in self.file_handler.load_tasks():
+                task = self.task_factory(task_dict)
+                tasks[task.id] = task
+            # Build the index in one pass; a duplicated id keeps its first
+            # position, as the dict does.
+            for task in tasks.values():
+                index.add(task, keep_sorted=False)
+            index.sort()
+            # Publish the new state only once it is complete.
+            self._tasks, self._index, self._search = tasks, index, None
+            self._signature = signature
+
+    def refresh_if_loaded(self):
+        """Like refresh(), but never triggers the initial load."""
+        if self._tasks is not None:
+            self.refresh()
+
+    def mark_written(self):
+        """Note that our own write changed the file.
+
+        Handlers report the signature they found just before writing
+        (under their lock, where they have one). If it is the one the
+        cache was loaded from, the new signature is remembered so the
+        write is not mistaken for an external change. Otherwise another
+        writer got in first, and the cache is dropped to pick up its
+        changes too.
+        """
+        before = getattr(self.file_handler, 'signature_before_write',
+                         self._signature)
+        if before != self._signature:
+            self.invalidate()
+            return
+        self._signature = self._current_signature()
+
+    def invalidate(self):
+        """Drop the cache; the next read reloads from the file handler."""
+        self._tasks = None
+        self._index = None
+        self._search = None
+        self._signature = None
+
+    def tasks(self):
+        """Return all tasks in file order."""
+        self.refresh()
+        return [task.copy() for task in self._tasks.values()]
+
+    def get(self, task_id):
+        """Return the task with the given id, or None."""
+        self.refresh()
+        task = self._tasks.get(task_id)
+        return None if task is None else task.copy()
+
+    def filter(self, status=None, priority=None, due_before=None):
+        """Return matching tasks in file order.
+
+        The smallest candidate set among the requested indexes (the
+        status and priority sets, or the run of by_due_date before the
+        cutoff, whose length a bisection gives) is scanned and checked
+        against the others, so the cost follows the smallest of them.
+        """
+        self.refresh()
+        index = self._index
+        sets = []
+        if status:
+            sets.append(index.by_status.get(status, set()))
+        if priority:
+            sets.append(index.by_priority.get(priority, set()))
+        sets.sort(key=len)
+        if due_before:
+            cutoff = index.date_ordinal(due_before)
+            end = index.due_count(cutoff)
+        if due_before and (not sets or end < len(sets[0])):
+            ids = [entry[2] for entry in index.by_due_date[:end]
+                   if all(entry[2] in s for s in sets)]
+        elif sets:
+            tasks = self._tasks
+            ids = [i for i in sets[0] if all(i in s for s in sets[1:])]
+            if due_before:
+                ids = [i for i in ids if index.due_key(tasks[i]) < cutoff]
+        else:
+            return [task.copy() for task in self._tasks.values()]
+        ids.sort(key=index.position.__getitem__)
+        return [self._tasks[i].copy() for i in ids]
+
+    def sorted_by(self, by, reverse=False):
+        """Return tasks ordered by priority, due_date or created_date.
+
+        Returns None for fields that are not indexed.
+        """
+        self.refresh()
+        index = self._index
+        if by == 'priority':
+            ids = index.ids_by_priority(reverse)
+        elif by == 'due_date':
+            ids = index.ordered_ids(index.by_due_date, reverse)
+        elif by == 'created_date':
+            ids = index.ordered_ids(index.by_created_date, reverse)
+        else:
+            return None
+        return [self._tasks[i].copy() for i in ids]
+
+    def stats(self, today=None):
+        """Return task counts by status and priority and the overdue count.
+
+        Everything comes from counters the index keeps up to date, so the
+        cost does not grow with the number of tasks. today is a date
+        ordinal and defaults to the current date.
+        """
+        self.refresh()
+        index = self._index
+        if today is None:
+            today = _dt().date.today().toordinal()
+        with self._refresh_lock:
+            # overdue() rolls a cached count forward, which two readers
+            # must not do at once.
+            overdue = index.overdue(today)
+        return {
+            'total': len(self._tasks),
+            'by_status': {s: len(ids) for s, ids in index.by_status.items()},
+            'by_priority': {p: len(ids)
+                            for p, ids in index.by_priority.items()},
+            'overdue': overdue,
+        }
+
+    def search(self, query, limit=None):
+        """Return tasks whose title or description match query, best first.
+
+        The full-text index is built on the first search and kept up to
+        date by later writes; ties keep file order.
+        """
+        self.refresh()
+        search = self._search
+        if search is None:
+            search = SearchIndex()
+            for task in self._tasks.values():
+                search.add(task, keep_sorted=False)
+            search.sort()
+            self._search = search
+        ids = search.search(query, limit,
+                            tiebreak=self._index.position.__getitem__)
+        return [self._tasks[i].copy() for i in ids]
+
+    def put(self, task):
+        """Record a task that was just saved or updated.
+
+        Call refresh() before the write so that external changes made
+        before it are not masked.
+        """
+        self.put_many([task])
+
+    def put_many(self, tasks):
+        """Record several tasks that were just saved or updated."""
+        if self._tasks is None:
+            return
+        for task in tasks:
+            task = task.copy()
+            old = self._tasks.get(task.id)
+            if old is not None:
+                self._index.remove(old, keep_position=True)
+            self._tasks[task.id] = task
+            self._index.add(task)
+            if self._search is not None:
+                self._search.remove(task.id)
+                self._search.add(task)
+        self.mark_written()
+
+    def remove(self, task_id):
+        """Record that a task was just deleted."""
+        self.remove_many([task_id])
+
+    def remove_many(self, task_ids):
+        """Record that several tasks were just deleted."""
+        if self._tasks is None:
+            return
+        for task_id in task_ids:
+            old = self._tasks.pop(task_id, None)
+            if old is not None:
+                self._index.remove(old)
+                if self._search is not None:
+                    self._search.remove(task_id)
+        self.mark_written()
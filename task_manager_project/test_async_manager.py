@@ -0,0 +1,127 @@
+import asyncio
+import os
+import unittest
+from async_manager import AsyncTaskManager, ReadWriteLock
+from business_logic import TaskManager
+from data_access import FileHandler
+from log_storage import LogFileHandler
+from test_support import TempDirMixin
+
+
+class FlakyLogHandler(LogFileHandler):
+    """Fails to save any task titled 'fail'."""
+
+    def save_task(self, task_dict):
+        if task_dict['title'] == 'fail':
+            raise OSError("disk full")
+        super().save_task(task_dict)
+
+
+class FailingSaveHandler(FileHandler):
+    """Batches writes like FileHandler but cannot save them."""
+
+    def write_tasks(self, task_dicts, filename=None):
+        raise OSError("disk full")
+
+
+class TestAsyncTaskManager(TempDirMixin,
+                           unittest.IsolatedAsyncioTestCase):
+    """Queued writes are applied together; each reports its own outcome"""
+
+    def manager(self, handler_class=FileHandler, name='tasks.json'):
+        handler = handler_class(os.path.join(self.tmp.name, name))
+        self.addCleanup(getattr(handler, 'close', lambda: None))
+        return AsyncTaskManager(TaskManager(handler, change_feed=None))
+
+    async def test_round_trip(self):
+        am = self.manager()
+        tasks = await asyncio.gather(*[am.add_task(f"Task {i}", "")
+                                       for i in range(20)])
+        self.assertEqual(sorted(t.id for t in tasks), list(range(1, 21)))
+        await am.mark_complete(3)
+        await am.close()
+        fresh = TaskManager(FileHandler(am.manager.file_handler.filename),
+                            change_feed=None)
+        self.assertEqual(len(fresh.get_all_tasks()), 20)
+        self.assertEqual(fresh.get_task_by_id(3).status, "Completed")
+
+    async def test_concurrent_reads_and_writes(self):
+        am = self.manager()
+        await am.add_task("first", "")
+        results = await asyncio.gather(
+            *[am.add_task(f"Task {i}", "") for i in range(10)],
+            *[am.get_all_tasks() for _ in range(10)],
+            am.stats())
+        for tasks in results[10:20]:
+            # Readers never see a batch half applied.
+            self.assertIn(len(tasks), (1, 11))
+        self.assertEqual(len(await am.get_all_tasks()), 11)
+        await am.close()
+
+    async def test_validation_error_fails_only_its_write(self):
+        am = self.manager()
+        results = await asyncio.gather(am.add_task("a", ""),
+                                       am.add_task("b", "", priority="Urgent"),
+                                       am.add_task("c", ""),
+                                       return_exceptions=True)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual([t.title for t in await am.get_all_tasks()],
+                         ["a", "c"])
+        await am.close()
+
+    async def test_unexpected_error_fails_only_its_write(self):
+        am = self.manager(FlakyLogHandler, 'tasks.log')
+        results = await asyncio.gather(am.add_task("a", ""),
+                                       am.add_task("fail", ""),
+                                       am.add_task("b", ""),
+                                       return_exceptions=True)
+        self.assertEqual(results[0].title, "a")
+        self.assertIsInstance(results[1], OSError)
+        self.assertEqual(results[2].title, "b")
+        self.assertEqual([t.title for t in await am.get_all_tasks()],
+                         ["a", "b"])
+        await am.close()
+
+    async def test_failed_save_fails_every_write(self):
+        am = self.manager(FailingSaveHandler)
+        results = await asyncio.gather(am.add_task("a", ""),
+                                       am.add_task("b", ""),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(r, OSError) for r in results), results)
+        self.assertEqual(await am.get_all_tasks(), [])
+        await am.close()
+
+
+class TestReadWriteLock(unittest.IsolatedAsyncioTestCase):
+    """Readers share the lock; a writer has it to itself"""
+
+    async def test_writer_excludes_readers(self):
+        lock = ReadWriteLock()
+        log = []
+
+        async def reader(n):
+            async with lock.read():
+                log.append(('read', n))
+                await asyncio.sleep(0)
+
+        async def writer():
+            async with lock.write():
+                log.append(('write', 'start'))
+                await asyncio.sleep(0.01)
+                log.append(('write', 'end'))
+
+        async with lock.read():
+            task = asyncio.create_task(writer())
+            await asyncio.sleep(0)
+            # A waiting writer keeps new readers out.
+            readers = [asyncio.create_task(reader(n)) for n in range(3)]
+            await asyncio.sleep(0)
+            self.assertEqual(log, [])
+        await asyncio.gather(task, *readers)
+        self.assertEqual(log[:2], [('write', 'start'), ('write', 'end')])
+        self.assertEqual(sorted(log[2:]),
+                         [('read', 0), ('read', 1), ('read', 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
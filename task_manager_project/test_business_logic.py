@@ -0,0 +1,238 @@
+import json
+import os
+import unittest
+from business_logic import Task, TaskManager
+from data_access import FileHandler
+from log_storage import LogFileHandler
+from sqlite_storage import SQLiteHandler
+from test_support import TempDirMixin
+
+
+class TempTaskManagerMixin(TempDirMixin):
+    """A TaskManager over a JSON file in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.json')
+        self.tm = TaskManager(FileHandler(self.filename))
+
+
+class TestTaskValidation(unittest.TestCase):
+    """Only the documented values are accepted for a task's fields"""
+
+    def test_valid(self):
+        task = Task(title="Task", priority="High", status="Completed",
+                    due_date="2024-02-29")
+        task.validate()
+        self.assertEqual((task.priority, task.status, task.due_date),
+                         ("High", "Completed", "2024-02-29"))
+
+    def test_non_string_values_rejected(self):
+        for field, value in [('priority', 1), ('priority', 5),
+                             ('priority', None), ('priority', True),
+                             ('status', 0), ('status', 7),
+                             ('due_date', 99999999), ('due_date', 738000)]:
+            with self.subTest(field=field, value=value):
+                # Kept as given, never taken for an encoded value.
+                task = Task(title="Task", **{field: value})
+                self.assertEqual(getattr(task, field), value)
+                with self.assertRaises(ValueError):
+                    task.validate()
+
+    def test_unknown_strings_rejected(self):
+        for field, value in [('priority', 'Urgent'), ('status', 'Done'),
+                             ('due_date', '2024-02-30'), ('due_date', 'soon')]:
+            with self.subTest(field=field, value=value):
+                task = Task(title="Task", **{field: value})
+                with self.assertRaises(ValueError):
+                    task.validate()
+
+    def test_round_trip(self):
+        task = Task(id=3, title="Task", description="Desc", priority="Low",
+                    due_date="2025-01-31", status="Pending",
+                    created_date="2024-12-01")
+        self.assertEqual(Task.from_dict(task.to_dict()).to_dict(),
+                         task.to_dict())
+
+
+class TestStoredValues(TempTaskManagerMixin, unittest.TestCase):
+    """Records with values of the wrong type load, but edits must fix them"""
+
+    def test_non_string_values_load(self):
+        with open(self.filename, 'w') as f:
+            json.dump([{'id': 1, 'title': "a", 'description': "",
+                        'priority': None, 'due_date': 5,
+                        'status': "Pending", 'created_date': None},
+                       {'id': 2, 'title': "b", 'description': "",
+                        'priority': "Low", 'due_date': None,
+                        'status': "Pending", 'created_date': "2024-01-01"}],
+                      f)
+        self.assertEqual([t.title for t in self.tm.get_all_tasks()],
+                         ["a", "b"])
+        self.assertEqual(self.tm.get_task_by_id(1).to_dict()['priority'],
+                         None)
+        self.assertEqual(
+            [t.id for t in self.tm.filter_tasks(status="Pending")], [1, 2])
+        self.assertEqual(self.tm.stats()['total'], 2)
+        # Edits still have to produce a valid task.
+        with self.assertRaises(ValueError):
+            self.tm.update_task(1, title="c")
+        self.tm.update_task(1, priority="High", due_date=None)
+        self.assertEqual(self.tm.get_task_by_id(1).priority, "High")
+
+
+class TestAddTasks(TempTaskManagerMixin, unittest.TestCase):
+    """Rejected tasks report an error and use up no id"""
+
+    def test_invalid_specs(self):
+        results = self.tm.add_tasks([{'title': 'a', 'priority': 5},
+                                     {'title': 'b', 'due_date': 99999999},
+                                     {'title': 'c'}])
+        self.assertEqual([r['error'] is None for r in results],
+                         [False, False, True])
+        self.assertEqual(results[2]['id'], 1)
+
+    def test_add_task_rejects_int_priority(self):
+        with self.assertRaises(ValueError):
+            self.tm.add_task("a", "", priority=1)
+        self.assertEqual(self.tm.add_task("b", "").id, 1)
+
+    def test_update_rejects_int_priority(self):
+        task = self.tm.add_task("a", "")
+        with self.assertRaises(ValueError):
+            self.tm.update_task(task.id, priority=2)
+        self.assertEqual(self.tm.get_task_by_id(task.id).priority, "Medium")
+
+
+class TestBatch(TempTaskManagerMixin, unittest.TestCase):
+    """Writes in one batch see each other and are saved together"""
+
+    def fresh(self):
+        return TaskManager(FileHandler(self.filename))
+
+    def test_add_then_update(self):
+        with self.tm.batch():
+            task = self.tm.add_task("a", "")
+            self.tm.update_task(task.id, status="Completed")
+            results = self.tm.update_tasks([{'id': task.id,
+                                             'priority': 'High'}])
+            self.assertIsNone(results[0]['error'])
+        stored = self.fresh().get_task_by_id(task.id)
+        self.assertEqual((stored.status, stored.priority),
+                         ("Completed", "High"))
+
+    def test_add_then_delete(self):
+        with self.tm.batch():
+            results = self.tm.add_tasks([{'title': 'a'}, {'title': 'b'}])
+            self.tm.delete_tasks([results[0]['id']])
+        self.assertEqual([t.title for t in self.fresh().get_all_tasks()],
+                         ['b'])
+
+    def test_failed_batch_saves_nothing(self):
+        self.tm.add_task("kept", "")
+        with self.assertRaises(RuntimeError):
+            with self.tm.batch():
+                self.tm.add_task("dropped", "")
+                raise RuntimeError("abort")
+        self.assertEqual([t.title for t in self.tm.get_all_tasks()],
+                         ['kept'])
+        self.assertEqual([t.title for t in self.fresh().get_all_tasks()],
+                         ['kept'])
+
+
+class TestPatch(TempTaskManagerMixin, unittest.TestCase):
+    """Patches write only the fields that changed, on every backend"""
+
+    def log_manager(self):
+        log = LogFileHandler(os.path.join(self.tmp.name, 'tasks.log'))
+        self.addCleanup(log.close)
+        return TaskManager(log)
+
+    def managers(self):
+        yield self.tm
+        yield self.log_manager()
+        db = SQLiteHandler(os.path.join(self.tmp.name, 'tasks.db'))
+        self.addCleanup(db.close)
+        yield TaskManager(db)
+
+    def test_patch_round_trip(self):
+        for tm in self.managers():
+            with self.subTest(handler=type(tm.file_handler).__name__):
+                task = tm.add_task("a", "desc", due_date="2024-05-01")
+                patched = tm.patch_task(task.id, status="Completed",
+                                        due_date=None)
+                self.assertEqual((patched.status, patched.due_date),
+                                 ("Completed", None))
+                stored = {t['id']: t for t in tm.file_handler.load_tasks()}
+                self.assertEqual(stored[task.id], patched.to_dict())
+
+    def test_log_records_only_changed_fields(self):
+        tm = self.log_manager()
+        task = tm.add_task("a", "")
+        tm.patch_task(task.id, title="b", priority="Medium")
+        tm.patch_task(task.id, title="b")
+        with open(tm.file_handler.filename) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[1:], [{'op': 'patch', 'id': task.id,
+                                        'fields': {'title': "b"}}])
+
+    def test_invalid_patch_changes_nothing(self):
+        task = self.tm.add_task("a", "")
+        with self.assertRaises(ValueError):
+            self.tm.patch_task(task.id, title="b", status="Done")
+        self.assertEqual(self.tm.get_task_by_id(task.id).title, "a")
+        fresh = TaskManager(FileHandler(self.filename))
+        self.assertEqual(fresh.get_task_by_id(task.id).title, "a")
+
+    def test_missing_task(self):
+        with self.assertRaisesRegex(ValueError, "Task not found"):
+            self.tm.patch_task(7, title="x")
+
+    def test_ignores_id_and_unknown_fields(self):
+        task = self.tm.add_task("a", "")
+        patched = self.tm.patch_task(task.id, id=99, colour="red", title="b")
+        self.assertEqual((patched.id, patched.title), (task.id, "b"))
+
+
+class TestChangeEvents(TempTaskManagerMixin, unittest.TestCase):
+    """Subscribers see each write once, as it was when it was made"""
+
+    def setUp(self):
+        super().setUp()
+        self.events = []
+        self.tm.subscribe(self.events.append)
+
+    def titles(self):
+        return [(e['op'], e['task']['title']) for e in self.events]
+
+    def test_add_event_not_changed_by_later_update(self):
+        with self.tm.batch():
+            task = self.tm.add_task("a", "")
+            self.tm.update_task(task.id, title="b")
+            self.tm.add_tasks([{'title': 'c'}])
+            self.tm.update_tasks([{'id': task.id + 1, 'title': 'd'}])
+        self.assertEqual(self.titles(), [('add', 'a'), ('update', 'b'),
+                                         ('add', 'c'), ('update', 'd')])
+
+    def test_rolled_back_batch_publishes_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with self.tm.batch():
+                self.tm.add_task("dropped", "")
+                raise RuntimeError("abort")
+        self.assertEqual(self.events, [])
+
+    def test_failed_batch_without_rollback_publishes_saved_writes(self):
+        log = LogFileHandler(os.path.join(self.tmp.name, 'tasks.log'))
+        self.addCleanup(log.close)
+        tm = TaskManager(log)
+        tm.subscribe(self.events.append)
+        with self.assertRaises(RuntimeError):
+            with tm.batch():
+                tm.add_task("saved", "")
+                raise RuntimeError("abort")
+        self.assertEqual(self.titles(), [('add', 'saved')])
+        self.assertEqual([t.title for t in tm.get_all_tasks()], ['saved'])
+
+
+if __name__ == "__main__":
+    unittest.main()
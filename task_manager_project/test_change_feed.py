@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import unittest
+import change_feed
+from business_logic import TaskManager
+from change_feed import ChangeFeed
+from data_access import FileHandler
+from test_support import TempDirMixin
+
+
+def append_worker(filename, name, count):
+    feed = ChangeFeed(filename)
+    for i in range(count):
+        feed.append([{'op': 'add', 'id': i, 'task': {'writer': name}},
+                     {'op': 'delete', 'id': i, 'task': None}])
+
+
+class TempFeedMixin(TempDirMixin):
+    """A ChangeFeed in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'changes.log')
+        self.feed = ChangeFeed(self.filename)
+
+
+class TestChangeFeed(TempFeedMixin, unittest.TestCase):
+    """Readers resume from the seq of the last event they saw"""
+
+    def test_round_trip(self):
+        self.assertEqual((self.feed.read(), self.feed.latest()), ([], 0))
+        events = [{'op': 'add', 'id': 1, 'task': {'id': 1, 'title': "é"}},
+                  {'op': 'delete', 'id': 1, 'task': None}]
+        self.feed.append(events)
+        self.assertEqual(self.feed.read(), events)
+        self.assertEqual(events[-1]['seq'], self.feed.latest())
+
+    def test_resume_from_cursor(self):
+        self.feed.append([{'op': 'add', 'id': i, 'task': None}
+                          for i in range(5)])
+        first = self.feed.read(limit=2)
+        self.assertEqual([e['id'] for e in first], [0, 1])
+        rest = self.feed.read(first[-1]['seq'])
+        self.assertEqual([e['id'] for e in rest], [2, 3, 4])
+        self.assertEqual(self.feed.read(rest[-1]['seq']), [])
+
+    def test_partial_line_left_for_later(self):
+        self.feed.append([{'op': 'add', 'id': 1, 'task': None}])
+        cursor = self.feed.latest()
+        with open(self.filename, 'ab') as f:
+            f.write(b'{"op": "delete", "id"')
+        self.assertEqual(self.feed.read(cursor), [])
+        with open(self.filename, 'ab') as f:
+            f.write(b': 1, "task": null}\n')
+        self.assertEqual([e['op'] for e in self.feed.read(cursor)], ['delete'])
+
+    def test_no_file_configured(self):
+        with self.assertRaises(ValueError):
+            ChangeFeed(filename='')
+
+
+@unittest.skipIf(change_feed.fcntl is None,
+                 "no advisory locking on this platform")
+class TestChangeFeedConcurrency(TempFeedMixin, unittest.TestCase):
+    """Appends from several processes stay whole and in seq order"""
+
+    def test_concurrent_appends(self):
+        processes = [multiprocessing.Process(target=append_worker,
+                                             args=(self.filename, n, 50))
+                     for n in range(4)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        events = self.feed.read()
+        self.assertEqual(len(events), 400)
+        # Each append's two events stay together.
+        for add, delete in zip(events[::2], events[1::2]):
+            self.assertEqual((add['op'], delete['op'], add['id']),
+                             ('add', 'delete', delete['id']))
+
+
+class TestTaskManagerFeed(TempFeedMixin, unittest.TestCase):
+    """Writes through TaskManager are published to the feed"""
+
+    def test_writes_published(self):
+        handler = FileHandler(os.path.join(self.tmp.name, 'tasks.json'))
+        tm = TaskManager(handler, change_feed=self.feed)
+        seen = []
+        tm.subscribe(seen.append)
+        task = tm.add_task("a", "")
+        with tm.batch():
+            tm.update_task(task.id, status="Completed")
+            tm.add_tasks([{'title': "b"}])
+        tm.unsubscribe(seen.append)
+        tm.delete_task(task.id)
+        events = self.feed.read()
+        self.assertEqual(
+            [(e['op'], e['id']) for e in events],
+            [('add', 1), ('update', 1), ('add', 2), ('delete', 1)])
+        self.assertEqual(events[1]['fields'], {'status': "Completed"})
+        self.assertEqual(seen, events[:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import unittest
+from unittest import mock
+from cli import main
+from test_support import TempDirMixin
+
+
+class CliTestMixin(TempDirMixin):
+    """Runs cli.main() in a temporary working directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp.name)
+
+    def run_cli(self, *argv, stdin=''):
+        """Return (exit code, list of emitted objects)."""
+        out = io.StringIO()
+        with mock.patch('sys.stdin', io.StringIO(stdin)):
+            code = main(list(argv), out=out)
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+class TestCliCommands(CliTestMixin, unittest.TestCase):
+    """Subcommands read and write NDJSON"""
+
+    def test_add_and_list(self):
+        code, lines = self.run_cli('add', '--title', 'Write tests',
+                                   '--priority', 'High')
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0]['id'], 1)
+        code, lines = self.run_cli('list')
+        self.assertEqual([(t['id'], t['title'], t['priority']) for t in lines],
+                         [(1, 'Write tests', 'High')])
+
+    def test_import_formats(self):
+        for stdin in ['[{"title": "a"}, {"title": "b"}]',
+                      '{"title": "c"}\n{"title": "d"}\n',
+                      'title,priority,due_date\ne,Low,\n']:
+            self.assertEqual(self.run_cli('import', stdin=stdin)[0], 0)
+        code, lines = self.run_cli('list')
+        self.assertEqual([t['title'] for t in lines],
+                         ['a', 'b', 'c', 'd', 'e'])
+        self.assertIsNone(lines[-1]['due_date'])
+
+    def test_update_complete_delete(self):
+        self.run_cli('import', stdin='[{"title": "a"}, {"title": "b"}]')
+        self.assertEqual(self.run_cli('update', '--id', '1',
+                                      '--title', 'A')[0], 0)
+        self.assertEqual(self.run_cli('complete', '2')[0], 0)
+        self.assertEqual(self.run_cli('delete', stdin='[{"id": "1"}]')[0], 0)
+        code, lines = self.run_cli('list')
+        self.assertEqual([(t['id'], t['status']) for t in lines],
+                         [(2, 'Completed')])
+
+    def test_batch_add_then_update(self):
+        stdin = ('{"op": "add", "title": "a"}\n'
+                 '{"op": "update", "id": 1, "status": "Completed"}\n'
+                 '{"op": "add", "title": "b"}\n'
+                 '{"op": "delete", "id": 2}\n')
+        code, lines = self.run_cli('batch', stdin=stdin)
+        self.assertEqual(code, 0, lines)
+        code, lines = self.run_cli('list')
+        self.assertEqual([(t['id'], t['status']) for t in lines],
+                         [(1, 'Completed')])
+
+    def test_missing_task(self):
+        code, lines = self.run_cli('complete', '9')
+        self.assertEqual(code, 1)
+        self.assertEqual(lines, [{'ok': False, 'id': 9,
+                                  'error': "Task not found"}])
+
+
+class TestCliMalformedInput(CliTestMixin, unittest.TestCase):
+    """Malformed input ends in an error line and exit code 1"""
+
+    def assertRejected(self, *argv, stdin=''):
+        code, lines = self.run_cli(*argv, stdin=stdin)
+        self.assertEqual(code, 1)
+        self.assertTrue(lines and not lines[-1]['ok'], lines)
+        return lines
+
+    def test_wrong_field_types(self):
+        for stdin in ['[{"title": 5}]',
+                      '[{"title": "a", "description": ["x"]}]',
+                      '[{"title": "a", "priority": 5}]',
+                      '[{"title": "a", "due_date": 99999999}]',
+                      '[1, 2]', '["text"]', '[{"title": "a", "id": [1]}]']:
+            with self.subTest(stdin=stdin):
+                self.assertRejected('import', stdin=stdin)
+        self.assertEqual(self.run_cli('list'), (0, []))
+
+    def test_bad_ids(self):
+        self.run_cli('add', '--title', 'a')
+        for stdin in ['[{"id": "one", "title": "x"}]',
+                      '[{"id": 1.5, "title": "x"}]']:
+            with self.subTest(stdin=stdin):
+                self.assertRejected('update', stdin=stdin)
+        self.assertRejected('delete', stdin='[{"title": "no id"}]')
+
+    def test_invalid_json(self):
+        self.assertRejected('import', stdin='[{"title": ')
+        self.assertRejected('batch',
+                            stdin='{"op": "add", "title": "a"}\nnot json\n')
+
+    def test_invalid_due_before(self):
+        self.assertRejected('filter', '--due-before', 'bad')
+
+
+if __name__ == "__main__":
+    unittest.main()
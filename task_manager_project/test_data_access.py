@@ -0,0 +1,168 @@
+import json
+import multiprocessing
+import os
+import unittest
+from unittest import mock
+import data_access
+from business_logic import TaskManager
+from data_access import ConflictError, CorruptFileError, FileHandler
+from test_support import TempDirMixin
+
+
+def task(task_id, title="Task"):
+    return {'id': task_id, 'title': title, 'description': "",
+            'priority': "Medium", 'due_date': None, 'status': "Pending",
+            'created_date': "2024-01-01"}
+
+
+def add_tasks_worker(filename, count):
+    tm = TaskManager(FileHandler(filename), change_feed=None)
+    for i in range(count):
+        tm.add_task(f"Task {os.getpid()}-{i}", "")
+
+
+class TempFileMixin(TempDirMixin):
+    """A FileHandler on a tasks file in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.json')
+        self.handler = FileHandler(self.filename)
+
+    def read(self):
+        with open(self.filename) as f:
+            return json.load(f)
+
+
+class TestFileHandlerRoundTrip(TempFileMixin, unittest.TestCase):
+    """Writes land in the JSON file and survive a new handler"""
+
+    def test_writes(self):
+        self.handler.save_tasks([task(1, "a"), task(2, "b"), task(3, "c")])
+        self.handler.update_task(1, task(1, "A"))
+        self.handler.patch_task(2, {'title': "B"})
+        self.handler.delete_task(3)
+        self.assertEqual([t['title'] for t in self.read()], ["A", "B"])
+        fresh = FileHandler(self.filename)
+        self.assertEqual(fresh.load_tasks(), self.read())
+        self.assertEqual(list(fresh.iter_tasks()), self.read())
+
+    def test_keeps_file_mode(self):
+        self.handler.save_task(task(1))
+        os.chmod(self.filename, 0o640)
+        self.handler.save_task(task(2))
+        self.assertEqual(os.stat(self.filename).st_mode & 0o777, 0o640)
+
+
+class TestFileHandlerAtomicity(TempFileMixin, unittest.TestCase):
+    """A failed or refused save leaves the old file in place"""
+
+    def test_failed_write_keeps_old_file(self):
+        self.handler.save_task(task(1))
+        with mock.patch.object(data_access, 'write_json_array',
+                               side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.handler.save_task(task(2))
+        self.assertEqual(self.read(), [task(1)])
+        self.assertEqual([n for n in os.listdir(self.tmp.name)
+                          if n.startswith('.tmp-')], [])
+
+    def test_corrupt_file_not_overwritten(self):
+        with open(self.filename, 'w') as f:
+            f.write('[{"id": 1, "title": ')
+        with self.assertRaises(CorruptFileError):
+            self.handler.load_tasks()
+        with self.assertRaises(CorruptFileError):
+            self.handler.save_task(task(2))
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), '[{"id": 1, "title": ')
+
+    def test_failed_batch_saves_nothing(self):
+        self.handler.save_task(task(1))
+        with self.assertRaises(RuntimeError):
+            with self.handler.batch():
+                self.handler.save_task(task(2))
+                self.handler.delete_task(1)
+                raise RuntimeError("abort")
+        self.assertEqual(self.read(), [task(1)])
+
+
+class TestFileHandlerConflicts(TempFileMixin, unittest.TestCase):
+    """Writes based on a stale read are refused"""
+
+    def test_handler_conflicts(self):
+        self.handler.save_task(task(1, "a"))
+        with self.assertRaises(ConflictError):
+            self.handler.update_task(1, task(1, "b"),
+                                     expected=task(1, "stale"))
+        with self.assertRaises(ConflictError):
+            self.handler.patch_task(9, {'title': "b"}, expected=task(9))
+        self.assertEqual(self.read(), [task(1, "a")])
+
+    def test_manager_conflict(self):
+        first = TaskManager(FileHandler(self.filename), change_feed=None)
+        second = TaskManager(FileHandler(self.filename), change_feed=None)
+        created = first.add_task("a", "")
+        stale = second.get_task_by_id(created.id)
+        first.update_task(created.id, title="b")
+        # Skip the reload, as if the two writes raced.
+        with mock.patch.object(second.store, 'refresh'):
+            with self.assertRaises(ConflictError):
+                second.update_task(stale.id, title="c")
+        self.assertEqual([t['title'] for t in self.read()], ["b"])
+
+
+class TestFileHandlerSequence(TempFileMixin, unittest.TestCase):
+    """Ids come from the .seq file and are never handed out twice"""
+
+    def test_deleted_max_id_not_reused(self):
+        first = self.handler.reserve_ids(2)
+        self.handler.save_tasks([task(first), task(first + 1)])
+        self.handler.delete_task(first + 1)
+        self.assertEqual(FileHandler(self.filename).reserve_ids(), first + 2)
+
+    def test_seeded_from_existing_file(self):
+        with open(self.filename, 'w') as f:
+            json.dump([task(4), task(9)], f)
+        self.assertEqual(self.handler.reserve_ids(3), 10)
+        self.assertEqual(self.handler.get_next_id(), 13)
+
+    def test_explicit_ids_advance_sequence(self):
+        self.handler.reserve_ids()
+        self.handler.save_task(task(20))
+        self.assertEqual(self.handler.reserve_ids(), 21)
+
+    def test_damaged_sequence_file(self):
+        self.handler.save_task(task(5))
+        with open(self.handler.seq_filename, 'w') as f:
+            f.write('garbage')
+        self.assertEqual(self.handler.reserve_ids(), 6)
+
+    def test_without_sequence(self):
+        handler = FileHandler(self.filename, use_sequence=False)
+        handler.save_tasks([task(1), task(2)])
+        handler.delete_task(2)
+        self.assertEqual(handler.get_next_id(), 2)
+        self.assertFalse(os.path.exists(self.filename + '.seq'))
+
+
+@unittest.skipIf(data_access.fcntl is None,
+                 "no advisory locking on this platform")
+class TestFileHandlerLocking(TempFileMixin, unittest.TestCase):
+    """Concurrent writers in separate processes lose no tasks"""
+
+    def test_concurrent_processes(self):
+        processes = [multiprocessing.Process(target=add_tasks_worker,
+                                             args=(self.filename, 15))
+                     for _ in range(4)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        self.assertEqual([p.exitcode for p in processes], [0] * 4)
+        ids = [t['id'] for t in self.read()]
+        self.assertEqual(sorted(ids), list(range(1, 61)))
+
+
+if __name__ == "__main__":
+    unittest.main()
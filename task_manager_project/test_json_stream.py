@@ -0,0 +1,73 @@
+import io
+import json
+import unittest
+from json_stream import iter_json_array, write_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Streaming reads give what json.loads gives, at any chunk size"""
+
+    DOCUMENTS = [
+        '[]',
+        ' [ ] ',
+        '[12.5]',
+        '[1e5]',
+        '[-1.5e-3, 2, 0, -0.0, 1E+10]',
+        '[true, false, null, "a,]b", "\\u00e9\\"x"]',
+        '[{"id": 1, "title": "Task, one", "tags": [1, [2]]}, {"id": 22}]',
+        json.dumps([{'id': i, 'title': f"Task {i}", 'score': i / 7}
+                    for i in range(50)], indent=4),
+    ]
+
+    def test_chunk_boundaries(self):
+        for doc in self.DOCUMENTS:
+            expected = json.loads(doc)
+            for chunk_size in range(1, 12):
+                with self.subTest(doc=doc[:30], chunk_size=chunk_size):
+                    f = io.StringIO(doc)
+                    result = list(iter_json_array(f, chunk_size))
+                    self.assertEqual(result, expected)
+
+    def test_malformed(self):
+        for doc in ['', '{}', '[1 2]', '[1,', '[12.]', '[1e]', '["abc',
+                    '[1;]']:
+            for chunk_size in (1, 2, 64):
+                with self.subTest(doc=doc, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        list(iter_json_array(io.StringIO(doc), chunk_size))
+
+    def test_stops_at_closing_bracket(self):
+        # Whatever follows the array is not read as elements.
+        f = io.StringIO('[1] trailing')
+        self.assertEqual(list(iter_json_array(f)), [1])
+
+
+class TestWriteJsonArray(unittest.TestCase):
+    """Chunked writes match json.dump(indent=4)"""
+
+    def check(self, items, chunk_size=16):
+        f = io.StringIO()
+        write_json_array(f, iter(items), chunk_size)
+        self.assertEqual(f.getvalue(), json.dumps(items, indent=4))
+
+    def test_empty(self):
+        self.check([])
+
+    def test_flat_tasks(self):
+        self.check([{'id': i, 'title': f"Task \"{i}\"", 'due_date': None,
+                     'done': i % 2 == 0} for i in range(20)])
+
+    def test_nested_values(self):
+        self.check([{'id': 1, 'tags': ['a', 'b'], 'meta': {}}, 5, "x", [], {}])
+
+    def test_round_trip(self):
+        items = [{'id': i, 'description': "line\nbreak, é"}
+                 for i in range(100)]
+        f = io.StringIO()
+        write_json_array(f, items, chunk_size=50)
+        f.seek(0)
+        self.assertEqual(list(iter_json_array(f, chunk_size=7)), items)
+
+
+if __name__ == "__main__":
+    unittest.main()
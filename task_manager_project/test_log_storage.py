@@ -0,0 +1,200 @@
+import json
+import os
+import unittest
+from data_access import ConflictError, CorruptFileError
+from log_storage import LogFileHandler
+from test_support import TempDirMixin
+
+
+def task(task_id, title="Task"):
+    return {'id': task_id, 'title': title, 'description': "",
+            'priority': "Medium", 'due_date': None, 'status': "Pending",
+            'created_date': "2024-01-01"}
+
+
+class TempLogMixin(TempDirMixin):
+    """A LogFileHandler on a log in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.log')
+        self.handler = self.open()
+        self.addCleanup(lambda: self.handler.close())
+
+    def open(self, **kwargs):
+        return LogFileHandler(self.filename, **kwargs)
+
+    def reopen(self, **kwargs):
+        self.handler.close()
+        self.handler = self.open(**kwargs)
+        return self.handler
+
+    def records(self):
+        with open(self.filename) as f:
+            return [json.loads(line) for line in f]
+
+
+class TestLogRoundTrip(TempLogMixin, unittest.TestCase):
+    """Every write survives a reopen, in the order tasks were first saved"""
+
+    def check_state(self, handler):
+        tasks = handler.load_tasks()
+        self.assertEqual([(t['id'], t['title'], t['status']) for t in tasks],
+                         [(1, "A", "Pending"), (2, "b", "Completed")])
+        self.assertEqual(handler.get_task(2)['status'], "Completed")
+        self.assertIsNone(handler.get_task(3))
+        self.assertEqual(sorted(t['id'] for t in handler.iter_tasks()),
+                         [1, 2])
+
+    def test_writes_survive_reopen(self):
+        self.handler.save_tasks([task(1, "a"), task(2, "b"), task(3, "c")])
+        self.handler.update_task(1, task(1, "A"))
+        self.handler.patch_task(2, {'status': "Completed"})
+        self.handler.delete_task(3)
+        self.check_state(self.handler)
+        self.check_state(self.reopen())
+
+    def test_writes_to_missing_tasks_ignored(self):
+        self.handler.save_task(task(1))
+        self.handler.update_task(9, task(9))
+        self.handler.patch_tasks({9: {'title': "x"}})
+        self.handler.delete_tasks([9, 9])
+        self.assertEqual(len(self.records()), 1)
+
+    def test_conflict(self):
+        self.handler.save_task(task(1, "a"))
+        with self.assertRaises(ConflictError):
+            self.handler.patch_task(1, {'title': "b"},
+                                    expected=task(1, "stale"))
+        self.handler.patch_task(1, {'title': "b"}, expected=task(1, "a"))
+        self.assertEqual(self.reopen().get_task(1)['title'], "b")
+
+
+class TestLogRecovery(TempLogMixin, unittest.TestCase):
+    """A torn last record is dropped; everything before it is kept"""
+
+    def test_torn_write(self):
+        self.handler.save_tasks([task(1), task(2)])
+        self.handler.close()
+        with open(self.filename, 'ab') as f:
+            f.write(b'{"op": "put", "task": {"id": 3, "ti')
+        size = os.path.getsize(self.filename)
+        handler = self.reopen()
+        self.assertEqual([t['id'] for t in handler.load_tasks()], [1, 2])
+        self.assertLess(os.path.getsize(self.filename), size)
+        handler.save_task(task(3))
+        self.assertEqual([t['id'] for t in self.reopen().load_tasks()],
+                         [1, 2, 3])
+
+    def test_damaged_record_not_truncated(self):
+        self.handler.save_tasks([task(i) for i in range(1, 6)])
+        self.handler.close()
+        with open(self.filename, 'rb') as f:
+            lines = f.readlines()
+        lines[1] = b'not json\n'
+        with open(self.filename, 'wb') as f:
+            f.writelines(lines)
+        with self.assertRaises(CorruptFileError):
+            self.open()
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.readlines(), lines)
+
+
+class TestLogSharedFile(TempLogMixin, unittest.TestCase):
+    """A second handler on the log follows the writer's changes"""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.open()
+        self.addCleanup(self.reader.close)
+
+    def test_sees_appends(self):
+        self.handler.save_task(task(1))
+        self.assertEqual([t['id'] for t in self.reader.load_tasks()], [1])
+        self.handler.save_task(task(2))
+        self.handler.patch_task(1, {'title': "a"})
+        self.assertEqual(
+            [(t['id'], t['title']) for t in self.reader.load_tasks()],
+            [(1, "a"), (2, "Task")])
+        self.assertEqual(self.reader.get_task(2), task(2))
+
+    def test_sees_compaction(self):
+        self.handler.save_tasks([task(i) for i in range(1, 6)])
+        self.assertEqual(self.reader.get_task(5), task(5))
+        self.handler.delete_tasks([1, 2])
+        self.handler.patch_task(5, {'title': "e"})
+        self.handler.compact()
+        self.assertEqual([t['id'] for t in self.reader.load_tasks()],
+                         [3, 4, 5])
+        self.assertEqual(self.reader.get_task(5)['title'], "e")
+        self.assertEqual([t['id'] for t in self.reader.iter_tasks()],
+                         [3, 4, 5])
+
+
+class TestLogCompaction(TempLogMixin, unittest.TestCase):
+    """Compaction keeps the live tasks and drops superseded records"""
+
+    def test_compact(self):
+        self.handler.save_tasks([task(i) for i in range(1, 6)])
+        for i in range(1, 6):
+            self.handler.patch_task(i, {'title': f"Task {i}"})
+        self.handler.delete_tasks([2, 4])
+        expected = self.handler.load_tasks()
+        self.handler.compact()
+        self.assertEqual([r['op'] for r in self.records()],
+                         ['meta', 'put', 'put', 'put'])
+        self.assertEqual(self.handler.load_tasks(), expected)
+        self.assertEqual(self.reopen().load_tasks(), expected)
+
+    def test_automatic_compaction(self):
+        handler = self.reopen(compact_min_records=10, compact_ratio=1.0)
+        handler.save_task(task(1))
+        for i in range(30):
+            handler.patch_task(1, {'title': f"Title {i}"})
+        self.assertLess(len(self.records()), 12)
+        self.assertEqual(self.reopen().get_task(1)['title'], "Title 29")
+
+
+class TestLogSequence(TempLogMixin, unittest.TestCase):
+    """Ids are never reused, with a meta record only where replay needs one"""
+
+    def add(self, title="Task"):
+        task_id = self.handler.reserve_ids()
+        self.handler.save_task(task(task_id, title))
+        return task_id
+
+    def test_used_ids_write_no_meta(self):
+        for _ in range(3):
+            self.add()
+        first = self.handler.reserve_ids(2)
+        self.handler.save_tasks([task(i) for i in range(first, 6)])
+        self.assertEqual([r['op'] for r in self.records()], ['put'] * 5)
+        self.assertEqual(self.reopen().get_next_id(), 6)
+
+    def test_deleted_max_id_not_reused(self):
+        self.add()
+        last = self.add()
+        self.handler.delete_task(last)
+        self.assertNotIn('meta', [r['op'] for r in self.records()])
+        self.assertEqual(self.reopen().get_next_id(), last + 1)
+        self.assertEqual(self.reopen(compact_min_records=0).get_next_id(),
+                         last + 1)
+        self.handler.compact()
+        self.assertEqual(self.reopen().get_next_id(), last + 1)
+
+    def test_unused_reservation_logged(self):
+        first = self.handler.reserve_ids(3)
+        self.handler.save_task(task(first))
+        self.assertEqual(self.records()[-1],
+                         {'op': 'meta', 'next_id': first + 3})
+        self.assertEqual(self.reopen().get_next_id(), first + 3)
+
+    def test_reservation_logged_on_close(self):
+        first = self.handler.reserve_ids(2)
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertEqual(self.reopen().get_next_id(), first + 2)
+        self.assertEqual(self.reopen().reserve_ids(), first + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import threading
+import unittest
+from business_logic import TaskManager
+from data_access import FileHandler
+from log_storage import LogFileHandler
+from metrics import Metrics, InstrumentedHandler, instrument
+from test_support import TempDirMixin
+
+
+class TestMetrics(unittest.TestCase):
+    """Counters add up and export in both formats"""
+
+    def test_record(self):
+        metrics = Metrics()
+        metrics.record('manager', 'add_task', 0.5)
+        metrics.record('manager', 'add_task', 1.5, error=True)
+        metrics.record('handler', 'load_tasks', 0.25, bytes_read=100,
+                       tasks_parsed=3)
+        data = metrics.to_dict()
+        self.assertEqual(data['manager']['add_task'],
+                         {'count': 2, 'errors': 1, 'seconds': 2.0,
+                          'max_seconds': 1.5, 'bytes_read': 0,
+                          'bytes_written': 0, 'tasks_parsed': 0})
+        self.assertEqual(data['handler']['load_tasks']['tasks_parsed'], 3)
+        metrics.reset()
+        self.assertEqual(metrics.to_dict(), {})
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.record('handler', 'save_task', 0.5, bytes_written=42)
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE task_manager_operations_total counter\n', text)
+        labels = '{layer="handler",op="save_task"}'
+        self.assertIn(f'task_manager_operations_total{labels} 1\n', text)
+        self.assertIn(f'task_manager_bytes_written_total{labels} 42\n', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_concurrent_records(self):
+        metrics = Metrics()
+
+        def worker():
+            for _ in range(1000):
+                metrics.record('manager', 'search', 0.001, tasks_parsed=1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = metrics.to_dict()['manager']['search']
+        self.assertEqual((stats['count'], stats['tasks_parsed']), (8000, 8000))
+
+
+class TestInstrument(TempDirMixin, unittest.TestCase):
+    """An instrumented manager records its own and its handler's calls"""
+
+    def setUp(self):
+        super().setUp()
+        self.registry = Metrics()
+
+    def json_handler(self):
+        return FileHandler(os.path.join(self.tmp.name, 'tasks.json'))
+
+    def manager(self, handler):
+        tm = TaskManager(handler, change_feed=None)
+        self.assertIs(instrument(tm, self.registry), self.registry)
+        return tm
+
+    def test_json_backend(self):
+        filename = os.path.join(self.tmp.name, 'tasks.json')
+        tm = self.manager(FileHandler(filename))
+        tm.add_task("a", "")
+        tm.get_all_tasks()
+        with self.assertRaises(ValueError):
+            tm.update_task(99, title="x")
+        data = self.registry.to_dict()
+        self.assertEqual(data['manager']['add_task']['count'], 1)
+        self.assertEqual(data['manager']['update_task']['errors'], 1)
+        # JSON saves rewrite the whole file.
+        self.assertEqual(data['handler']['save_task']['bytes_written'],
+                         os.path.getsize(filename))
+        # Loaded once into the cache, which serves the rest.
+        self.assertEqual(data['handler']['load_tasks']['tasks_parsed'], 1)
+        tm.get_all_tasks()
+        data = self.registry.to_dict()
+        self.assertEqual(data['handler']['load_tasks']['count'], 1)
+
+    def test_append_only_backend(self):
+        handler = LogFileHandler(os.path.join(self.tmp.name, 'tasks.log'))
+        self.addCleanup(handler.close)
+        tm = self.manager(handler)
+        for title in "abc":
+            tm.add_task(title, "")
+        # Appends count only their growth, so the total is the log's size.
+        stats = self.registry.to_dict()['handler']['save_task']
+        self.assertEqual((stats['count'], stats['bytes_written']),
+                         (3, os.path.getsize(handler.filename)))
+
+    def test_generators_timed_when_consumed(self):
+        tm = self.manager(self.json_handler())
+        tm.add_tasks([{'title': "a"}, {'title': "b"}])
+        tasks = tm.file_handler.iter_tasks()
+        self.assertNotIn('iter_tasks', self.registry.to_dict()['handler'])
+        self.assertEqual(len(list(tasks)), 2)
+        data = self.registry.to_dict()
+        self.assertEqual(data['handler']['iter_tasks']['tasks_parsed'], 2)
+
+    def test_instrument_once(self):
+        tm = self.manager(self.json_handler())
+        instrument(tm, self.registry)
+        self.assertIsInstance(tm.file_handler, InstrumentedHandler)
+        self.assertNotIsInstance(tm.file_handler._handler, InstrumentedHandler)
+        tm.add_task("a", "")
+        data = self.registry.to_dict()
+        self.assertEqual(data['manager']['add_task']['count'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
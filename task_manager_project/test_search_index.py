@@ -0,0 +1,110 @@
+import os
+import random
+import unittest
+from business_logic import Task, TaskManager
+from data_access import FileHandler
+from search_index import (SearchIndex, tokenize, TITLE_WEIGHT,
+                          DESCRIPTION_WEIGHT, EXACT_BONUS)
+from test_support import TempDirMixin
+
+WORDS = ['fix', 'fixture', 'bug', 'build', 'builder', 'report', 'review',
+         'rev', 'déjà', 'deploy', 'docs', 'doc']
+
+
+def expected_ids(tasks, query):
+    """Score every task with a full scan, the way SearchIndex does."""
+    terms = set(tokenize(query))
+    scores = {}
+    for position, task in enumerate(tasks):
+        weights = {}
+        for token in tokenize(task.title):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(task.description):
+            weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+        total = 0
+        for term in terms:
+            score = sum(weight * (EXACT_BONUS if token == term else 1)
+                        for token, weight in weights.items()
+                        if token.startswith(term))
+            if not score:
+                break
+            total += score
+        else:
+            if terms:
+                scores[task.id] = (-total, position)
+    return sorted(scores, key=scores.get)
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Ranked results match a full scan of the tasks"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.tasks = [Task(id=i, title=' '.join(rng.sample(WORDS, 2)),
+                           description=' '.join(rng.choices(WORDS, k=4)))
+                      for i in range(1, 301)]
+        self.index = SearchIndex()
+        for task in self.tasks:
+            self.index.add(task)
+        self.position = {t.id: i for i, t in enumerate(self.tasks)}
+
+    def search(self, query, limit=None):
+        return self.index.search(query, limit,
+                                 tiebreak=self.position.__getitem__)
+
+    def check(self):
+        for query in ['fix', 'fi', 'FIX bug', 'rev', 'review rev',
+                      'doc deploy build', 'déj', 'fixture builder report',
+                      'missing', 'bug missing', '', '!!']:
+            with self.subTest(query=query):
+                expected = expected_ids(self.tasks, query)
+                self.assertEqual(self.search(query), expected)
+                self.assertEqual(self.search(query, limit=5), expected[:5])
+
+    def test_matches_scan(self):
+        self.check()
+
+    def test_after_removals(self):
+        for task in self.tasks[::3]:
+            self.index.remove(task.id)
+        self.tasks = [t for i, t in enumerate(self.tasks) if i % 3]
+        self.check()
+        for task in self.tasks:
+            self.index.remove(task.id)
+        self.assertEqual((self.index.postings, self.index.tokens), ({}, []))
+
+    def test_ranking(self):
+        index = SearchIndex()
+        index.add(Task(id=1, title="notes", description="report"))
+        index.add(Task(id=2, title="report", description=""))
+        index.add(Task(id=3, title="reporting", description=""))
+        self.assertEqual(index.search("report"), [2, 3, 1])
+
+    def test_bulk_add(self):
+        index = SearchIndex()
+        for task in reversed(self.tasks):
+            index.add(task, keep_sorted=False)
+        index.sort()
+        self.assertEqual(index.tokens, sorted(self.index.tokens))
+
+
+class TestTaskManagerSearch(TempDirMixin, unittest.TestCase):
+    """Search results follow adds, edits and deletes"""
+
+    def test_follows_writes(self):
+        handler = FileHandler(os.path.join(self.tmp.name, 'tasks.json'))
+        tm = TaskManager(handler, change_feed=None)
+        first = tm.add_task("Fix login bug", "")
+        second = tm.add_task("Write docs", "mention the login page")
+        self.assertEqual([t.id for t in tm.search("login")],
+                         [first.id, second.id])
+        tm.update_task(first.id, title="Fix signup bug")
+        self.assertEqual([t.id for t in tm.search("login")], [second.id])
+        tm.delete_task(second.id)
+        self.assertEqual(tm.search("login"), [])
+        self.assertEqual([t.title for t in tm.search("sign")],
+                         ["Fix signup bug"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import threading
+import unittest
+from data_access import ConflictError
+from sharded_storage import ShardedFileHandler
+from test_support import TempDirMixin
+
+
+def task(task_id, status="Pending", created="2024-05-10", title="Task"):
+    return {'id': task_id, 'title': title, 'description': "",
+            'priority': "Medium", 'due_date': None, 'status': status,
+            'created_date': created}
+
+
+class TempShardsMixin(TempDirMixin):
+    """A ShardedFileHandler on a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.handler = ShardedFileHandler(self.tmp.name)
+
+    def reopen(self):
+        self.handler = ShardedFileHandler(self.tmp.name)
+        return self.handler
+
+
+class TestShardedRoundTrip(TempShardsMixin, unittest.TestCase):
+    """Tasks live in the shard of their status and month"""
+
+    def test_save_and_load(self):
+        self.handler.save_tasks([task(2, created="2024-06-01"), task(1),
+                                 task(3, status="Completed")])
+        self.assertEqual(self.handler.shard_names(),
+                         ['completed-2024-05', 'pending-2024-05',
+                          'pending-2024-06'])
+        self.assertEqual([t['id'] for t in self.reopen().load_tasks()],
+                         [1, 2, 3])
+        self.assertEqual(
+            [t['id'] for t in self.handler.select_tasks("Completed")], [3])
+
+    def test_update_moves_task(self):
+        self.handler.save_task(task(1))
+        self.handler.update_task(1, task(1, status="Completed"))
+        self.assertEqual(self.handler.shard_names(status="Pending"), [])
+        self.assertEqual(self.reopen().get_task(1)['status'], "Completed")
+        self.handler.patch_task(1, {'status': "In Progress"})
+        self.assertEqual([t['status'] for t in self.reopen().load_tasks()],
+                         ["In Progress"])
+
+    def test_conflict(self):
+        self.handler.save_task(task(1))
+        with self.assertRaises(ConflictError):
+            self.handler.update_task(1, task(1, title="New"),
+                                     expected=task(1, title="Old"))
+        self.assertEqual(self.handler.get_task(1)['title'], "Task")
+
+    def test_archive_completed(self):
+        self.handler.save_tasks([
+            task(1, status="Completed", created="2024-01-02"),
+            task(2, status="Completed", created="2024-07-02"),
+            task(3)])
+        self.assertEqual(self.handler.archive_completed(before="2024-06"), 1)
+        self.assertEqual([t['id'] for t in self.reopen().load_tasks()],
+                         [2, 3])
+        self.assertEqual(self.handler.get_task(1)['status'], "Completed")
+        tasks = self.handler.select_tasks(include_archive=True)
+        self.assertEqual(len(list(tasks)), 3)
+
+    def test_archive_bad_month(self):
+        self.handler.save_task(task(1, status="Completed",
+                                    created="2024-10-02"))
+        for before in ("2024-5", "May 2024", "2024-05-01"):
+            with self.subTest(before=before):
+                with self.assertRaises(ValueError):
+                    self.handler.archive_completed(before=before)
+        self.assertEqual([t['id'] for t in self.handler.load_tasks()], [1])
+
+
+class TestShardedSequence(TempShardsMixin, unittest.TestCase):
+    """Ids come from the shared sequence and are never reused"""
+
+    def test_reserve_after_delete(self):
+        first = self.handler.reserve_ids(2)
+        self.handler.save_tasks([task(first), task(first + 1)])
+        self.handler.delete_task(first + 1)
+        self.assertEqual(self.reopen().reserve_ids(), first + 2)
+
+    def test_seeded_from_manifest(self):
+        # Tasks saved with their own ids, before anything was reserved.
+        self.handler.save_tasks([task(7)])
+        self.assertFalse(os.path.exists(self.handler.seq_filename))
+        self.assertEqual(self.reopen().reserve_ids(), 8)
+        self.assertEqual(self.reopen().get_next_id(), 9)
+
+    def test_concurrent_reservations(self):
+        ids, lock = [], threading.Lock()
+
+        def worker():
+            handler = ShardedFileHandler(self.tmp.name)
+            for _ in range(20):
+                first = handler.reserve_ids(3)
+                with lock:
+                    ids.extend(range(first, first + 3))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(ids), list(range(1, 241)))
+
+
+class TestShardedCorruption(TempShardsMixin, unittest.TestCase):
+    """A damaged or missing manifest is rebuilt from the shards"""
+
+    def test_corrupt_manifest(self):
+        self.handler.save_tasks([task(1), task(2, status="Completed")])
+        with open(self.handler.manifest_filename, 'wb') as f:
+            f.write(b'not a manifest')
+        self.assertEqual([t['id'] for t in self.reopen().load_tasks()],
+                         [1, 2])
+        self.handler.delete_task(1)
+        self.assertEqual([t['id'] for t in self.reopen().load_tasks()], [2])
+
+    def test_missing_manifest(self):
+        self.handler.save_tasks([task(1), task(2)])
+        os.remove(self.handler.manifest_filename)
+        self.assertEqual(self.reopen().get_task(2)['id'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
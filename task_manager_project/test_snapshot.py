@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+import snapshot
+from data_access import FileHandler
+from test_support import TempDirMixin
+
+
+def task(task_id, title="Task"):
+    return {'id': task_id, 'title': title, 'description': "",
+            'priority': "Medium", 'due_date': None, 'status': "Pending",
+            'created_date': "2024-01-01"}
+
+
+class TempSnapshotMixin(TempDirMixin):
+    """Paths for a snapshot in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.json')
+        self.path = snapshot.snapshot_path(self.filename)
+
+
+class TestSnapshotFormat(TempSnapshotMixin, unittest.TestCase):
+    """Snapshots round-trip and damaged ones are refused"""
+
+    def test_round_trip(self):
+        tasks = [task(i, f"Task é {i}") for i in range(50)]
+        snapshot.write(self.path, tasks, (123, 456))
+        self.assertEqual(snapshot.read(self.path), tasks)
+        self.assertEqual(snapshot.read(self.path, (123, 456)), tasks)
+        self.assertIsNone(snapshot.read(self.path, (123, 457)))
+
+    def test_damaged(self):
+        snapshot.write(self.path, [task(1), task(2)], (1, 2))
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        header = snapshot.HEADER.size
+        for name, damaged in [('empty', b''),
+                              ('short header', data[:10]),
+                              ('bad magic', b'X' + data[1:]),
+                              ('truncated body', data[:-3]),
+                              ('garbage body',
+                               data[:header] + b'\xff' * (len(data) - header)),
+                              ('other version',
+                               data[:8] + b'\x63\x00' + data[10:])]:
+            with self.subTest(name):
+                with open(self.path, 'wb') as f:
+                    f.write(damaged)
+                with self.assertRaises(snapshot.SnapshotError):
+                    snapshot.read(self.path)
+
+    def test_failed_write_keeps_old_snapshot(self):
+        snapshot.write(self.path, [task(1)], (1, 2))
+        with mock.patch.object(snapshot.os, 'replace',
+                               side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                snapshot.write(self.path, [task(2)], (3, 4))
+        self.assertEqual(snapshot.read(self.path), [task(1)])
+        self.assertEqual(os.listdir(self.tmp.name), ['tasks.json.snap'])
+
+
+class TestFileHandlerSnapshot(TempSnapshotMixin, unittest.TestCase):
+    """FileHandler reads the snapshot only while it matches the JSON file"""
+
+    def test_written_and_used(self):
+        FileHandler(self.filename).save_tasks([task(1), task(2)])
+        self.assertEqual(snapshot.read(self.path), [task(1), task(2)])
+        with mock.patch('json.load') as load:
+            self.assertEqual(FileHandler(self.filename).load_tasks(),
+                             [task(1), task(2)])
+        load.assert_not_called()
+
+    def test_stale_snapshot_ignored(self):
+        FileHandler(self.filename).save_tasks([task(1)])
+        with open(self.filename, 'w') as f:
+            json.dump([task(1), task(2, "edited by hand")], f)
+        self.assertEqual(len(FileHandler(self.filename).load_tasks()), 2)
+        # Rebuilt for the new contents.
+        self.assertEqual(len(snapshot.read(self.path)), 2)
+
+    def test_corrupt_snapshot_ignored(self):
+        FileHandler(self.filename).save_tasks([task(1)])
+        with open(self.path, 'wb') as f:
+            f.write(b'TASKSNAP garbage')
+        self.assertEqual(FileHandler(self.filename).load_tasks(), [task(1)])
+
+    def test_concurrent_readers(self):
+        FileHandler(self.filename).save_tasks([task(i) for i in range(200)])
+        os.remove(self.path)
+        results = []
+
+        def reader():
+            for _ in range(20):
+                tasks = FileHandler(self.filename).load_tasks()
+                results.append(len(tasks))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [200] * 80)
+        self.assertEqual(len(snapshot.read(self.path)), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
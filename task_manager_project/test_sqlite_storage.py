@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import threading
+import unittest
+from data_access import ConflictError
+from sqlite_storage import SQLiteHandler
+from test_support import TempDirMixin
+
+
+def task(task_id, title="Task", status="Pending"):
+    return {'id': task_id, 'title': title, 'description': "",
+            'priority': "Medium", 'due_date': None, 'status': status,
+            'created_date': "2024-01-01"}
+
+
+class TempDatabaseMixin(TempDirMixin):
+    """A SQLiteHandler on a database in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.db')
+        self.handler = self.open()
+
+    def open(self):
+        handler = SQLiteHandler(self.filename)
+        self.addCleanup(handler.close)
+        return handler
+
+
+class TestSQLiteRoundTrip(TempDatabaseMixin, unittest.TestCase):
+    """Writes are visible to other connections once committed"""
+
+    def test_writes(self):
+        self.handler.save_tasks([task(1, "a"), task(2, "b"), task(3, "c")])
+        self.handler.update_task(1, task(1, "A"))
+        self.handler.patch_task(2, {'status': "Completed"})
+        self.handler.patch_tasks({3: {'title': "C"}, 1: {'priority': "High"}})
+        self.handler.delete_task(3)
+        other = self.open()
+        self.assertEqual([(t['id'], t['title'], t['status'], t['priority'])
+                          for t in other.load_tasks()],
+                         [(1, "A", "Pending", "High"),
+                          (2, "b", "Completed", "Medium")])
+        self.assertEqual([t['id'] for t in other.iter_tasks()], [1, 2])
+        self.assertIsNone(other.get_task(3))
+
+    def test_signature_follows_other_connections(self):
+        other = self.open()
+        before = self.handler.get_signature()
+        other.save_task(task(1))
+        self.assertNotEqual(self.handler.get_signature(), before)
+
+    def test_import_json(self):
+        source = os.path.join(self.tmp.name, 'tasks.json')
+        with open(source, 'w') as f:
+            json.dump([task(1, "a"), task(5, "b")], f)
+        self.handler.save_task(task(1, "old"))
+        self.assertEqual(self.handler.import_json(source), 2)
+        self.assertEqual([t['title'] for t in self.handler.load_tasks()],
+                         ["a", "b"])
+        self.assertEqual(self.handler.get_next_id(), 6)
+
+
+class TestSQLiteErrors(TempDatabaseMixin, unittest.TestCase):
+    """Rejected writes leave the database as it was"""
+
+    def test_conflict(self):
+        self.handler.save_task(task(1, "a"))
+        with self.assertRaises(ConflictError):
+            self.handler.update_task(1, task(1, "b"),
+                                     expected=task(1, "stale"))
+        with self.assertRaises(ConflictError):
+            self.handler.patch_task(1, {'title': "b"},
+                                    expected=task(1, "stale"))
+        self.assertEqual(self.handler.get_task(1)['title'], "a")
+        # The connection is usable afterwards.
+        self.handler.patch_task(1, {'title': "b"}, expected=task(1, "a"))
+        self.assertEqual(self.open().get_task(1)['title'], "b")
+
+    def test_unknown_field(self):
+        self.handler.save_task(task(1))
+        with self.assertRaises(ValueError):
+            self.handler.patch_task(1, {'title': "x", 'owner': "me"})
+        self.assertEqual(self.handler.get_task(1)['title'], "Task")
+
+    def test_duplicate_id_rolls_back_batch(self):
+        self.handler.save_task(task(1))
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.handler.save_tasks([task(2), task(1)])
+        self.assertEqual([t['id'] for t in self.handler.load_tasks()],
+                         [1])
+
+    def test_not_a_database(self):
+        path = os.path.join(self.tmp.name, 'garbage.db')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 4096)
+        with self.assertRaises(sqlite3.DatabaseError):
+            SQLiteHandler(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 4096)
+
+
+class TestSQLiteSequence(TempDatabaseMixin, unittest.TestCase):
+    """Ids only move forward and are shared between connections"""
+
+    def test_deleted_max_id_not_reused(self):
+        first = self.handler.reserve_ids(2)
+        self.handler.save_tasks([task(first), task(first + 1)])
+        self.handler.delete_task(first + 1)
+        self.assertEqual(self.open().reserve_ids(), first + 2)
+
+    def test_explicit_ids_advance_sequence(self):
+        self.handler.save_task(task(10))
+        self.assertEqual(self.handler.reserve_ids(), 11)
+
+    def test_concurrent_reservations(self):
+        ids, lock = [], threading.Lock()
+        handlers = [self.open() for _ in range(4)]
+
+        def worker(handler):
+            for _ in range(25):
+                first = handler.reserve_ids(2)
+                with lock:
+                    ids.extend((first, first + 1))
+
+        threads = [threading.Thread(target=worker, args=(h,))
+                   for h in handlers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(ids), list(range(1, 201)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+"""Helpers shared by the test modules."""
+import tempfile
+
+
+class TempDirMixin:
+    """Give each test a fresh temporary directory, self.tmp.
+
+    Cleanups run last first, so anything a subclass registers with
+    addCleanup() after calling this setUp() is done before the directory
+    is removed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
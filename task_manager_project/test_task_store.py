@@ -0,0 +1,316 @@
+import datetime
+import os
+import random
+import sys
+import threading
+import unittest
+from unittest import mock
+from business_logic import Task, TaskManager
+from constants import PRIORITIES, STATUSES
+from data_access import FileHandler
+from sqlite_storage import SQLiteHandler
+from task_store import TaskStore
+from test_support import TempDirMixin
+
+
+class ListHandler:
+    """In-memory stand-in for a file handler."""
+
+    def __init__(self, tasks):
+        self.tasks = [t.to_dict() for t in tasks]
+        self.version = 0
+        self.loads = 0
+
+    def load_tasks(self):
+        self.loads += 1
+        return [dict(t) for t in self.tasks]
+
+    def get_signature(self):
+        return self.version
+
+
+def make_tasks(count, start=datetime.date(2024, 1, 1)):
+    statuses = ("Pending", "In Progress", "Completed")
+    days = [(start + datetime.timedelta(days=d)).isoformat()
+            for d in range(90)]
+    return [Task(id=i + 1, title=f"Task {i}", status=statuses[i % 3],
+                 due_date=days[i % 90])
+            for i in range(count)]
+
+
+class TestTaskStoreCache(unittest.TestCase):
+    """Tasks are parsed once and reloaded only when the file changes"""
+
+    def setUp(self):
+        self.handler = ListHandler(make_tasks(5))
+        self.store = TaskStore(self.handler, Task.from_dict)
+
+    def test_loaded_once(self):
+        self.store.refresh_if_loaded()
+        self.assertEqual(self.handler.loads, 0)
+        self.assertEqual(len(self.store.tasks()), 5)
+        self.store.get(1)
+        self.store.filter(status="Pending")
+        self.assertEqual(self.handler.loads, 1)
+
+    def test_external_change_reloads(self):
+        self.store.tasks()
+        self.handler.tasks.pop()
+        self.assertEqual(len(self.store.tasks()), 5)
+        self.handler.version += 1
+        self.assertEqual(len(self.store.tasks()), 4)
+        self.assertEqual(self.handler.loads, 2)
+
+    def test_own_writes_applied_in_place(self):
+        self.store.tasks()
+        task = Task(id=6, title="New", due_date="2024-03-01")
+        self.handler.tasks.append(task.to_dict())
+        self.handler.version += 1
+        self.store.put(task)
+        self.store.mark_written()
+        self.store.remove(1)
+        self.assertEqual([t.id for t in self.store.tasks()], [2, 3, 4, 5, 6])
+        self.assertEqual(self.handler.loads, 1)
+
+    def test_invalidate(self):
+        self.store.tasks()
+        self.store.invalidate()
+        self.store.tasks()
+        self.assertEqual(self.handler.loads, 2)
+
+    def test_concurrent_first_load(self):
+        barrier = threading.Barrier(8)
+        results = []
+
+        def reader():
+            barrier.wait()
+            results.append(len(self.store.tasks()))
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [5] * 8)
+        self.assertEqual(self.handler.loads, 1)
+
+
+class TestTaskManagerCache(TempDirMixin, unittest.TestCase):
+    """A TaskManager sees writes made by another one on the same file"""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.json')
+
+    def test_writes_from_another_manager(self):
+        first = TaskManager(FileHandler(self.filename), change_feed=None)
+        second = TaskManager(FileHandler(self.filename), change_feed=None)
+        task = first.add_task("a", "")
+        self.assertEqual(second.get_task_by_id(task.id).title, "a")
+        second.update_task(task.id, title="b")
+        first.add_task("c", "")
+        self.assertEqual([t.title for t in first.get_all_tasks()], ["b", "c"])
+        self.assertEqual([t.title for t in second.get_all_tasks()], ["b", "c"])
+
+    def test_returned_tasks_are_copies(self):
+        tm = TaskManager(FileHandler(self.filename), change_feed=None)
+        added = tm.add_task("a", "", due_date="2024-01-02")
+        tm.add_task("b", "", due_date="2024-01-01")
+        task = tm.get_task_by_id(added.id)
+        task.status = "Completed"
+        task.due_date = "2024-03-01"
+        added.title = "changed"
+        pending = tm.filter_tasks(status="Pending")
+        self.assertEqual([(t.title, t.status) for t in pending],
+                         [("a", "Pending"), ("b", "Pending")])
+        tm.delete_task(added.id)
+        self.assertEqual([t.title for t in tm.sort_tasks('due_date')], ["b"])
+
+    def check_racing_write(self, open_handler):
+        first = TaskManager(open_handler(), change_feed=None)
+        second = TaskManager(open_handler(), change_feed=None)
+        a, b = first.add_task("a", ""), first.add_task("b", "")
+        first.get_all_tasks()
+        second.update_task(b.id, title="B")
+        # Skip the reload, as if second's write landed between first's
+        # refresh and its write.
+        with mock.patch.object(first.store, 'refresh'):
+            first.update_task(a.id, title="A")
+        self.assertEqual([t.title for t in first.get_all_tasks()], ["A", "B"])
+
+    def test_racing_write_json(self):
+        self.check_racing_write(lambda: FileHandler(self.filename))
+
+    def test_racing_write_sqlite(self):
+        def open_handler():
+            handler = SQLiteHandler(os.path.join(self.tmp.name, 'tasks.db'))
+            self.addCleanup(handler.close)
+            return handler
+        self.check_racing_write(open_handler)
+
+
+def random_tasks(rng, ids):
+    days = [None] + [f"2024-{m:02d}-{d:02d}"
+                     for m in (1, 2, 3) for d in (1, 15, 28)]
+    return [Task(id=i, title=f"Task {i}", priority=rng.choice(PRIORITIES),
+                 status=rng.choice(STATUSES), due_date=rng.choice(days),
+                 created_date=rng.choice(days[1:]))
+            for i in ids]
+
+
+class TestTaskIndex(unittest.TestCase):
+    """Indexed filters and sorts give what a scan and a stable sort give"""
+
+    def setUp(self):
+        self.rng = random.Random(7)
+        # Ids out of order, so that file order is not id order.
+        ids = list(range(1, 201))
+        self.rng.shuffle(ids)
+        self.tasks = random_tasks(self.rng, ids)
+        self.store = TaskStore(ListHandler(self.tasks), Task.from_dict)
+
+    def check(self):
+        rank = {p: i for i, p in enumerate(PRIORITIES)}
+        for status in [None] + STATUSES:
+            for priority in [None] + PRIORITIES:
+                for due_before in (None, "2024-02-15", "2024-01-01"):
+                    expected = [t.id for t in self.tasks
+                                if (not status or t.status == status)
+                                and (not priority or t.priority == priority)
+                                and (not due_before or
+                                     (t.due_date is not None
+                                      and t.due_date < due_before))]
+                    with self.subTest(status=status, priority=priority,
+                                      due_before=due_before):
+                        got = self.store.filter(status, priority, due_before)
+                        self.assertEqual([t.id for t in got], expected)
+        keys = {
+            'priority': lambda t: rank[t.priority],
+            'due_date': lambda t: t.due_date or '9999-99-99',
+            'created_date': lambda t: t.created_date,
+        }
+        for by, key in keys.items():
+            for reverse in (False, True):
+                with self.subTest(by=by, reverse=reverse):
+                    expected = sorted(self.tasks, key=key, reverse=reverse)
+                    got = self.store.sorted_by(by, reverse)
+                    self.assertEqual([t.id for t in got],
+                                     [t.id for t in expected])
+
+    def test_after_load(self):
+        self.check()
+
+    def test_after_writes(self):
+        self.store.tasks()
+        for task in self.rng.sample(self.tasks, 40):
+            changed = Task.from_dict(dict(
+                task.to_dict(), status=self.rng.choice(STATUSES),
+                due_date=None if task.due_date else "2024-02-01"))
+            self.tasks[self.tasks.index(task)] = changed
+            self.store.put(changed)
+        removed = self.rng.sample(self.tasks, 30)
+        self.store.remove_many([t.id for t in removed])
+        self.tasks = [t for t in self.tasks if t not in removed]
+        added = random_tasks(self.rng, range(500, 520))
+        self.store.put_many(added)
+        self.tasks.extend(added)
+        self.check()
+
+    def test_bad_due_before(self):
+        with self.assertRaises(ValueError):
+            self.store.filter(due_before="01/02/2024")
+        self.assertIsNone(self.store.sorted_by('title'))
+
+
+class TestStats(unittest.TestCase):
+    """Overdue counts match a full scan, whatever order days are asked in"""
+
+    def setUp(self):
+        self.tasks = make_tasks(600)
+        self.store = TaskStore(ListHandler(self.tasks), Task.from_dict)
+        self.start = datetime.date(2024, 1, 1).toordinal()
+
+    def expected_overdue(self, today):
+        return sum(1 for t in self.tasks
+                   if t.status != "Completed" and t.due_ordinal < today)
+
+    def test_overdue(self):
+        for today in [self.start + d for d in (0, 5, 6, 40, 3, 120, 119, -10)]:
+            with self.subTest(today=today):
+                self.assertEqual(self.store.stats(today)['overdue'],
+                                 self.expected_overdue(today))
+
+    def test_overdue_from_concurrent_readers(self):
+        # Readers mostly move forward a day at a time, the path that rolls
+        # the cached count on.
+        days = [self.start + d for d in range(0, 100)]
+        expected = {today: self.expected_overdue(today) for today in days}
+        self.store.stats(self.start)
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def reader(offset):
+            barrier.wait()
+            for i in range(1000):
+                today = days[(i + offset) % len(days)]
+                got = self.store.stats(today)['overdue']
+                if got != expected[today]:
+                    errors.append((today, got, expected[today]))
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=reader, args=(n,))
+                       for n in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
+
+class TestStatsAfterWrites(TempDirMixin, unittest.TestCase):
+    """Counters kept by writes match counts over the stored tasks"""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmp.name, 'tasks.json')
+        self.tm = TaskManager(FileHandler(self.filename), change_feed=None)
+
+    def expected(self, tasks):
+        today = datetime.date.today().isoformat()
+        return {
+            'total': len(tasks),
+            'by_status': {s: sum(t.status == s for t in tasks)
+                          for s in STATUSES},
+            'by_priority': {p: sum(t.priority == p for t in tasks)
+                            for p in PRIORITIES},
+            'overdue': sum(1 for t in tasks if t.status != "Completed"
+                           and t.due_date is not None and t.due_date < today),
+        }
+
+    def test_writes(self):
+        rng = random.Random(5)
+        today = datetime.date.today()
+        days = [None] + [(today + datetime.timedelta(days=d)).isoformat()
+                         for d in (-30, -1, 0, 1, 30)]
+        self.assertEqual(self.tm.stats(), self.expected([]))
+        for i in range(60):
+            self.tm.add_task(f"Task {i}", "", rng.choice(PRIORITIES),
+                             rng.choice(days))
+        ids = [t.id for t in self.tm.get_all_tasks()]
+        for task_id in rng.sample(ids, 20):
+            self.tm.update_task(task_id, status=rng.choice(STATUSES),
+                                due_date=rng.choice(days))
+        self.tm.mark_complete_many(rng.sample(ids, 10))
+        self.tm.delete_tasks(rng.sample(ids, 10))
+        self.assertEqual(self.tm.stats(),
+                         self.expected(self.tm.get_all_tasks()))
+        fresh = TaskManager(FileHandler(self.filename), change_feed=None)
+        self.assertEqual(fresh.stats(), self.tm.stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
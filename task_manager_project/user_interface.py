@@ -1,5 +1,6 @@
 from business_logic import TaskManager
 from constants import PRIORITIES, STATUSES
+from data_access import CorruptFileError
 
 def start_application():
     """Start the Task Management Application."""
@@ -15,11 +16,16 @@ def start_application():
         print("6. Filter Tasks")
         print("7. Sort Tasks")
         print("8. Quit")
+        print("9. Search Tasks")
 
         choice = input("Enter your choice: ").strip()
 
         if choice == "1":
-            tasks = task_manager.get_all_tasks()
+            try:
+                tasks = task_manager.get_all_tasks()
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
             if not tasks:
                 print("No tasks found.")
             else:
@@ -62,6 +68,8 @@ def start_application():
                 task_id = int(input("Enter task ID to delete: ").strip())
                 task_manager.delete_task(task_id)
                 print("Task deleted successfully!")
+            except CorruptFileError as e:
+                print(f"Error: {e}")
             except ValueError:
                 print("Invalid ID.")
 
@@ -78,7 +86,14 @@ def start_application():
             status = input("Filter by status (optional): ").strip() or None
             print(f"Priorities: {', '.join(PRIORITIES)}")
             priority = input("Filter by priority (optional): ").strip() or None
-            tasks = task_manager.filter_tasks(status=status, priority=priority)
+            due_before = input("Due before (YYYY-MM-DD, optional): ").strip()
+            try:
+                tasks = task_manager.filter_tasks(
+                    status=status, priority=priority,
+                    due_before=due_before or None)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
             if not tasks:
                 print("No tasks match the filter.")
             else:
@@ -90,7 +105,11 @@ def start_application():
             print("Sort by: created_date, priority, due_date")
             sort_by = input("Sort by (created_date): ").strip() or 'created_date'
             reverse = input("Reverse order? (y/n): ").strip().lower() == 'y'
-            tasks = task_manager.sort_tasks(by=sort_by, reverse=reverse)
+            try:
+                tasks = task_manager.sort_tasks(by=sort_by, reverse=reverse)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
             print("Sorted Tasks:")
             for task in tasks:
                 print(f"- {task}")
@@ -98,5 +117,19 @@ def start_application():
         elif choice == "8":
             print("Exiting the application. Goodbye!")
             break
+
+        elif choice == "9":
+            query = input("Search for: ").strip()
+            try:
+                tasks = task_manager.search(query)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            if not tasks:
+                print("No tasks match the search.")
+            else:
+                print("Matching Tasks:")
+                for task in tasks:
+                    print(f"- {task}")
         else:
             print("Invalid choice. Please try again.")
\ No newline at end of file
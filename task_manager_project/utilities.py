@@ -1,3 +1,14 @@
 def format_date(date):
     """Format a date string."""
-    pass
\ No newline at end of file
+    pass
+
+# datetime is imported on first use; short CLI runs often never need it.
+_datetime = None
+
+def lazy_datetime():
+    """Return the datetime module, importing it on first call."""
+    global _datetime
+    if _datetime is None:
+        import datetime
+        _datetime = datetime
+    return _datetime